@@ -0,0 +1,216 @@
+import datetime
+import glob
+import os
+import sqlite3
+import threading
+import time
+
+# Pages copied per backup step; with the default 4 KiB pages that is 4 MiB
+BACKUP_PAGES = 1024
+
+# Seconds to sleep between steps so bookings get the disk and the GIL
+BACKUP_PAUSE = 0.005
+
+# Snapshots are named <database>-YYYYMMDD-HHMMSS.db inside the backup directory
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S'
+
+
+class BackupResult:
+    """What one backup or restore did"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = 0
+        self.steps = 0
+        self.restarts = 0       # the source changed under the copy and it started over
+        self.bytes = 0
+        self.seconds = 0.0
+        self.verified = False
+
+
+class BackupVerifyError(ValueError):
+    """Raised when a backup file fails its integrity check"""
+
+
+class BackupCancelledError(Exception):
+    """Raised inside a backup that was stopped before it finished"""
+
+
+def default_directory(db_name):
+    """The backups directory next to the database file"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_name)), 'backups')
+
+
+def snapshot_name(db_name, when=None):
+    """File name for a snapshot of db_name taken at when (default now)"""
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    return f"{stem}-{(when or datetime.datetime.now()).strftime(TIMESTAMP_FORMAT)}.db"
+
+
+def list_snapshots(directory, db_name):
+    """Snapshot paths of db_name in a directory, oldest first"""
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    return sorted(glob.glob(os.path.join(glob.escape(directory), glob.escape(stem) + '-*-*.db')))
+
+
+def verify_backup(path, quick=True):
+    """Check a backup file opens and passes SQLite's integrity check; returns its reservation count"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        check = 'quick_check' if quick else 'integrity_check'
+        problems = [row[0] for row in conn.execute(f'PRAGMA {check}')]
+        if problems != ['ok']:
+            raise BackupVerifyError(f"{path} failed {check}: {'; '.join(problems[:5])}")
+        return conn.execute('SELECT COUNT(*) FROM reservations').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise BackupVerifyError(f"{path} is not a usable database: {e}") from None
+    finally:
+        conn.close()
+
+
+def _copy(source, target, result, pages, pause, progress):
+    """Run the online backup API from source to target in steps of pages"""
+    remaining = [None]
+
+    def step(status, left, total):
+        result.steps += 1
+        result.pages = total
+        # Remaining pages only go up when another connection wrote and the copy restarted
+        if remaining[0] is not None and left > remaining[0]:
+            result.restarts += 1
+        remaining[0] = left
+        if progress:
+            progress(total - left, total)
+        if pause and left:
+            time.sleep(pause)
+
+    source.backup(target, pages=pages, progress=step)
+
+
+def backup_database(db, path, pages=BACKUP_PAGES, pause=BACKUP_PAUSE, progress=None, verify=True):
+    """Copy a live database to path without stopping writers
+
+    In WAL mode the copy reads from one snapshot held open for the whole backup: writers
+    carry on, and the backup never restarts because of them. Without WAL a held read lock
+    would block every commit, so the copy takes its steps unlocked and starts over
+    whenever someone writes. The file appears under its final name only once complete.
+    """
+    result = BackupResult(path)
+    start = time.perf_counter()
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    source = sqlite3.connect(db.db_name, isolation_level=None)
+    target = sqlite3.connect(partial)
+    try:
+        source.execute(f"PRAGMA busy_timeout = {db.profile['busy_timeout']}")
+        hold_snapshot = db.profile.uses_wal
+        if hold_snapshot:
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        try:
+            _copy(source, target, result, pages, pause, progress)
+        finally:
+            if hold_snapshot:
+                source.execute('COMMIT')
+        # A plain single file, whatever journal mode the live database uses
+        target.execute('PRAGMA journal_mode = DELETE')
+    except BaseException:
+        target.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    if verify:
+        try:
+            verify_backup(partial)
+        except BackupVerifyError:
+            os.remove(partial)
+            raise
+        result.verified = True
+    os.replace(partial, path)
+    result.bytes = os.path.getsize(path)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def restore_database(db, path, pages=BACKUP_PAGES, progress=None):
+    """Replace the database's contents with a verified backup
+
+    Meant for when the app is not running: other processes keep whatever they had cached.
+    """
+    verify_backup(path, quick=False)
+    result = BackupResult(path)
+    result.verified = True
+    start = time.perf_counter()
+
+    source = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        with db.pool.connection() as target:
+            _copy(source, target, result, pages, 0, progress)
+    finally:
+        source.close()
+
+    # Nothing cached from before the restore can be trusted
+    db.reservation_cache.clear()
+    db.seats.clear()
+    db.flights.clear()
+    result.bytes = os.path.getsize(path)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def prune_snapshots(directory, db_name, keep):
+    """Delete all but the newest keep snapshots; returns the deleted paths"""
+    snapshots = list_snapshots(directory, db_name)
+    doomed = snapshots[:-keep] if keep > 0 else snapshots
+    for path in doomed:
+        os.remove(path)
+    return doomed
+
+
+class BackupScheduler:
+    """Background thread taking a snapshot every interval seconds, keeping the newest few"""
+
+    def __init__(self, db, directory, interval, keep):
+        self.db = db
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.last = None            # BackupResult of the latest snapshot
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def snapshot(self):
+        """Take one snapshot now and apply retention"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.last = backup_database(self.db, os.path.join(self.directory, snapshot_name(self.db.db_name)),
+                                    progress=self._check_stop)
+        prune_snapshots(self.directory, self.db.db_name, self.keep)
+        return self.last
+
+    def _check_stop(self, copied, total):
+        # Closing the app shouldn't wait for a multi-GB copy to finish
+        if self._stop.is_set():
+            raise BackupCancelledError()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except BackupCancelledError:
+                break
+            except (OSError, sqlite3.Error, BackupVerifyError) as e:
+                print(f"Scheduled backup failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
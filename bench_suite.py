@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import datagen
+from benchmark import percentile
+from database import DatabaseManager
+from reservations import load_reservations
+
+# Bump when operations are added or measured differently; compare warns across versions
+SUITE_VERSION = 2
+
+DEFAULT_SIZES = ('10k', '1m')
+DEFAULT_DATA_DIR = datagen.DATA_DIR
+DEFAULT_RESULTS_DIR = 'bench-results'
+
+# Whole-table reads into Reservation tuples are skipped above this size, they need gigabytes
+FULL_SCAN_LIMIT = 2000000
+
+# Slower operations stop early after this many seconds, with at least one call timed
+TIME_BUDGET = 3.0
+
+
+def measure(fn, calls, budget=TIME_BUDGET):
+    """Seconds taken by each fn(i), for i up to calls or until budget seconds have passed"""
+    latencies = []
+    deadline = time.perf_counter() + budget
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if end > deadline:
+            break
+    return latencies
+
+
+def summarize(latencies):
+    """Latency summary stored in the results file, in milliseconds"""
+    return {
+        'calls': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 4),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'max_ms': round(max(latencies) * 1000, 4),
+    }
+
+
+class Workload:
+    """Inputs for the timed operations, sampled from the dataset with a fixed seed"""
+
+    def __init__(self, db, seed=42, samples=1000):
+        self.rng = random.Random(seed)
+        with db.pool.connection() as conn:
+            max_id, self.last_date = conn.execute('SELECT MAX(id), MAX(date) FROM reservations').fetchone()
+            self.flights = conn.execute('SELECT flight_number, departure, destination '
+                                        'FROM flights ORDER BY id').fetchall()
+        self.total = db.count_reservations()
+        self.rows = db.get_reservations_by_ids(self.rng.sample(range(1, max_id + 1), min(samples, max_id)))
+        self.rng.shuffle(self.rows)
+
+    def row(self, i):
+        return self.rows[i % len(self.rows)]
+
+    def id_batch(self, i, size=100):
+        return [self.row(i * size + k).id for k in range(size)]
+
+
+def operations(db, workload):
+    """Timed calls as (name, calls, fn(i)); reads come first so they see the generated data unchanged"""
+    w = workload
+    version = db.get_change_version()
+    offsets = [w.rng.randrange(w.total) for _ in range(200)]
+    id_batches = [w.id_batch(i) for i in range(200)]
+
+    # New bookings go on dates after the dataset, one seat at a time, so they never collide
+    first_date = datetime.date.fromisoformat(w.last_date) + datetime.timedelta(days=30)
+    created = []
+
+    def create(i):
+        flight_number, departure, destination = w.flights[i % len(w.flights)]
+        seats_used = i // len(w.flights)
+        date = first_date + datetime.timedelta(days=seats_used // datagen.CAPACITY)
+        values = ("Bench Passenger", flight_number, departure, destination, date.isoformat(),
+                  datagen.SEATS[seats_used % datagen.CAPACITY])
+        created.append((db.create_reservation(*values), values))
+
+    # Creation can stop early on its time budget, so these wrap around what was created
+    def update(i):
+        reservation_id, values = created[i % len(created)]
+        db.update_reservation(reservation_id, "Bench Passenger Updated", *values[1:])
+
+    def delete(i):
+        db.delete_reservation(created[i % len(created)][0])
+
+    ops = [
+        ('get_reservation_by_id', 1000, lambda i: db.get_reservation_by_id(w.row(i).id)),
+        ('get_reservation_by_id cached', 1000, lambda i: db.get_reservation_by_id(w.row(0).id)),
+        ('get_versioned_reservation', 1000, lambda i: db.get_versioned_reservation(w.row(i).id)),
+        ('get_reservations_by_ids 100', 200, lambda i: db.get_reservations_by_ids(id_batches[i])),
+        ('get_seat_status', 1000, lambda i: db.get_seat_status(w.row(i).flight_number, w.row(i).date,
+                                                               w.row(i).seat_number)),
+        ('count_reservations', 20, lambda i: db.count_reservations()),
+        ('get_reservations_window', 200, lambda i: db.get_reservations_window(offsets[i], 200)),
+        ('search_reservations', 200, lambda i: db.search_reservations()),
+        ('search_reservations name', 200, lambda i: db.search_reservations(name=w.row(i).name)),
+        ('search_reservations flight', 200,
+         lambda i: db.search_reservations(flight_number=w.row(i).flight_number)),
+        ('search_reservations route', 200,
+         lambda i: db.search_reservations(departure=w.row(i).departure, destination=w.row(i).destination)),
+        ('search_reservations date', 200,
+         lambda i: db.search_reservations(date_from=w.row(i).date, date_to=w.row(i).date)),
+        ('search_reservations deep page', 200, lambda i: db.search_reservations(cursor=w.row(i).id)),
+        ('search_passengers', 200, lambda i: db.search_passengers(w.row(i).name.split()[-1][:4])),
+        ('get_change_version', 1000, lambda i: db.get_change_version()),
+        ('get_changes_since 100', 100, lambda i: db.get_changes_since(version - 100)),
+        ('reports.dashboard', 10, lambda i: db.reports.dashboard()),
+        ('refresh_data headless', 50, lambda i: load_reservations(db, 0, 200)),
+        ('get_all_reservations columnar', 3, lambda i: db.get_all_reservations(columnar=True)),
+    ]
+    if w.total <= FULL_SCAN_LIMIT:
+        ops.append(('get_all_reservations', 3, lambda i: db.get_all_reservations()))
+    ops += [
+        ('create_reservation', 500, create),
+        ('update_reservation', 500, update),
+        ('delete_reservation', 500, delete),
+        ('prune_changes', 5, lambda i: db.prune_changes()),
+    ]
+    return ops
+
+
+def time_startup(db_path, calls=5):
+    """Open and close the database the way the app does at start"""
+    # init_database prints on every open
+    with contextlib.redirect_stdout(io.StringIO()):
+        return summarize(measure(lambda i: DatabaseManager(db_path).close(), calls))
+
+
+def time_app(db_path):
+    """Milliseconds to first paint, to the database being ready, and for a full reservations refresh"""
+    from main import FlightReservationApp
+
+    start = time.perf_counter()
+    app = FlightReservationApp(db_path)
+    app.root.update()
+    first_paint = time.perf_counter() - start
+    try:
+        while app.worker.busy:
+            app.root.update()
+            time.sleep(0.001)
+        ready = time.perf_counter() - start
+
+        page = app.get_frame("ReservationsPage")
+        start = time.perf_counter()
+        page.refresh_data()
+        while app.worker.busy:
+            app.root.update()
+            time.sleep(0.001)
+        app.root.update_idletasks()
+        refresh = time.perf_counter() - start
+    finally:
+        app.root.destroy()
+        app.worker.stop()
+        app.db.close()
+    return {'first_paint_ms': round(first_paint * 1000, 3), 'database_ready_ms': round(ready * 1000, 3),
+            'refresh_data_ms': round(refresh * 1000, 3)}
+
+
+def run_size(rows, data_dir, seed, only=None):
+    """Time every operation on a copy of the dataset for one size"""
+    def progress(written, total):
+        print(f"\r  generating {written}/{total} rows", end='', flush=True)
+
+    source = datagen.dataset_path(data_dir, rows, seed)
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        datagen.ensure_dataset(data_dir, rows, seed, progress=progress)
+        print(f"\n  generated {os.path.basename(source)} in {time.perf_counter() - start:.1f}s")
+
+    # Writes and startup timing change the file, so every run starts from a fresh copy
+    tmp_dir = tempfile.mkdtemp(prefix="flights-suite-")
+    db_path = os.path.join(tmp_dir, "flights.db")
+    shutil.copyfile(source, db_path)
+    result = {'rows': rows, 'dataset': os.path.basename(source), 'operations': {}, 'skipped': {}}
+    try:
+        result['startup'] = time_startup(db_path)
+        print(f"  {'startup (open database)':<34} p50 {result['startup']['p50_ms']:10.3f} ms")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = DatabaseManager(db_path)
+        try:
+            workload = Workload(db, seed)
+            for name, calls, fn in operations(db, workload):
+                if only and name not in only:
+                    continue
+                summary = result['operations'][name] = summarize(measure(fn, calls))
+                print(f"  {name:<34} {summary['calls']:>5} calls  p50 {summary['p50_ms']:10.3f} ms  "
+                      f"p95 {summary['p95_ms']:10.3f} ms  max {summary['max_ms']:10.3f} ms")
+            if workload.total > FULL_SCAN_LIMIT:
+                result['skipped']['get_all_reservations'] = f"more than {FULL_SCAN_LIMIT} rows"
+        finally:
+            db.close()
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result['app'] = time_app(db_path)
+        except Exception as e:
+            # TclError without a display; the headless refresh_data timing above still stands
+            result['skipped']['app'] = str(e)
+            print(f"  app timings not measured: {e}")
+        else:
+            print(f"  first paint {result['app']['first_paint_ms']:.1f} ms  "
+                  f"database ready {result['app']['database_ready_ms']:.1f} ms  "
+                  f"reservations refresh {result['app']['refresh_data_ms']:.1f} ms")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return result
+
+
+def git_revision():
+    """Short commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args):
+    """Run the suite and write the results file"""
+    sizes = [datagen.parse_rows(size) for size in args.sizes]
+    revision = git_revision()
+    results = {
+        'suite_version': SUITE_VERSION,
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': revision,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'datagen_version': datagen.DATAGEN_VERSION,
+        },
+        'sizes': {},
+    }
+    for rows in sizes:
+        label = datagen.size_label(rows)
+        print(f"== {label} ({rows} rows) ==")
+        results['sizes'][label] = run_size(rows, args.data_dir, args.seed, only=args.only)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{stamp}-{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+def compare(base, new, stat='p50_ms', threshold=0.2, min_delta_ms=0.05):
+    """Rows of (size, operation, base, new, ratio, verdict) for everything timed in both files"""
+    rows = []
+    for size, new_size in new['sizes'].items():
+        base_size = base['sizes'].get(size)
+        if base_size is None:
+            continue
+        timings = [('startup', base_size.get('startup'), new_size.get('startup'))]
+        timings += [(name, base_size['operations'].get(name), summary)
+                    for name, summary in new_size['operations'].items()]
+        for name, before, after in timings:
+            if not before or not after:
+                continue
+            old_value, new_value = before[stat], after[stat]
+            ratio = new_value / old_value if old_value else float('inf')
+            # Tiny absolute differences are timer noise, whatever the ratio says
+            verdict = ''
+            if abs(new_value - old_value) >= min_delta_ms:
+                if ratio > 1 + threshold:
+                    verdict = 'REGRESSION'
+                elif ratio < 1 - threshold:
+                    verdict = 'faster'
+            rows.append((size, name, old_value, new_value, ratio, verdict))
+    return rows
+
+
+def cmd_compare(args):
+    """Print the differences between two results files; fails if anything regressed"""
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    if base.get('suite_version') != new.get('suite_version'):
+        print("Warning: results come from different suite versions")
+    if base['meta'].get('datagen_version') != new['meta'].get('datagen_version'):
+        print("Warning: results were measured on different generated datasets")
+    print(f"{args.stat}: {base['meta'].get('revision')} -> {new['meta'].get('revision')}")
+
+    rows = compare(base, new, args.stat, args.threshold)
+    for size, name, old_value, new_value, ratio, verdict in rows:
+        print(f"  {size:>5} {name:<34} {old_value:10.3f} -> {new_value:10.3f} ms  {ratio:6.2f}x  {verdict}")
+    regressions = sum(1 for row in rows if row[5] == 'REGRESSION')
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Flight Reservation System benchmark suite")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run_parser = commands.add_parser('run', help="time every operation on generated datasets")
+    run_parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES),
+                            help=f"dataset sizes, e.g. {' '.join(datagen.SIZES)} (default: {' '.join(DEFAULT_SIZES)})")
+    run_parser.add_argument('--seed', type=int, default=42, help="data and workload seed (default 42)")
+    run_parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR,
+                            help=f"where generated datasets are cached (default: {DEFAULT_DATA_DIR})")
+    run_parser.add_argument('--output', help=f"results file (default: {DEFAULT_RESULTS_DIR}/<time>-<revision>.json)")
+    run_parser.add_argument('--only', nargs='+', metavar='operation', help="time only these operations")
+    run_parser.set_defaults(handler=cmd_run)
+
+    compare_parser = commands.add_parser('compare', help="diff two results files")
+    compare_parser.add_argument('base', help="results of the earlier release")
+    compare_parser.add_argument('new', help="results to check")
+    compare_parser.add_argument('--stat', default='p50_ms', choices=('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'))
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="slowdown ratio reported as a regression (default 0.2)")
+    compare_parser.set_defaults(handler=cmd_compare)
+
+    return parser
+
+
+def main(argv=None):
+    """Run a suite command"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
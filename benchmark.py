@@ -0,0 +1,1300 @@
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager, INSERT_RESERVATION_SQL, UPSERT_FLIGHT_SQL
+from storage import ChangeSet, ReservationConflictError
+from memory_backend import MemoryBackend
+from sharding import ShardedDatabaseManager
+from records import ReservationColumns
+from seat_map import SeatTakenError
+import backup
+import bulk
+import datagen
+from storage_profile import StorageProfile
+from server import ReservationServer
+from group_commit import GroupCommitWriter
+from migrations import Migrator, MIGRATIONS
+from metrics import Metrics
+from validation import DuplicateFilter, validate_stream
+
+
+def make_temp_db(name="bench.db"):
+    """Create an empty database in a temporary directory"""
+    tmp_dir = tempfile.mkdtemp(prefix="flights-bench-")
+    return tmp_dir, os.path.join(tmp_dir, name)
+
+
+CITIES = ("Cairo", "London", "Paris", "Dubai", "New York", "Rome", "Berlin", "Madrid", "Istanbul", "Tokyo")
+
+
+FIRST_NAMES = ("Ahmed", "Mohamed", "Sara", "Mona", "John", "Mary", "James", "Linda", "Omar", "Yusuf",
+               "Fatma", "Nour", "Peter", "Anna", "Carlos", "Maria", "Luca", "Sofia", "Hans", "Emma",
+               "Kenji", "Yuki", "Ali", "Layla", "David", "Grace", "Pavly", "Mina", "Karim", "Hana")
+LAST_NAMES = ("Hassan", "Ibrahim", "Smith", "Johnson", "Garcia", "Rossi", "Muller", "Tanaka", "Adel",
+              "Mansour", "Brown", "Wilson", "Lopez", "Bianchi", "Schmidt", "Sato", "Khalil", "Farouk",
+              "Taylor", "Moore", "Martin", "Ferrari", "Weber", "Suzuki", "Nasser", "Youssef", "Clark",
+              "Lewis", "Walker", "Hall", "Allen", "Young", "King", "Wright", "Scott", "Green", "Baker")
+
+FLIGHTS = 500
+SEATS_PER_FLIGHT = 180
+BASE_DAY = datetime.date(2025, 1, 1).toordinal()
+
+
+def sample_reservation(i):
+    """Build one reservation's field values; (flight, date, seat) is unique per i"""
+    flight = i % FLIGHTS
+    seat = (i // FLIGHTS) % SEATS_PER_FLIGHT
+    day = i // (FLIGHTS * SEATS_PER_FLIGHT)
+    name = f"{FIRST_NAMES[i * 7 % len(FIRST_NAMES)]} {LAST_NAMES[i * 13 // 3 % len(LAST_NAMES)]}"
+    return (name, f"AA{1000 + flight}",
+            CITIES[flight % 10], CITIES[(flight + 1 + flight // 10 % 9) % 10],
+            datetime.date.fromordinal(BASE_DAY + day).isoformat(),
+            f"{1 + seat // 6}{'ABCDEF'[seat % 6]}")
+
+
+def populate(db, rows, batch_size=10000):
+    """Bulk insert synthetic reservations"""
+    with db.pool.connection() as conn:
+        for start in range(0, rows, batch_size):
+            batch = [sample_reservation(i) for i in range(start, min(start + batch_size, rows))]
+            conn.executemany(UPSERT_FLIGHT_SQL, {row[1]: row[1:4] for row in batch}.values())
+            conn.executemany(INSERT_RESERVATION_SQL, batch)
+            conn.commit()
+
+
+def report(label, ops, seconds):
+    """Print a throughput line"""
+    rate = ops / seconds if seconds else float('inf')
+    print(f"  {label:<32} {ops:>8} ops  {seconds:8.3f}s  {rate:12.0f} ops/sec")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def bench_connections(ops=2000):
+    """Compare connect-per-call against the pooled DatabaseManager"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        # No row cache, so repeated lookups still reach SQLite
+        db = DatabaseManager(db_path, cache_size=0)
+
+        print("Connect per call (previous behaviour):")
+        start = time.perf_counter()
+        for i in range(ops):
+            conn = sqlite3.connect(db_path)
+            conn.execute('''
+                         INSERT INTO reservations (name, flight_number, departure, destination, date, seat_number)
+                         VALUES (?, ?, ?, ?, ?, ?)
+                         ''', sample_reservation(i))
+            conn.commit()
+            conn.close()
+        report("create_reservation", ops, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(ops):
+            conn = sqlite3.connect(db_path)
+            conn.execute('SELECT * FROM reservations WHERE id = ?', (1 + i % ops,)).fetchone()
+            conn.close()
+        report("get_reservation_by_id", ops, time.perf_counter() - start)
+
+        print("Pooled connections:")
+        start = time.perf_counter()
+        for i in range(ops):
+            db.create_reservation(*sample_reservation(ops + i))
+        report("create_reservation", ops, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(ops):
+            db.get_reservation_by_id(1 + i % ops)
+        report("get_reservation_by_id", ops, time.perf_counter() - start)
+
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _booking_worker(db_path, settings, ops, offset):
+    """Book reservations from a separate process, timing each one"""
+    db = DatabaseManager(db_path, pool_size=1, profile=StorageProfile(**settings))
+    latencies = []
+    errors = 0
+    for i in range(ops):
+        start = time.perf_counter()
+        try:
+            db.create_reservation(*sample_reservation(offset + i))
+        except sqlite3.OperationalError:
+            # "database is locked" after busy_timeout expired
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    db.close()
+    return latencies, errors
+
+
+def bench_concurrent_writers(processes=8, ops=200):
+    """Stress many booking processes against one database file"""
+    profiles = {
+        'rollback journal, full sync': dict(journal_mode='DELETE', synchronous='FULL', cache_size=-2000,
+                                            mmap_size=0, checkpoint_interval=0),
+        'WAL storage profile': {},
+    }
+
+    for label, settings in profiles.items():
+        tmp_dir, db_path = make_temp_db()
+        try:
+            DatabaseManager(db_path, profile=StorageProfile(**settings)).close()
+
+            jobs = [(db_path, settings, ops, n * ops) for n in range(processes)]
+            start = time.perf_counter()
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(_booking_worker, jobs)
+            elapsed = time.perf_counter() - start
+
+            latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+            errors = sum(worker_errors for _, worker_errors in results)
+            print(f"{label} ({processes} writer processes):")
+            report("bookings", len(latencies), elapsed)
+            print(f"  p50 {percentile(latencies, 50) * 1000:.2f} ms  "
+                  f"p99 {percentile(latencies, 99) * 1000:.2f} ms  "
+                  f"max {max(latencies, default=0) * 1000:.2f} ms  locked errors {errors}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def time_call(fn, *args, repeat=20, **kwargs):
+    """Average seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args, **kwargs)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_pagination(rows=1000000, page_size=50):
+    """Show that keyset page fetches stay flat as the table and page depth grow"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        start = time.perf_counter()
+        populate(db, rows)
+        print(f"  populated {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        # Walk down to a few depths to collect real cursors
+        depths = {}
+        cursor = None
+        for page in range(1, 2001):
+            _, cursor = db.search_reservations(cursor=cursor, limit=page_size)
+            if page in (1, 10, 100, 1000, 2000):
+                depths[page] = cursor
+
+        for page, page_cursor in depths.items():
+            seconds = time_call(db.search_reservations, cursor=page_cursor, limit=page_size)
+            print(f"  page {page + 1:>5} (after id {page_cursor}): {seconds * 1000:8.3f} ms")
+
+        filters = {
+            'flight_number': dict(flight_number="AA1250"),
+            'name': dict(name="pavly adel"),
+            'route': dict(departure="Paris", destination="Rome"),
+            'date range': dict(date_from="2025-01-03", date_to="2025-01-04"),
+        }
+        for label, kwargs in filters.items():
+            seconds = time_call(db.search_reservations, limit=page_size, **kwargs)
+            print(f"  filtered by {label:<14}: {seconds * 1000:8.3f} ms")
+
+        seconds = time_call(db.get_all_reservations, repeat=1)
+        print(f"  get_all_reservations (full scan): {seconds * 1000:8.1f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_virtual_window(sizes=(10000, 100000, 1000000), visible_rows=15):
+    """Time what a virtual-mode refresh reads: the row count plus one screen of rows"""
+    for rows in sizes:
+        tmp_dir, db_path = make_temp_db()
+        try:
+            db = DatabaseManager(db_path)
+            populate(db, rows)
+            count = time_call(db.count_reservations)
+            top = time_call(db.get_reservations_window, 0, visible_rows)
+            middle = time_call(db.get_reservations_window, rows // 2, visible_rows)
+            bottom = time_call(db.get_reservations_window, rows - 200, 200)
+            # What scrolling down from a cached page costs: the next page read after its last id
+            by_key = time_call(db.search_reservations, cursor=201, limit=200)
+            print(f"  {rows:>8} rows: count {count * 1000:7.2f} ms  top window {top * 1000:7.3f} ms  "
+                  f"middle window {middle * 1000:7.3f} ms  bottom page {bottom * 1000:7.3f} ms  "
+                  f"bottom page by key {by_key * 1000:7.3f} ms")
+            db.close()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_incremental_sync(rows=200000, changes=(1, 10, 100, 1000)):
+    """Compare a change-log sync with reloading the whole table"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+
+        seconds = time_call(db.get_all_reservations, repeat=3)
+        print(f"  full reload of {rows} rows: {seconds * 1000:9.2f} ms")
+
+        for count in changes:
+            version = db.get_change_version()
+            for i in range(count):
+                db.update_reservation(1 + i, *sample_reservation(rows + i))
+            seconds = time_call(db.get_changes_since, version)
+            print(f"  sync after {count:>5} changes:  {seconds * 1000:9.2f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_bulk(rows=200000, single_rows=5000):
+    """Compare streaming bulk import/export with one create_reservation per row"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+
+        start = time.perf_counter()
+        for i in range(single_rows):
+            db.create_reservation(*sample_reservation(i))
+        report("create_reservation per row", single_rows, time.perf_counter() - start)
+
+        for n, fmt in enumerate(('csv', 'jsonl')):
+            source = os.path.join(tmp_dir, f"manifest.{fmt}")
+            ids = range(single_rows + n * rows, single_rows + (n + 1) * rows)
+            with open(source, 'w', newline='', encoding='utf-8') as f:
+                if fmt == 'csv':
+                    f.write(','.join(bulk.FIELDS) + '\n')
+                    f.writelines(','.join(sample_reservation(i)) + '\n' for i in ids)
+                else:
+                    f.writelines(json.dumps(dict(zip(bulk.FIELDS, sample_reservation(i)))) + '\n' for i in ids)
+
+            result = bulk.import_reservations(db, source)
+            report(f"import {fmt}", result.imported, result.seconds)
+
+            result = bulk.export_reservations(db, os.path.join(tmp_dir, f"export.{fmt}"))
+            report(f"export {fmt}", result.exported, result.seconds)
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _seat_claimer(db_path, flight_number, date, seats):
+    """Try to claim every seat on a flight; returns how many claims won"""
+    db = DatabaseManager(db_path, pool_size=1)
+    won = 0
+    for seat_number in seats:
+        try:
+            db.create_reservation(f"Racer {os.getpid()}", flight_number, "Cairo", "London", date, seat_number)
+            won += 1
+        except SeatTakenError:
+            pass
+    db.close()
+    return won
+
+
+def bench_seats(rows=200000, processes=8):
+    """Time seat availability answers and race processes for the same seats"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+        flight_number, date = "AA1250", "2025-01-01"
+
+        db.seats.clear()
+        cold = time_call(db.get_seat_status, flight_number, date, "12A", repeat=1)
+        warm = time_call(db.get_seat_status, flight_number, date, "12A", repeat=10000)
+        print(f"  seat status: first lookup {cold * 1000:.3f} ms, cached bitmap {warm * 1e6:.2f} us")
+
+        # Every process tries every seat of an empty flight; exactly one may win each
+        seats = [f"{row}{letter}" for row in range(1, 31) for letter in "ABCDEF"]
+        jobs = [(db_path, "RACE1", "2025-06-01", seats) for _ in range(processes)]
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            won = sum(pool.starmap(_seat_claimer, jobs))
+        elapsed = time.perf_counter() - start
+        with db.pool.connection() as conn:
+            booked = conn.execute("SELECT COUNT(*) FROM reservations WHERE flight_number = 'RACE1'").fetchone()[0]
+        print(f"  {processes} processes x {len(seats)} seats: {won} claims won, {booked} rows booked "
+              f"({'no' if booked == len(seats) else 'DOUBLE'} double bookings) in {elapsed:.2f}s")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_flight_catalog(rows=200000):
+    """Time cached flight lookups and autocomplete against a query per keystroke"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+
+        with db.pool.connection() as conn:
+            query = time_call(lambda: conn.execute('SELECT departure, destination FROM reservations '
+                                                   'WHERE flight_number = ? LIMIT 1', ("AA1250",)).fetchone(),
+                              repeat=1000)
+        db.flights.clear()
+        cold = time_call(db.flights.lookup, "AA1250", repeat=1)
+        warm = time_call(db.flights.lookup, "AA1250", repeat=10000)
+        load = time_call(db.flights.load_numbers, repeat=1)
+        complete = time_call(db.flights.complete, "AA12", repeat=10000)
+        print(f"  query per lookup {query * 1e6:8.2f} us  catalogue cold {cold * 1e6:8.2f} us  "
+              f"cached {warm * 1e6:6.2f} us")
+        print(f"  load flight numbers {load * 1000:.2f} ms, autocomplete 'AA12' {complete * 1e6:.2f} us")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_search(rows=1000000):
+    """Compare FTS5 passenger search with LIKE scans"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        if not db.has_fts:
+            print("  FTS5 is not available in this SQLite build")
+            return
+        populate(db, rows)
+
+        for query in ("Pavly Adel", "kenji sat", "AA1250", "Berlin Madrid", "Nobody"):
+            fts = time_call(db.search_passengers, query, repeat=5)
+            like = time_call(db.search_passengers, query, use_fts=False, repeat=1)
+            matches = len(db.search_passengers(query))
+            print(f"  {query!r:<18} {matches:>4} rows  FTS5 {fts * 1000:9.2f} ms  LIKE {like * 1000:9.2f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+async def _http_client(port, requests, latencies, statuses):
+    """Keep-alive client sending (method, path, body) requests one after another"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for method, path, body in requests:
+            data = json.dumps(body).encode('utf-8') if body is not None else b''
+            start = time.perf_counter()
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\n"
+                         f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _server_workload(rows, offset, clients, per_client, read_ratio):
+    """Mixed reads, searches and bookings; booking seats start past the populated ones"""
+    rng = random.Random(7)
+    workload = []
+    for c in range(clients):
+        requests = []
+        for i in range(per_client):
+            roll = rng.random()
+            if roll < read_ratio:
+                requests.append(('GET', f"/reservations/{rng.randint(1, rows)}", None))
+            elif roll < read_ratio + (1 - read_ratio) / 2:
+                requests.append(('GET', f"/reservations?flight_number=AA{1000 + rng.randint(0, FLIGHTS - 1)}&limit=20", None))
+            else:
+                flight_number, departure, destination, date, seat_number = sample_reservation(offset + c * per_client + i)[1:]
+                requests.append(('POST', "/reservations", {
+                    'name': "Load Test", 'flight_number': flight_number, 'departure': departure,
+                    'destination': destination, 'date': date, 'seat_number': seat_number,
+                }))
+        workload.append(requests)
+    return workload
+
+
+def bench_server(rows=100000, clients=(1, 16, 64), per_client=200, read_ratio=0.8):
+    """Requests per second and latency percentiles for the JSON API"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path, pool_size=5)
+        populate(db, rows)
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(ReservationServer(db, port=0, workers=4).start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        offset = rows
+        for count in clients:
+            workload = _server_workload(rows, offset, count, per_client, read_ratio)
+            offset += count * per_client
+            latencies, statuses = [], {}
+
+            async def run_clients():
+                await asyncio.gather(*(_http_client(server.port, requests, latencies, statuses)
+                                       for requests in workload))
+
+            batches_before = server.batcher.batches
+            start = time.perf_counter()
+            asyncio.run(run_clients())
+            elapsed = time.perf_counter() - start
+
+            print(f"  {count:>3} clients  {len(latencies) / elapsed:9.0f} req/s  "
+                  f"p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+                  f"p95 {percentile(latencies, 95) * 1000:7.2f} ms  "
+                  f"p99 {percentile(latencies, 99) * 1000:7.2f} ms  "
+                  f"id batches {server.batcher.batches - batches_before:>5}  statuses {dict(sorted(statuses.items()))}")
+
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_group_commit(ops=4000, windows=(0, 0.001, 0.005, 0.02), threads=16):
+    """Writes per second with one commit per booking vs group commit at several batch windows"""
+    for synchronous in ('NORMAL', 'FULL'):
+        print(f"  synchronous={synchronous}")
+        tmp_dir, db_path = make_temp_db()
+        try:
+            db = DatabaseManager(db_path, profile=StorageProfile(synchronous=synchronous))
+            offset = 0
+
+            def book(i):
+                return db.create_reservation(*sample_reservation(offset + i))
+
+            # Every thread commits its own bookings; the busy timeout serialises them
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                start = time.perf_counter()
+                list(executor.map(book, range(ops)))
+                report("commit per booking", ops, time.perf_counter() - start)
+            offset += ops
+
+            # Same callers, each waiting for its booking to commit before making the next
+            for window in windows:
+                writer = GroupCommitWriter(db, max_delay=window).start()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    start = time.perf_counter()
+                    list(executor.map(lambda i: writer.create_reservation(*sample_reservation(offset + i)).result(),
+                                      range(ops)))
+                    elapsed = time.perf_counter() - start
+                writer.stop()
+                offset += ops
+                report(f"group {window * 1000:g} ms, batch {writer.stats()['average_batch']:.1f}", ops, elapsed)
+            db.close()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_reservation_cache(rows=200000, ops=20000, hot_ids=100, cache_size=4096):
+    """get_reservation_by_id with and without the row cache, for hot and cold access patterns"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path, cache_size=cache_size)
+        populate(db, rows)
+        rng = random.Random(11)
+        patterns = {
+            'hot': [rng.randint(1, hot_ids) for _ in range(ops)],
+            'cold': [rng.randint(1, rows) for _ in range(ops)],
+        }
+
+        for pattern, ids in patterns.items():
+            start = time.perf_counter()
+            for reservation_id in ids:
+                db._load_reservation(reservation_id)
+            report(f"{pattern} uncached", ops, time.perf_counter() - start)
+
+            db.reservation_cache.clear()
+            before = db.reservation_cache.stats()
+            start = time.perf_counter()
+            for reservation_id in ids:
+                db.get_reservation_by_id(reservation_id)
+            elapsed = time.perf_counter() - start
+            after = db.reservation_cache.stats()
+            hits, misses = after['hits'] - before['hits'], after['misses'] - before['misses']
+            report(f"{pattern} cached", ops, elapsed)
+            print(f"    hits {hits}  misses {misses}  evictions {after['evictions'] - before['evictions']}  "
+                  f"hit rate {hits / (hits + misses):.1%}")
+
+        # Updates keep cached rows fresh instead of dropping them
+        ids = patterns['hot'][:1000]
+        start = time.perf_counter()
+        for reservation_id in ids:
+            row = db.get_reservation_by_id(reservation_id)
+            db.update_reservation(reservation_id, "Cache Check", *row[2:])
+        report("read + update (hot)", len(ids), time.perf_counter() - start)
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _measure_memory(fn):
+    """Run fn and return (result, bytes still allocated by it, seconds)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def bench_record_memory(rows=1000000):
+    """Memory held by a full scan as plain tuples, Reservation records and ReservationColumns"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+
+        def plain_tuples():
+            with db.pool.connection() as conn:
+                return conn.execute('SELECT id, name, flight_number, departure, destination, date, seat_number '
+                                    'FROM reservations ORDER BY id DESC').fetchall()
+
+        for label, fn in (("plain tuples", plain_tuples),
+                          ("Reservation records", db.get_all_reservations),
+                          ("ReservationColumns", lambda: db.get_all_reservations(columnar=True))):
+            result, size, elapsed = _measure_memory(fn)
+            print(f"  {label:<22} {len(result):>8} rows  {size / 1024 / 1024:8.1f} MB  "
+                  f"{size / max(len(result), 1):6.0f} B/row  {elapsed:6.2f}s (traced)")
+            del result
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _time_first_paint(db_path):
+    """Seconds from building the app until the home page has been drawn"""
+    from main import FlightReservationApp
+
+    start = time.perf_counter()
+    app = FlightReservationApp(db_path)
+    app.root.update()
+    first_paint = time.perf_counter() - start
+
+    # Wait for the deferred init so its time can be reported separately
+    while app.worker.busy:
+        app.root.update()
+        time.sleep(0.001)
+    ready = time.perf_counter() - start
+    app.root.destroy()
+    app.worker.stop()
+    app.db.close()
+    return first_paint, ready
+
+
+def bench_startup(sizes=(0, 100000, 1000000)):
+    """Database open time with and without the schema version check, and time to first paint"""
+    for rows in sizes:
+        tmp_dir, db_path = make_temp_db()
+        try:
+            db = DatabaseManager(db_path)
+            populate(db, rows)
+            db.close()
+
+            # Forget the version so the full DDL runs again, as it did on every start before
+            conn = sqlite3.connect(db_path)
+            conn.execute('PRAGMA user_version = 0')
+            conn.close()
+            start = time.perf_counter()
+            DatabaseManager(db_path).close()
+            full = time.perf_counter() - start
+
+            start = time.perf_counter()
+            DatabaseManager(db_path).close()
+            skipped = time.perf_counter() - start
+            print(f"  {rows:>8} rows  open with DDL {full * 1000:8.1f} ms  version current {skipped * 1000:8.1f} ms")
+
+            try:
+                first_paint, ready = _time_first_paint(db_path)
+            except Exception as e:
+                # TclError without a display
+                print(f"    first paint not measured: {e}")
+            else:
+                print(f"    first paint {first_paint * 1000:8.1f} ms  database ready {ready * 1000:8.1f} ms")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_migrations(rows=1000000, batch_sizes=(None, 20000, 5000, 1000), legacy_every=10, pause=0.005):
+    """Backfill downtime: longest booking stall while migrations run, one transaction vs batches"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path, migrate=False)
+        populate(db, rows)
+        offset = rows
+
+        for batch_size in batch_sizes:
+            # Put the database back in its pre-migration state
+            with db.pool.connection() as conn:
+                conn.execute('UPDATE reservations SET seat_number = LOWER(seat_number) WHERE id % ? = 0',
+                             (legacy_every,))
+                conn.execute('DROP TABLE IF EXISTS schema_migrations')
+                conn.execute(f'PRAGMA user_version = {MIGRATIONS[0].version - 1}')
+                conn.commit()
+            db.prune_changes(0)
+
+            # A booking client keeps writing while the migration runs
+            stop = threading.Event()
+            latencies = []
+
+            def book():
+                i = 0
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    db.create_reservation(*sample_reservation(offset + i))
+                    latencies.append(time.perf_counter() - start)
+                    i += 1
+                    time.sleep(0.001)
+
+            writer = threading.Thread(target=book)
+            writer.start()
+            migrator = Migrator(db, batch_size=batch_size or rows + 1000000, pause=pause if batch_size else 0)
+            results = migrator.run()
+            stop.set()
+            writer.join()
+            offset += len(latencies)
+
+            label = f"batch {batch_size}" if batch_size else "one transaction"
+            seconds = sum(result.seconds for result in results)
+            lock = max(result.max_lock_seconds for result in results)
+            print(f"  {label:<16} {seconds:7.2f}s  longest lock {lock * 1000:8.1f} ms  "
+                  f"bookings {len(latencies):>5}  max booking wait {max(latencies) * 1000:8.1f} ms  "
+                  f"p99 {percentile(latencies, 99) * 1000:7.1f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_reports(rows=1000000, writes=2000):
+    """Report latency from reservation indexes vs summary tables, and the write cost of the triggers"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+        offset = rows
+
+        for use_summary in (False, True):
+            if use_summary:
+                start = time.perf_counter()
+                db.reports.enable_summaries()
+                print(f"  enable_summaries backfill  {(time.perf_counter() - start) * 1000:9.1f} ms")
+            label = "summary" if use_summary else "indexes"
+
+            for report_name, kwargs in (('load_factors', {}),
+                                        ('load_factors', dict(date_from="2025-01-03", date_to="2025-01-04")),
+                                        ('route_daily', dict(departure="Cairo")),
+                                        ('top_destinations', {})):
+                fn = getattr(db.reports, report_name)
+                elapsed = time_call(fn, use_summary=use_summary, repeat=5, **kwargs)
+                filters = ', '.join(f"{k}={v}" for k, v in kwargs.items()) or "all dates"
+                print(f"  {label:<8} {report_name:<17} {filters:<44} {elapsed * 1000:9.2f} ms")
+
+            start = time.perf_counter()
+            for i in range(writes):
+                db.create_reservation(*sample_reservation(offset + i))
+            offset += writes
+            report(f"{label} create_reservation", writes, time.perf_counter() - start)
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_metrics(rows=100000, ops=20000):
+    """Per-call overhead of the instrumentation, switched off and on"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path, cache_size=0, metrics=Metrics(enabled=False))
+        populate(db, rows)
+
+        # Same query on a plain sqlite3 connection, without the manager or the pool
+        conn = sqlite3.connect(db_path)
+        start = time.perf_counter()
+        for i in range(ops):
+            conn.execute('SELECT id, name, flight_number, departure, destination, date, seat_number '
+                         'FROM reservations WHERE id = ?', (1 + i % rows,)).fetchone()
+        report("plain sqlite3", ops, time.perf_counter() - start)
+        conn.close()
+
+        for enabled in (False, True):
+            db.metrics.enabled = enabled
+            start = time.perf_counter()
+            for i in range(ops):
+                db.get_reservation_by_id(1 + i % rows)
+            report(f"metrics {'on' if enabled else 'off'}", ops, time.perf_counter() - start)
+
+        snapshot = db.metrics.snapshot()
+        print(f"  queries counted {snapshot['counters']['queries']}, "
+              f"prometheus dump {len(db.metrics.prometheus().splitlines())} lines")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _counter_editor(db, reservation_ids, edits, check_version, stats):
+    """Read-modify-write a counter kept in the passenger name, like two agents editing one booking"""
+    conflicts = 0
+    for i in range(edits):
+        reservation_id = reservation_ids[i % len(reservation_ids)]
+        while True:
+            reservation, version = db.get_versioned_reservation(reservation_id)
+            count = int(reservation.name.split()[-1]) + 1
+            try:
+                db.update_reservation(reservation_id, f"Counter {count}", *reservation[2:],
+                                      expected_version=version if check_version else None)
+                break
+            except ReservationConflictError:
+                conflicts += 1
+    stats.append(conflicts)
+
+
+def bench_optimistic_updates(threads=8, edits=500, hot_rows=(1, 10, 100)):
+    """Lost updates with blind writes vs compare-and-swap retries on a few hot reservations"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path, pool_size=threads, cache_size=0)
+        populate(db, 1000)
+        for rows in hot_rows:
+            for check_version in (False, True):
+                ids = list(range(1, rows + 1))
+                for reservation_id in ids:
+                    db.update_reservation(reservation_id, "Counter 0", *sample_reservation(reservation_id - 1)[1:])
+
+                stats = []
+                workers = [threading.Thread(target=_counter_editor, args=(db, ids, edits, check_version, stats))
+                           for _ in range(threads)]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                seconds = time.perf_counter() - start
+
+                final = sum(int(db.get_versioned_reservation(reservation_id)[0].name.split()[-1])
+                            for reservation_id in ids)
+                lost = threads * edits - final
+                report(f"{rows:>3} hot rows {'compare-and-swap' if check_version else 'blind update'}",
+                       threads * edits, seconds)
+                print(f"  {'':<32} lost updates {lost:>6}  conflict retries {sum(stats):>6}")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _outcome(call, *args, **kwargs):
+    """Result of a backend call in a form two backends can be compared by, errors included"""
+    try:
+        result = call(*args, **kwargs)
+    except SeatTakenError as e:
+        return ('SeatTakenError', e.flight_number, e.date, e.seat_number)
+    except ReservationConflictError as e:
+        return ('ReservationConflictError', e.reservation_id, e.current, e.current_version)
+    if isinstance(result, ChangeSet):
+        return ('ChangeSet', result.version, sorted(result.rows), sorted(result.deleted_ids), result.added)
+    if isinstance(result, ReservationColumns):
+        return ('ReservationColumns', list(result))
+    return result
+
+
+def _conformance_script(db, seed=7, steps=3000):
+    """Run a seeded mix of writes and reads against a backend and return every outcome"""
+    rng = random.Random(seed)
+    flights = [("CF%d" % n, CITIES[n], CITIES[n + 1]) for n in range(4)]
+    dates = ['2025-03-01', '2025-03-02', '2025-04-15', '2025-05-20', 'TBD']
+    names = ["Sara Adel", "sara adel", "Omar Said", "Mona Zaki", "Hans Weber"]
+    versions = [0]
+    outcomes = []
+
+    def booking():
+        flight_number, departure, destination = rng.choice(flights)
+        # Few seats and a sloppy spelling now and then, so seat clashes and normalisation get exercised
+        seat = rng.choice([f"{rng.randint(1, 4)}{rng.choice('ABCDEF')}", ' 2c', '30f'])
+        return rng.choice(names), flight_number, departure, destination, rng.choice(dates), seat
+
+    for step in range(steps):
+        action = rng.random()
+        top = db.count_reservations() + 3
+        if action < 0.3:
+            outcomes.append(_outcome(db.create_reservation, *booking()))
+        elif action < 0.45:
+            reservation_id = rng.randint(1, top)
+            current = db.get_versioned_reservation(reservation_id)
+            expected = rng.choice([None, current[1] if current else 1, 0])
+            outcomes.append(_outcome(db.update_reservation, reservation_id, *booking(), expected_version=expected))
+        elif action < 0.55:
+            outcomes.append(_outcome(db.delete_reservation, rng.randint(1, top)))
+        elif action < 0.65:
+            reservation_id = rng.randint(1, top)
+            outcomes.append((_outcome(db.get_reservation_by_id, reservation_id),
+                             _outcome(db.get_versioned_reservation, reservation_id),
+                             _outcome(db.get_reservations_by_ids, [reservation_id, 1, top, reservation_id])))
+        elif action < 0.75:
+            flight_number, _, _, _, date, seat = booking()
+            outcomes.append(_outcome(db.get_seat_status, flight_number, date, rng.choice([seat, None])))
+        elif action < 0.85:
+            # Walk every page of a filtered search
+            filters = {key: value for key, value in (
+                ('name', rng.choice([None, "SARA ADEL", "Omar Said"])),
+                ('flight_number', rng.choice([None, "CF1", "CF2"])),
+                ('departure', rng.choice([None, CITIES[1]])),
+                ('destination', rng.choice([None, CITIES[2]])),
+                ('date_from', rng.choice([None, '2025-03-02'])),
+                ('date_to', rng.choice([None, '2025-03-31'])),
+            ) if value}
+            pages, cursor = [], None
+            while True:
+                rows, cursor = db.search_reservations(cursor=cursor, limit=rng.randint(1, 20), **filters)
+                pages.append(rows)
+                if cursor is None:
+                    break
+            outcomes.append(pages)
+        elif action < 0.9:
+            outcomes.append(_outcome(db.search_passengers, rng.choice(["sara", "om sa", "cf2", CITIES[2][:3]]),
+                                     limit=rng.randint(1, 50), use_fts=False))
+        elif action < 0.95:
+            since = rng.choice(versions)
+            outcomes.append(_outcome(db.get_changes_since, since, max_changes=rng.choice([5, 5000])))
+            versions.append(db.get_change_version())
+        else:
+            offset = rng.randint(0, top)
+            # Which source the reports came from legitimately differs between backends
+            dashboard = {key: value for key, value in db.reports.dashboard().items() if key != 'summaries'}
+            outcomes.append((db.count_reservations(), _outcome(db.get_reservations_window, offset, 10),
+                             _outcome(db.get_all_reservations), _outcome(db.get_all_reservations, columnar=True),
+                             dashboard, repr(db.flights.lookup(rng.choice(flights)[0]))))
+    return outcomes
+
+
+def _populate_backend(db, rows):
+    """Book rows synthetic reservations through the backend's own create_reservation"""
+    for i in range(rows):
+        db.create_reservation(*sample_reservation(i))
+
+
+def check_conformance():
+    """Run the same script on every backend; AssertionError unless all match SQLite step for step"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        sqlite_db = DatabaseManager(db_path, cache_size=0)
+        expected = _conformance_script(sqlite_db)
+        sqlite_db.close()
+        failed = []
+        # Two attached shards at most, so shard eviction gets exercised too
+        for label, db in (('memory', MemoryBackend()),
+                          ('shards', ShardedDatabaseManager(os.path.join(tmp_dir, 'shards'), max_attached=2))):
+            actual = _conformance_script(db)
+            db.close()
+            mismatches = [step for step, (a, b) in enumerate(zip(expected, actual)) if a != b]
+            if len(actual) != len(expected):
+                mismatches.append(min(len(actual), len(expected)))
+            if mismatches:
+                step = mismatches[0]
+                print(f"  {label} conformance FAILED: {len(mismatches)} of {len(expected)} steps differ, "
+                      f"first at step {step}")
+                print(f"    sqlite: {str(expected[step] if step < len(expected) else None)[:300]}")
+                print(f"    {label}: {str(actual[step] if step < len(actual) else None)[:300]}")
+                failed.append(label)
+            else:
+                print(f"  {label} conformance passed: {len(expected)} steps gave identical results")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if failed:
+        raise AssertionError(f"Backends differ from SQLite: {', '.join(failed)}")
+
+
+def bench_backends(rows=100000, ops=5000):
+    """Conformance of the other backends against SQLite, then SQLite and in-memory timed side by side"""
+    # Timings of a backend that gives different answers mean nothing, so a mismatch stops the run
+    check_conformance()
+    tmp_dir, db_path = make_temp_db()
+    try:
+
+        backends = [('sqlite', DatabaseManager(db_path, cache_size=0)),
+                    ('memory', MemoryBackend(snapshot_path=os.path.join(tmp_dir, 'bench.json')))]
+        for label, db in backends:
+            print(f"{label} backend, {rows} rows:")
+            start = time.perf_counter()
+            if label == 'sqlite':
+                populate(db, rows)
+            else:
+                _populate_backend(db, rows)
+            report("load", rows, time.perf_counter() - start)
+
+            timings = [
+                ("create_reservation", lambda i: db.create_reservation(*sample_reservation(rows + i))),
+                ("get_reservation_by_id", lambda i: db.get_reservation_by_id(1 + i * 7919 % rows)),
+                ("update_reservation", lambda i: db.update_reservation(1 + i, *sample_reservation(i))),
+                ("get_reservations_window", lambda i: db.get_reservations_window(i * 50 % rows, 50)),
+                ("search by flight", lambda i: db.search_reservations(flight_number=f"AA{1000 + i % FLIGHTS}")),
+                ("search by name", lambda i: db.search_reservations(name=f"{FIRST_NAMES[i % 30]} Hassan")),
+                ("search by date range", lambda i: db.search_reservations(date_from='2025-01-02',
+                                                                          date_to='2025-01-02')),
+                ("count_reservations", lambda i: db.count_reservations()),
+                ("get_changes_since", lambda i: db.get_changes_since(db.get_change_version() - 100)),
+            ]
+            for name, call in timings:
+                start = time.perf_counter()
+                for i in range(ops):
+                    call(i)
+                report(name, ops, time.perf_counter() - start)
+
+            slow_ops = max(1, ops // 100)
+            for name, call in (("search_passengers", lambda: db.search_passengers("Sofia Rossi")),
+                               ("dashboard", db.reports.dashboard)):
+                start = time.perf_counter()
+                for _ in range(slow_ops):
+                    call()
+                report(name, slow_ops, time.perf_counter() - start)
+
+            if label == 'memory':
+                start = time.perf_counter()
+                db.save_snapshot()
+                report("save_snapshot", 1, time.perf_counter() - start)
+                start = time.perf_counter()
+                MemoryBackend(snapshot_path=db.snapshot_path)
+                report("load snapshot", 1, time.perf_counter() - start)
+                print(f"  {'':<32} snapshot {os.path.getsize(db.snapshot_path) / 1e6:.1f} MB")
+            db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Single-file VACUUM is only timed up to this size; above it the rewrite takes many minutes
+VACUUM_LIMIT = 10000000
+
+
+def bench_shards(rows=datagen.SIZES['50m'], ops=200, data_dir=datagen.DATA_DIR):
+    """Current-month queries and old-month maintenance, one database file vs monthly shards"""
+    source = datagen.dataset_path(data_dir, rows)
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        datagen.ensure_dataset(data_dir, rows)
+        print(f"  generated {os.path.basename(source)} in {time.perf_counter() - start:.1f}s")
+
+    tmp_dir = tempfile.mkdtemp(prefix="flights-bench-")
+    try:
+        db_path = os.path.join(tmp_dir, "flights.db")
+        shutil.copyfile(source, db_path)
+        single = DatabaseManager(db_path)
+        sharded = ShardedDatabaseManager(os.path.join(tmp_dir, 'shards'))
+        start = time.perf_counter()
+        copied = sharded.split_database(source)
+        report("split_database", copied, time.perf_counter() - start)
+
+        # The newest month is only partly booked, the one before it stands in for "this month"
+        months = [month for month in sharded.months if month != 'undated']
+        month = months[-2]
+        date_from, date_to = f"{month}-01", f"{month}-31"
+        print(f"  {rows} rows in {len(months)} monthly shards, current month {month}")
+        with single.pool.connection() as conn:
+            sample = conn.execute('SELECT name, flight_number, departure, destination, date FROM reservations '
+                                  'WHERE date >= ? AND date <= ? LIMIT 10000', (date_from, date_to)).fetchall()
+        sample = random.Random(7).sample(sample, min(ops, len(sample)))
+
+        for label, db in (('single', single), ('sharded', sharded)):
+            def seat_status(i):
+                db.seats.clear()
+                db.get_seat_status(sample[i][1], sample[i][4], '1A')
+
+            def create_delete(i):
+                name, flight_number, departure, destination, date = sample[i]
+                db.delete_reservation(db.create_reservation(name, flight_number, departure, destination, date,
+                                                            f"{100 + i}Z"))
+
+            timings = [
+                ("seat map load", seat_status),
+                ("search month", lambda i: db.search_reservations(date_from=date_from, date_to=date_to)),
+                ("search flight in month", lambda i: db.search_reservations(
+                    flight_number=sample[i][1], date_from=date_from, date_to=date_to)),
+                ("search name in month", lambda i: db.search_reservations(
+                    name=sample[i][0], date_from=date_from, date_to=date_to)),
+                ("create + delete in month", create_delete),
+                ("count_reservations", lambda i: db.count_reservations()),
+            ]
+            print(f"{label}:")
+            for name, call in timings:
+                start = time.perf_counter()
+                for i in range(len(sample)):
+                    call(i)
+                report(name, len(sample), time.perf_counter() - start)
+            slow_ops = max(1, len(sample) // 20)
+            start = time.perf_counter()
+            for _ in range(slow_ops):
+                db.reports.dashboard(date_from, date_to)
+            report("month dashboard", slow_ops, time.perf_counter() - start)
+
+        # Maintenance: the live file is the whole history on one side, a single month on the other
+        current_size = dict((m, size) for m, _, size in sharded.shard_stats())[month]
+        print(f"  live file: single {os.path.getsize(db_path) / 1e6:.1f} MB, "
+              f"current month shard {current_size / 1e6:.1f} MB")
+        start = time.perf_counter()
+        sharded.vacuum_shard(month)
+        report("sharded VACUUM current month", 1, time.perf_counter() - start)
+        if rows <= VACUUM_LIMIT:
+            start = time.perf_counter()
+            with single.pool.connection() as conn:
+                conn.execute('VACUUM')
+            report("single VACUUM", 1, time.perf_counter() - start)
+        else:
+            print(f"  single VACUUM skipped, more than {VACUUM_LIMIT} rows")
+
+        oldest = months[0]
+        start = time.perf_counter()
+        sharded.archive_shard(oldest, os.path.join(tmp_dir, 'archive'))
+        report(f"sharded archive {oldest}", 1, time.perf_counter() - start)
+        start = time.perf_counter()
+        with single.pool.connection() as conn:
+            deleted = conn.execute('DELETE FROM reservations WHERE date >= ? AND date <= ?',
+                                   (f"{oldest}-01", f"{oldest}-31")).rowcount
+            conn.commit()
+        report(f"single DELETE {oldest} ({deleted} rows)", 1, time.perf_counter() - start)
+        single.close()
+        sharded.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_validation(rows=200000):
+    """Validation throughput in one process and across a process pool, per core"""
+    records = []
+    previous = None
+    for i in range(rows):
+        name, flight_number, departure, destination, date, seat_number = sample_reservation(i)
+        # sample_reservation() names repeat; numbering them leaves only the planted duplicates.
+        # Every 100th row repeats the passenger before it, every 50th has a badly written date
+        name = f"{name} {i}"
+        if i % 100 == 42:
+            name, flight_number, date = previous
+        elif i % 50 == 7:
+            date = date.replace('-', '/')
+        previous = (name, flight_number, date)
+        records.append((i + 2, {'name': name, 'flight_number': flight_number, 'departure': departure,
+                                'destination': destination, 'date': date, 'seat_number': seat_number}))
+
+    cores = os.cpu_count() or 1
+    print(f"  {cores} CPU core(s)")
+    for workers in sorted({1, 2, cores}):
+        duplicates = DuplicateFilter()
+        rejected = 0
+        start = time.perf_counter()
+        for line_no, _, values, error, key in validate_stream(iter(records), workers):
+            if error or duplicates.check(key, line_no) is not None:
+                rejected += 1
+        elapsed = time.perf_counter() - start
+        report(f"validate, {workers} worker(s)", rows, elapsed)
+        print(f"  {'':<32} {rows / elapsed / min(workers, cores):8.0f} rows/sec per core, {rejected} rejected")
+
+    # End to end: parsing and inserting stay in the parent, only validation fans out
+    tmp_dir, db_path = make_temp_db()
+    try:
+        source = os.path.join(tmp_dir, 'import.jsonl')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for _, record in records)
+        for workers in sorted({1, cores}):
+            db = DatabaseManager(os.path.join(tmp_dir, f'import-{workers}.db'))
+            result = bulk.import_reservations(db, source, workers=workers)
+            report(f"import, {workers} worker(s)", result.rows_read, result.seconds)
+            db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_backup(rows=datagen.SIZES['10m'], data_dir=datagen.DATA_DIR, idle_seconds=5.0):
+    """Booking latency while a multi-GB database is backed up: file copy, one-step and paged backup API"""
+    source = datagen.dataset_path(data_dir, rows)
+    if not os.path.exists(source):
+        start = time.perf_counter()
+        datagen.ensure_dataset(data_dir, rows)
+        print(f"  generated {os.path.basename(source)} in {time.perf_counter() - start:.1f}s")
+
+    tmp_dir = tempfile.mkdtemp(prefix="flights-bench-")
+    try:
+        db_path = os.path.join(tmp_dir, "flights.db")
+        shutil.copyfile(source, db_path)
+        db = DatabaseManager(db_path)
+        print(f"  {rows} rows, {os.path.getsize(db_path) / 1e9:.2f} GB")
+        offset = rows
+
+        def copy_file(path):
+            # What "backing up" meant before: may catch the file mid-transaction
+            shutil.copyfile(db_path, path)
+
+        runs = [
+            ("no backup", lambda path: time.sleep(idle_seconds)),
+            ("file copy", copy_file),
+            ("backup, one step", lambda path: backup.backup_database(db, path, pages=-1, pause=0)),
+            (f"backup, {backup.BACKUP_PAGES} pages/step", lambda path: backup.backup_database(db, path)),
+        ]
+        for label, run in runs:
+            # A booking client keeps writing while the backup runs
+            stop = threading.Event()
+            latencies = []
+
+            def book():
+                i = 0
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    db.create_reservation(*sample_reservation(offset + i))
+                    latencies.append(time.perf_counter() - start)
+                    i += 1
+                    time.sleep(0.001)
+
+            writer = threading.Thread(target=book)
+            writer.start()
+            path = os.path.join(tmp_dir, "backup.db")
+            start = time.perf_counter()
+            result = run(path)
+            seconds = time.perf_counter() - start
+            stop.set()
+            writer.join()
+            offset += len(latencies)
+            if os.path.exists(path):
+                os.remove(path)
+
+            restarts = f"  restarts {result.restarts}" if result else ""
+            print(f"  {label:<26} {seconds:7.2f}s  bookings {len(latencies):>6}  "
+                  f"p50 {percentile(latencies, 50) * 1000:6.2f} ms  p99 {percentile(latencies, 99) * 1000:7.2f} ms  "
+                  f"max {max(latencies) * 1000:8.1f} ms{restarts}")
+
+        # Restore goes the other way: snapshot a copy, then write it back over the live file
+        path = os.path.join(tmp_dir, "snapshot.db")
+        backup.backup_database(db, path)
+        start = time.perf_counter()
+        backup.verify_backup(path, quick=False)
+        print(f"  {'full integrity check':<26} {time.perf_counter() - start:7.2f}s")
+        result = backup.restore_database(db, path)
+        print(f"  {'restore':<26} {result.seconds:7.2f}s")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_change_stream(rows=100000, ops=20000, seconds=10.0):
+    """Write cost of the change event triggers, and consumer lag under sustained bookings"""
+    tmp_dir, db_path = make_temp_db()
+    try:
+        db = DatabaseManager(db_path)
+        populate(db, rows)
+        offset = rows
+
+        for enabled in (False, True):
+            if enabled:
+                db.events.enable()
+            label = "events on " if enabled else "events off"
+            start = time.perf_counter()
+            ids = [db.create_reservation(*sample_reservation(offset + i)) for i in range(ops)]
+            report(f"{label} create_reservation", ops, time.perf_counter() - start)
+            start = time.perf_counter()
+            for i, reservation_id in enumerate(ids):
+                db.update_reservation(reservation_id, *sample_reservation(offset + ops + i))
+            report(f"{label} update_reservation", ops, time.perf_counter() - start)
+            start = time.perf_counter()
+            for reservation_id in ids:
+                db.delete_reservation(reservation_id)
+            report(f"{label} delete_reservation", ops, time.perf_counter() - start)
+            offset += 2 * ops
+
+        # One thread books as fast as it can while a consumer tails the stream
+        consumer = db.events.consumer('bench', start='latest')
+        stop = threading.Event()
+        lags = []
+        booked = [0]
+
+        def book():
+            i = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                db.create_reservation(*sample_reservation(offset + i))
+                i += 1
+            booked[0] = i
+            stop.set()
+
+        writer = threading.Thread(target=book)
+        writer.start()
+        consumed = 0
+        for events in consumer.tail(stop, poll_interval=0.01):
+            now = time.time()
+            lags.extend(now - event.created for event in events)
+            consumed += len(events)
+        writer.join()
+        # Whatever was written after the last poll
+        for events in iter(consumer.poll, []):
+            now = time.time()
+            lags.extend(now - event.created for event in events)
+            consumed += len(events)
+        behind = consumer.lag()
+        print(f"  {booked[0]} bookings in {seconds:.0f}s ({booked[0] / seconds:.0f}/s), {consumed} events consumed, "
+              f"{behind} behind at the end")
+        print(f"  consumer lag p50 {percentile(lags, 50) * 1000:7.2f} ms  p99 {percentile(lags, 99) * 1000:7.2f} ms  "
+              f"max {max(lags) * 1000:8.2f} ms")
+
+        start = time.perf_counter()
+        removed = db.events.compact()
+        print(f"  compact removed {removed} events in {(time.perf_counter() - start) * 1000:.1f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'backup': bench_backup,
+    'change_stream': bench_change_stream,
+    'conformance': check_conformance,
+    'connections': bench_connections,
+    'concurrent_writers': bench_concurrent_writers,
+    'metrics': bench_metrics,
+    'migrations': bench_migrations,
+    'optimistic_updates': bench_optimistic_updates,
+    'pagination': bench_pagination,
+    'virtual_window': bench_virtual_window,
+    'incremental_sync': bench_incremental_sync,
+    'backends': bench_backends,
+    'bulk': bench_bulk,
+    'seats': bench_seats,
+    'flight_catalog': bench_flight_catalog,
+    'group_commit': bench_group_commit,
+    'record_memory': bench_record_memory,
+    'reports': bench_reports,
+    'reservation_cache': bench_reservation_cache,
+    'search': bench_search,
+    'server': bench_server,
+    'shards': bench_shards,
+    'startup': bench_startup,
+    'validation': bench_validation,
+}
+
+
+def main():
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description="Flight Reservation System benchmarks")
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f"benchmarks to run (default: all): {', '.join(sorted(BENCHMARKS))}")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    for name in args.names or sorted(BENCHMARKS):
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
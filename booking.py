@@ -1,118 +1,218 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-
-
-class BookingPage(tk.Frame):
-    def __init__(self, parent, controller, db):
-        tk.Frame.__init__(self, parent)
-        self.controller = controller
-        self.db = db
-        self.setup_ui()
-
-    def setup_ui(self):
-        """Setup the booking page UI"""
-        # Main container
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(expand=True, fill='both')
-
-        # Header frame
-        header_frame = ttk.Frame(main_frame)
-        header_frame.pack(fill='x', pady=(0, 20))
-
-        # Title
-        title_label = ttk.Label(header_frame, text="Book New Flight",
-                                style='Title.TLabel')
-        title_label.pack(side='left')
-
-        # Back button
-        back_btn = ttk.Button(header_frame, text="← Back to Home",
-                              command=lambda: self.controller.show_frame("HomePage"))
-        back_btn.pack(side='right')
-
-        # Form frame
-        form_frame = ttk.LabelFrame(main_frame, text="Flight Information", padding="20")
-        form_frame.pack(fill='both', expand=True)
-
-        # Create entry fields
-        self.entries = {}
-        fields = [
-            ('Name', 'Passenger full name'),
-            ('Flight Number', 'e.g., AA1234'),
-            ('Departure', 'Departure city'),
-            ('Destination', 'Destination city'),
-            ('Date', 'YYYY-MM-DD format'),
-            ('Seat Number', 'e.g., 12A')
-        ]
-
-        for i, (field, placeholder) in enumerate(fields):
-            # Label
-            label = ttk.Label(form_frame, text=f"{field}:")
-            label.grid(row=i, column=0, sticky='w', pady=5, padx=(0, 10))
-
-            # Entry
-            entry = ttk.Entry(form_frame, width=30, font=('Arial', 11))
-            entry.grid(row=i, column=1, sticky='ew', pady=5)
-            entry.insert(0, '')  # Clear any placeholder
-
-            # Placeholder hint
-            hint_label = ttk.Label(form_frame, text=f"({placeholder})",
-                                   font=('Arial', 9), foreground='gray')
-            hint_label.grid(row=i, column=2, sticky='w', pady=5, padx=(10, 0))
-
-            self.entries[field] = entry
-
-        # Configure column weights
-        form_frame.columnconfigure(1, weight=1)
-
-        # Buttons frame
-        buttons_frame = ttk.Frame(main_frame)
-        buttons_frame.pack(fill='x', pady=20)
-
-        # Book button
-        book_btn = ttk.Button(buttons_frame, text="✈️ Book Flight",
-                              command=self.book_flight,
-                              style='Action.TButton')
-        book_btn.pack(side='left', padx=(0, 10))
-
-        # Clear button
-        clear_btn = ttk.Button(buttons_frame, text="🗑️ Clear Form",
-                               command=self.clear_form)
-        clear_btn.pack(side='left')
-
-    def book_flight(self):
-        """Book a new flight reservation"""
-        try:
-            # Get values from entries
-            values = {}
-            for field, entry in self.entries.items():
-                value = entry.get().strip()
-                if not value:
-                    messagebox.showerror("Error", f"Please fill the {field} field!")
-                    entry.focus()
-                    return
-                values[field] = value
-
-            # Save to database
-            self.db.create_reservation(
-                values['Name'],
-                values['Flight Number'],
-                values['Departure'],
-                values['Destination'],
-                values['Date'],
-                values['Seat Number']
-            )
-
-            messagebox.showinfo("Success", "Flight booked successfully!")
-            self.clear_form()
-
-            # Ask if user wants to view reservations
-            if messagebox.askyesno("Success", "Would you like to view all reservations?"):
-                self.controller.show_frame("ReservationsPage")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to book flight: {str(e)}")
-
-    def clear_form(self):
-        """Clear all form fields"""
-        for entry in self.entries.values():
-            entry.delete(0, tk.END)
\ No newline at end of file
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from seat_map import SeatTakenError
+from seat_status import SeatStatusLabel
+from validation import ValidationError, clean_form, find_duplicate
+
+
+class BookingPage(tk.Frame):
+    def __init__(self, parent, controller, db):
+        tk.Frame.__init__(self, parent)
+        self.controller = controller
+        self.db = db
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the booking page UI"""
+        # Main container
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill='both')
+
+        # Header frame
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill='x', pady=(0, 20))
+
+        # Title
+        title_label = ttk.Label(header_frame, text="Book New Flight",
+                                style='Title.TLabel')
+        title_label.pack(side='left')
+
+        # Back button
+        back_btn = ttk.Button(header_frame, text="← Back to Home",
+                              command=lambda: self.controller.show_frame("HomePage"))
+        back_btn.pack(side='right')
+
+        # Form frame
+        form_frame = ttk.LabelFrame(main_frame, text="Flight Information", padding="20")
+        form_frame.pack(fill='both', expand=True)
+
+        # Create entry fields
+        self.entries = {}
+        fields = [
+            ('Name', 'Passenger full name'),
+            ('Flight Number', 'e.g., AA1234'),
+            ('Departure', 'Departure city'),
+            ('Destination', 'Destination city'),
+            ('Date', 'YYYY-MM-DD format'),
+            ('Seat Number', 'e.g., 12A')
+        ]
+
+        for i, (field, placeholder) in enumerate(fields):
+            # Label
+            label = ttk.Label(form_frame, text=f"{field}:")
+            label.grid(row=i, column=0, sticky='w', pady=5, padx=(0, 10))
+
+            # Entry (flight numbers autocomplete from the flights catalogue)
+            if field == 'Flight Number':
+                entry = ttk.Combobox(form_frame, width=28, font=('Arial', 11))
+            else:
+                entry = ttk.Entry(form_frame, width=30, font=('Arial', 11))
+            entry.grid(row=i, column=1, sticky='ew', pady=5)
+            entry.insert(0, '')  # Clear any placeholder
+
+            # Placeholder hint
+            hint_label = ttk.Label(form_frame, text=f"({placeholder})",
+                                   font=('Arial', 9), foreground='gray')
+            hint_label.grid(row=i, column=2, sticky='w', pady=5, padx=(10, 0))
+
+            self.entries[field] = entry
+
+        # Catalogue lookups for the flight number field
+        self.known_flight = None
+        flight_entry = self.entries['Flight Number']
+        flight_entry.bind('<FocusIn>', self.load_flight_numbers, add='+')
+        flight_entry.bind('<KeyRelease>', self.complete_flight_number, add='+')
+        flight_entry.bind('<FocusOut>', self.check_flight, add='+')
+        flight_entry.bind('<<ComboboxSelected>>', self.check_flight, add='+')
+
+        # Live seat availability under the form
+        self.seat_status = SeatStatusLabel(form_frame, self.controller, self.db, self.entries)
+        self.seat_status.grid(row=len(fields), column=1, sticky='w', pady=(5, 0))
+
+        # Configure column weights
+        form_frame.columnconfigure(1, weight=1)
+
+        # Buttons frame
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(fill='x', pady=20)
+
+        # Book button
+        self.book_btn = ttk.Button(buttons_frame, text="✈️ Book Flight",
+                                   command=self.book_flight,
+                                   style='Action.TButton')
+        self.book_btn.pack(side='left', padx=(0, 10))
+
+        # Clear button
+        clear_btn = ttk.Button(buttons_frame, text="🗑️ Clear Form",
+                               command=self.clear_form)
+        clear_btn.pack(side='left')
+
+    def book_flight(self):
+        """Book a new flight reservation"""
+        try:
+            # Get values from entries, checked and normalised
+            try:
+                values = clean_form({field: entry.get() for field, entry in self.entries.items()})
+            except ValidationError as e:
+                messagebox.showerror("Error", str(e))
+                self.entries[e.label].focus()
+                return
+
+            # Known flights should keep their usual route
+            flight = self.known_flight
+            if (flight and flight.flight_number == values['Flight Number']
+                    and (flight.departure, flight.destination) != (values['Departure'], values['Destination'])):
+                if not messagebox.askyesno(
+                        "Check Route",
+                        f"Flight {flight.flight_number} normally flies {flight.departure} → {flight.destination}.\n\n"
+                        f"Book it as {values['Departure']} → {values['Destination']} anyway?"):
+                    return
+
+            # Look for the same passenger on the same flight first, on the worker thread
+            self.set_loading(True)
+            self.controller.worker.submit(
+                find_duplicate, self.db, values['Name'], values['Flight Number'], values['Date'],
+                callback=lambda duplicate: self.save_booking(values, duplicate),
+                errback=self.on_book_failed
+            )
+
+        except Exception as e:
+            self.set_loading(False)
+            messagebox.showerror("Error", f"Failed to book flight: {str(e)}")
+
+    def save_booking(self, values, duplicate):
+        """Create the reservation once the duplicate check is back, asking first if it found one"""
+        if duplicate and not messagebox.askyesno(
+                "Possible Duplicate",
+                f"{duplicate.name} is already booked on flight {duplicate.flight_number} for {duplicate.date} "
+                f"(seat {duplicate.seat_number}).\n\nBook another seat anyway?"):
+            self.set_loading(False)
+            return
+
+        # Save to database on the worker thread
+        self.controller.worker.submit(
+            self.db.create_reservation,
+            values['Name'],
+            values['Flight Number'],
+            values['Departure'],
+            values['Destination'],
+            values['Date'],
+            values['Seat Number'],
+            callback=self.on_booked,
+            errback=self.on_book_failed
+        )
+
+    def on_booked(self, result):
+        """Called on the Tk thread once the booking is saved"""
+        self.set_loading(False)
+        messagebox.showinfo("Success", "Flight booked successfully!")
+        self.clear_form()
+
+        # Ask if user wants to view reservations
+        if messagebox.askyesno("Success", "Would you like to view all reservations?"):
+            self.controller.show_frame("ReservationsPage")
+
+    def on_book_failed(self, error):
+        """Called on the Tk thread if the booking could not be saved"""
+        self.set_loading(False)
+        messagebox.showerror("Error", f"Failed to book flight: {str(error)}")
+
+        # Someone else got the seat first; show what is still free
+        if isinstance(error, SeatTakenError):
+            self.seat_status.check()
+
+    def set_loading(self, loading):
+        """Show or clear the busy state while a booking is being saved"""
+        if loading:
+            self.book_btn.config(state='disabled', text="⏳ Booking...")
+            self.config(cursor='watch')
+        else:
+            self.book_btn.config(state='normal', text="✈️ Book Flight")
+            self.config(cursor='')
+
+    def load_flight_numbers(self, event=None):
+        """Load flight numbers for autocomplete the first time the field is used"""
+        if not self.db.flights.loaded:
+            self.controller.worker.submit(self.db.flights.load_numbers)
+
+    def complete_flight_number(self, event=None):
+        """Offer catalogue flight numbers matching what has been typed"""
+        flight_entry = self.entries['Flight Number']
+        flight_entry['values'] = self.db.flights.complete(flight_entry.get().strip())
+
+    def check_flight(self, event=None):
+        """Look the flight up in the catalogue and fill in its route"""
+        flight_number = self.entries['Flight Number'].get().strip()
+        self.known_flight = None
+        if flight_number:
+            self.controller.worker.submit(self.db.flights.lookup, flight_number,
+                                          callback=self.on_flight_found)
+
+    def on_flight_found(self, flight):
+        """Fill empty route fields from the catalogue entry"""
+        if flight is None or flight.flight_number != self.entries['Flight Number'].get().strip():
+            return
+        self.known_flight = flight
+
+        for field, value in (('Departure', flight.departure), ('Destination', flight.destination)):
+            entry = self.entries[field]
+            if not entry.get().strip():
+                entry.insert(0, value)
+
+    def clear_form(self):
+        """Clear all form fields"""
+        for entry in self.entries.values():
+            entry.delete(0, tk.END)
+        self.seat_status.clear()
+        self.known_flight = None
\ No newline at end of file
@@ -0,0 +1,201 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+from database import INSERT_RESERVATION_SQL, RESERVATION_COLUMNS, UPSERT_FLIGHT_SQL, DatabaseManager
+from seat_map import SeatTakenError
+from sharding import ShardedDatabaseManager
+from validation import FIELDS, DuplicateFilter, validate_stream
+
+EXPORT_FIELDS = ('id',) + FIELDS
+
+# Only this many rejected rows are kept in memory for the report
+MAX_REPORTED_REJECTS = 1000
+
+
+class BulkResult:
+    """Counters and rejected rows from one import or export"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.exported = 0
+        self.rejected = 0
+        self.rejects = []   # (line number, reason, raw record), capped
+        self.seconds = 0.0
+
+    def reject(self, line_no, reason, record):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((line_no, reason, record))
+
+    @property
+    def rows_per_second(self):
+        rows = self.imported or self.exported
+        return rows / self.seconds if self.seconds else 0.0
+
+
+def detect_format(path, fmt=None):
+    """Pick csv or jsonl from an explicit format or the file extension"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Unsupported format: {fmt or path} (use csv or jsonl)")
+    return fmt
+
+
+def read_records(path, fmt):
+    """Stream (line number, record) pairs from a CSV or JSONL file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+
+
+def _insert_batch(conn, batch, result):
+    """Insert one chunk in a single transaction, isolating bad rows if it fails"""
+    # Catalogue entries first so every row can link its flight_id
+    flights = {values[1]: (values[1], values[2], values[3]) for _, values in batch}
+    conn.executemany(UPSERT_FLIGHT_SQL, flights.values())
+
+    try:
+        conn.executemany(INSERT_RESERVATION_SQL, [values for _, values in batch])
+        conn.commit()
+        result.imported += len(batch)
+        return
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        conn.executemany(UPSERT_FLIGHT_SQL, flights.values())
+
+    # Some row broke a constraint: retry one by one so the rest still goes in
+    for line_no, values in batch:
+        try:
+            conn.execute(INSERT_RESERVATION_SQL, values)
+            result.imported += 1
+        except sqlite3.IntegrityError as e:
+            result.reject(line_no, str(e), dict(zip(FIELDS, values)))
+    conn.commit()
+
+
+def _single_file(db):
+    """Whether db keeps every reservation in one table that batches can be written to directly"""
+    return isinstance(db, DatabaseManager) and not isinstance(db, ShardedDatabaseManager)
+
+
+def _valid_batches(numbered_records, batch_size, workers, result):
+    """Yield lists of (line number, values) that passed validation; rejects go into result"""
+    duplicates = DuplicateFilter()
+    batch = []
+    for line_no, record, values, error, key in validate_stream(numbered_records, workers):
+        result.rows_read += 1
+        if error:
+            result.reject(line_no, error, record if isinstance(record, dict) else None)
+            continue
+        first = duplicates.check(key, line_no)
+        if first is not None:
+            result.reject(line_no, f"Duplicate of line {first}: same passenger, flight and date",
+                          dict(zip(FIELDS, values)))
+            continue
+
+        batch.append((line_no, values))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_each(db, batch, result):
+    """Insert a chunk through the backend's create_reservation, rejecting rows it refuses"""
+    for line_no, values in batch:
+        try:
+            db.create_reservation(*values)
+            result.imported += 1
+        except (SeatTakenError, sqlite3.IntegrityError) as e:
+            result.reject(line_no, str(e), dict(zip(FIELDS, values)))
+
+
+def import_reservations(db, path, fmt=None, batch_size=5000, workers=1):
+    """Stream reservations from a file into the database in chunked transactions
+
+    Rows are validated in a pool of worker processes when workers > 1; inserts stay on
+    this connection, in file order. The memory and sharded backends get one
+    create_reservation call per row instead.
+    """
+    fmt = detect_format(path, fmt)
+    result = BulkResult()
+    start = time.perf_counter()
+    batches = _valid_batches(read_records(path, fmt), batch_size, workers, result)
+
+    if _single_file(db):
+        with db.pool.connection() as conn:
+            for batch in batches:
+                _insert_batch(conn, batch, result)
+        # Cached seat maps and flights don't know about the imported bookings
+        db.seats.clear()
+        db.flights.clear()
+    else:
+        for batch in batches:
+            _insert_each(db, batch, result)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _export_chunks(db, fetch_size):
+    """Lists of reservation rows in id order, fetch_size at a time"""
+    if _single_file(db):
+        with db.pool.connection() as conn:
+            cursor = conn.execute(f'SELECT {RESERVATION_COLUMNS} FROM reservations ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                yield rows
+    else:
+        # The memory and sharded backends hand back every row at once, newest first
+        rows = db.get_all_reservations()
+        rows.reverse()
+        for start in range(0, len(rows), fetch_size):
+            yield rows[start:start + fetch_size]
+
+
+def export_reservations(db, path, fmt=None, fetch_size=5000):
+    """Stream every reservation to a file; a single-file database is never loaded whole into memory"""
+    fmt = detect_format(path, fmt)
+    result = BulkResult()
+    start = time.perf_counter()
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(EXPORT_FIELDS)
+
+        for rows in _export_chunks(db, fetch_size):
+            if writer:
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in rows)
+            result.exported += len(rows)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def write_rejects(result, path):
+    """Save rejected rows as JSONL for fixing and re-importing"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for line_no, reason, record in result.rejects:
+            f.write(json.dumps({'line': line_no, 'error': reason, 'record': record}) + '\n')
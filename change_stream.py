@@ -0,0 +1,262 @@
+import json
+import sqlite3
+import time
+
+EVENTS_TABLE = 'reservation_events'
+
+# Seconds since the epoch with a fractional part, for consumer lag
+NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def _row_json(row):
+    return (f"json_object('id', {row}.id, 'name', {row}.name, 'flight_number', {row}.flight_number, "
+            f"'departure', {row}.departure, 'destination', {row}.destination, 'date', {row}.date, "
+            f"'seat_number', {row}.seat_number, 'version', {row}.version)")
+
+
+# Append-only event log with a full row image per change, kept by triggers once enabled
+EVENTS_DDL = [
+    f'''
+    CREATE TABLE IF NOT EXISTS {EVENTS_TABLE}
+    (
+        seq            INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INTEGER NOT NULL,
+        operation      TEXT    NOT NULL,
+        row            TEXT    NOT NULL,
+        created        REAL    NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS event_consumers
+    (
+        name    TEXT PRIMARY KEY,
+        seq     INTEGER NOT NULL,
+        updated REAL    NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {EVENTS_TABLE}_insert
+        AFTER INSERT ON reservations
+    BEGIN
+        INSERT INTO {EVENTS_TABLE} (reservation_id, operation, row, created)
+        VALUES (NEW.id, 'insert', {_row_json('NEW')}, {NOW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {EVENTS_TABLE}_update
+        AFTER UPDATE OF name, flight_number, departure, destination, date, seat_number ON reservations
+    BEGIN
+        INSERT INTO {EVENTS_TABLE} (reservation_id, operation, row, created)
+        VALUES (NEW.id, 'update', {_row_json('NEW')}, {NOW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {EVENTS_TABLE}_delete
+        AFTER DELETE ON reservations
+    BEGIN
+        INSERT INTO {EVENTS_TABLE} (reservation_id, operation, row, created)
+        VALUES (OLD.id, 'delete', {_row_json('OLD')}, {NOW});
+    END
+    ''',
+]
+
+
+class ChangeEvent:
+    """One committed create, update or delete, with the row as it was written (or deleted)"""
+
+    __slots__ = ('seq', 'reservation_id', 'operation', 'row', 'created')
+
+    def __init__(self, seq, reservation_id, operation, row, created):
+        self.seq = seq
+        self.reservation_id = reservation_id
+        self.operation = operation      # 'insert', 'update' or 'delete'
+        self.row = json.loads(row)      # column -> value
+        self.created = created          # commit time, seconds since the epoch
+
+    def __repr__(self):
+        return f"ChangeEvent({self.seq}, {self.operation} {self.reservation_id})"
+
+
+class ChangeStream:
+    """Change-data-capture log of reservation writes, for billing, notifications and the like
+
+    Triggers append an event in the same transaction as the write, so every committed
+    change is logged exactly once, whichever process made it. Events are keyed by
+    reservation id: treat inserts and updates as upserts of the row, deletes as removals.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _has_log(self, conn):
+        # The tables are created the first time the stream is enabled and kept after disabling
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_consumers'"
+                            ).fetchone() is not None
+
+    def enabled(self):
+        with self.db.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                (f'{EVENTS_TABLE}_insert',)).fetchone() is not None
+
+    def enable(self):
+        """Create the event log and its triggers; events start with the next write"""
+        with self.db.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in EVENTS_DDL:
+                    cursor.execute(statement)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+    def disable(self):
+        """Stop logging; the events already logged and the consumer offsets are kept"""
+        with self.db.pool.connection() as conn:
+            for action in ('insert', 'update', 'delete'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {EVENTS_TABLE}_{action}')
+            conn.commit()
+
+    def latest(self):
+        """Sequence number of the newest event ever logged, 0 if there are none"""
+        # AUTOINCREMENT's high-water mark survives compaction deleting the newest events
+        with self.db.pool.connection() as conn:
+            row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (EVENTS_TABLE,)).fetchone()
+        return row[0] if row else 0
+
+    def read(self, after, limit=500):
+        """Up to limit events with seq greater than after, oldest first"""
+        with self.db.pool.connection() as conn:
+            if not self._has_log(conn):
+                return []
+            rows = conn.execute(f'''
+                                SELECT seq, reservation_id, operation, row, created
+                                FROM {EVENTS_TABLE}
+                                WHERE seq > ?
+                                ORDER BY seq
+                                LIMIT ?
+                                ''', (after, limit)).fetchall()
+        return [ChangeEvent(*row) for row in rows]
+
+    def consumer(self, name, start='earliest'):
+        """A named consumer, resuming from its saved offset"""
+        return ChangeConsumer(self, name, start)
+
+    def consumers(self):
+        """(name, seq, sequence numbers behind the latest event) for every registered consumer"""
+        latest = self.latest()
+        with self.db.pool.connection() as conn:
+            if not self._has_log(conn):
+                return []
+            return [(name, seq, latest - seq)
+                    for name, seq in conn.execute('SELECT name, seq FROM event_consumers ORDER BY name')]
+
+    def drop_consumer(self, name):
+        """Forget a consumer, so its offset no longer holds events back from compaction"""
+        with self.db.pool.connection() as conn:
+            if not self._has_log(conn):
+                return False
+            deleted = conn.execute('DELETE FROM event_consumers WHERE name = ?', (name,)).rowcount
+            conn.commit()
+        return deleted > 0
+
+    def compact(self, batch_size=50000):
+        """Shrink the log; returns the number of events removed
+
+        Events every consumer has committed are deleted. Of the rest, only the newest
+        event per reservation is kept, so a consumer that is behind skips straight to
+        each row's latest state. Deletes run in batches to keep writers moving.
+        """
+        removed = 0
+        with self.db.pool.connection() as conn:
+            if not self._has_log(conn):
+                return 0
+            acknowledged = conn.execute('SELECT MIN(seq) FROM event_consumers').fetchone()[0]
+            while acknowledged:
+                count = conn.execute(f'''
+                                     DELETE FROM {EVENTS_TABLE}
+                                     WHERE seq IN (SELECT seq FROM {EVENTS_TABLE} WHERE seq <= ? LIMIT ?)
+                                     ''', (acknowledged, batch_size)).rowcount
+                conn.commit()
+                removed += count
+                if count < batch_size:
+                    break
+
+            # Superseded events: older than another event for the same reservation. Found in one
+            # pass; new events only ever supersede more, so the list stays valid while deleting
+            superseded = [seq for (seq,) in conn.execute(f'''
+                                                         SELECT seq FROM {EVENTS_TABLE}
+                                                         WHERE seq NOT IN (SELECT MAX(seq) FROM {EVENTS_TABLE}
+                                                                           GROUP BY reservation_id)
+                                                         ''')]
+            for start in range(0, len(superseded), batch_size):
+                batch = superseded[start:start + batch_size]
+                removed += conn.execute(f'DELETE FROM {EVENTS_TABLE} WHERE seq IN (SELECT value FROM json_each(?))',
+                                        (json.dumps(batch),)).rowcount
+                conn.commit()
+        return removed
+
+
+class ChangeConsumer:
+    """Reads the change stream in order and remembers how far it got
+
+    Offsets are saved in the database under the consumer's name, so a restarted
+    consumer resumes where it left off. Delivery is at-least-once: a batch that was
+    read but not committed is read again after a restart.
+    """
+
+    def __init__(self, stream, name, start='earliest'):
+        if start not in ('earliest', 'latest'):
+            raise ValueError(f"Invalid start: {start} (use earliest or latest)")
+        self.stream = stream
+        self.name = name
+        with stream.db.pool.connection() as conn:
+            if not stream._has_log(conn):
+                raise ValueError("Change events have never been enabled (manage.py events on)")
+            saved = conn.execute('SELECT seq FROM event_consumers WHERE name = ?', (name,)).fetchone()
+        if saved:
+            self.position = saved[0]
+        else:
+            self.position = stream.latest() if start == 'latest' else 0
+            self.commit(self.position)
+
+    def poll(self, limit=500):
+        """The next events after the current position; call commit() once they are handled"""
+        events = self.stream.read(self.position, limit)
+        if events:
+            self.position = events[-1].seq
+        return events
+
+    def commit(self, seq=None):
+        """Save the offset (default: the last event polled)"""
+        if seq is None:
+            seq = self.position
+        with self.stream.db.pool.connection() as conn:
+            conn.execute('''
+                         INSERT INTO event_consumers (name, seq, updated) VALUES (?, ?, ?)
+                         ON CONFLICT (name) DO UPDATE SET seq = excluded.seq, updated = excluded.updated
+                         ''', (self.name, seq, time.time()))
+            conn.commit()
+
+    def seek(self, seq):
+        """Move to just after seq; takes effect for the offset at the next commit"""
+        self.position = seq
+
+    def lag(self):
+        """Sequence numbers between the latest event and this consumer's position"""
+        return self.stream.latest() - self.position
+
+    def tail(self, stop, poll_interval=0.1, limit=500):
+        """Yield batches of events as they are written, until the stop Event is set
+
+        Each batch's offset is committed when the next batch is asked for, so a batch
+        that was being handled when the consumer died is delivered again.
+        """
+        while not stop.is_set():
+            events = self.poll(limit)
+            if events:
+                yield events
+                self.commit()
+            else:
+                stop.wait(poll_interval)
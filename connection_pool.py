@@ -0,0 +1,161 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolClosedError(Exception):
+    """Raised when a connection is requested from a closed pool"""
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Fixed-size pool of persistent SQLite connections"""
+
+    def __init__(self, factory, size=5, timeout=30.0, health_check_interval=30.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        # Idle connections, most recently used first so hot connections stay warm
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._last_checked = {}
+        self._closed = False
+
+    def _create(self):
+        """Open a new connection if the pool has room for it"""
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        self._last_checked[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        self._last_checked.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _is_healthy(self, conn):
+        """Run a trivial query to make sure the connection still works"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Take a connection out of the pool"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed")
+
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._create()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+                try:
+                    conn = self._idle.get(timeout=min(remaining, 0.1))
+                except queue.Empty:
+                    continue
+
+            # Health check connections that have been idle for a while
+            now = time.monotonic()
+            if now - self._last_checked.get(id(conn), 0) >= self.health_check_interval:
+                if not self._is_healthy(conn):
+                    self._discard(conn)
+                    continue
+                self._last_checked[id(conn)] = now
+            return conn
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        if self._closed:
+            self._discard(conn)
+            return
+
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._discard(conn)
+                return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def check_health(self):
+        """Health check every idle connection, replacing broken ones"""
+        checked = []
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+        healthy = 0
+        for conn in checked:
+            if self._is_healthy(conn):
+                self._last_checked[id(conn)] = time.monotonic()
+                self.release(conn)
+                healthy += 1
+            else:
+                self._discard(conn)
+        return healthy
+
+    def stats(self):
+        """Get pool usage numbers"""
+        return {
+            'size': self.size,
+            'open': self._created,
+            'idle': self._idle.qsize(),
+            'closed': self._closed,
+        }
+
+    def close(self):
+        """Close all idle connections; busy ones are closed when released"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,138 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class DashboardPage(tk.Frame):
+    def __init__(self, parent, controller, db):
+        tk.Frame.__init__(self, parent)
+        self.controller = controller
+        self.db = db
+        self.refresh_generation = 0
+        self.loaded_version = None  # change log version the reports were built from
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the dashboard page UI"""
+        # Main container
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill='both')
+
+        # Header frame
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill='x', pady=(0, 20))
+
+        title_label = ttk.Label(header_frame, text="Dashboard", style='Title.TLabel')
+        title_label.pack(side='left')
+
+        back_btn = ttk.Button(header_frame, text="← Back to Home",
+                              command=lambda: self.controller.show_frame("HomePage"))
+        back_btn.pack(side='right')
+
+        # Date range filter
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.pack(fill='x', pady=(0, 10))
+
+        self.date_entries = {}
+        for label in ('From', 'To'):
+            ttk.Label(filter_frame, text=f"{label} (YYYY-MM-DD):").pack(side='left', padx=(0, 5))
+            entry = ttk.Entry(filter_frame, width=12, font=('Arial', 11))
+            entry.pack(side='left', padx=(0, 15))
+            entry.bind('<Return>', lambda e: self.refresh_data())
+            self.date_entries[label] = entry
+
+        refresh_btn = ttk.Button(filter_frame, text="🔄 Refresh", command=self.refresh_data)
+        refresh_btn.pack(side='left')
+
+        # One tab per report
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill='both', expand=True)
+
+        self.load_tree = self.add_report_tab(notebook, "Load Factors",
+                                             ('Flight', 'Date', 'Booked', 'Capacity', 'Load'))
+        self.route_tree = self.add_report_tab(notebook, "Routes by Day",
+                                              ('Departure', 'Destination', 'Date', 'Bookings'))
+        self.destination_tree = self.add_report_tab(notebook, "Top Destinations",
+                                                    ('Destination', 'Bookings'))
+
+        # Info label
+        self.info_label = ttk.Label(main_frame, text="", font=('Arial', 10))
+        self.info_label.pack(pady=10)
+
+    def add_report_tab(self, notebook, title, columns):
+        """Add a tab holding one report table"""
+        tab = ttk.Frame(notebook)
+        notebook.add(tab, text=title)
+
+        tree = ttk.Treeview(tab, columns=columns, show='headings', height=15)
+        for col in columns:
+            tree.heading(col, text=col, anchor='center')
+            tree.column(col, width=120, anchor='center')
+
+        scrollbar = ttk.Scrollbar(tab, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(0, weight=1)
+        return tree
+
+    def sync_data(self):
+        """Keep the reports on screen unless bookings changed since they were built"""
+        if self.loaded_version is None:
+            self.refresh_data()
+            return
+        # Without summary tables the reports take seconds on a big database, and every
+        # booking queued on the worker would wait behind them
+        generation = self.refresh_generation
+        self.controller.worker.submit(
+            self.db.get_change_version,
+            callback=lambda version: self.on_version_checked(generation, version)
+        )
+
+    def on_version_checked(self, generation, version):
+        if generation == self.refresh_generation and version != self.loaded_version:
+            self.refresh_data()
+
+    def refresh_data(self):
+        """Load all reports on the worker thread"""
+        self.refresh_generation += 1
+        generation = self.refresh_generation
+        date_from = self.date_entries['From'].get().strip() or None
+        date_to = self.date_entries['To'].get().strip() or None
+
+        self.info_label.config(text="Loading reports...")
+        self.controller.worker.submit(
+            self.load_data, date_from, date_to,
+            callback=lambda data: self.on_data_loaded(generation, data),
+            errback=lambda error: self.info_label.config(text=f"Failed to load reports: {str(error)}")
+        )
+
+    def load_data(self, date_from, date_to):
+        """(change version, reports); runs on the worker thread"""
+        # Version first; a booking racing the reports just triggers another refresh later
+        version = self.db.get_change_version()
+        return version, self.db.reports.dashboard(date_from, date_to)
+
+    def on_data_loaded(self, generation, loaded):
+        """Fill the report tables once dashboard() has finished"""
+        if generation != self.refresh_generation:
+            return
+        self.loaded_version, data = loaded
+
+        self.fill(self.load_tree, [
+            (flight_number, date, booked, capacity, f"{load_factor:.0%}")
+            for flight_number, date, booked, capacity, load_factor in data['load_factors']
+        ])
+        self.fill(self.route_tree, data['route_daily'])
+        self.fill(self.destination_tree, data['top_destinations'])
+
+        if data['summaries']:
+            self.info_label.config(text="Reports read from summary tables")
+        else:
+            self.info_label.config(text="Reports read from reservation indexes; on a large database "
+                                        "run 'python manage.py summaries on' to build them in milliseconds")
+
+    def fill(self, tree, rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert('', 'end', values=row)
@@ -1,130 +1,719 @@
-import sqlite3
-import os
-
-
-class DatabaseManager:
-    def __init__(self, db_name="flights.db"):
-        self.db_name = db_name
-        self.init_database()
-
-    def get_connection(self):
-        """Create database connection"""
-        return sqlite3.connect(self.db_name)
-
-    def init_database(self):
-        """Create table if it doesn't exist"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Create reservations table
-        cursor.execute('''
-                       CREATE TABLE IF NOT EXISTS reservations
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY
-                           AUTOINCREMENT,
-                           name
-                           TEXT
-                           NOT
-                           NULL,
-                           flight_number
-                           TEXT
-                           NOT
-                           NULL,
-                           departure
-                           TEXT
-                           NOT
-                           NULL,
-                           destination
-                           TEXT
-                           NOT
-                           NULL,
-                           date
-                           TEXT
-                           NOT
-                           NULL,
-                           seat_number
-                           TEXT
-                           NOT
-                           NULL
-                       )
-                       ''')
-
-        conn.commit()
-        conn.close()
-        print("Database initialized successfully!")
-
-    def create_reservation(self, name, flight_number, departure, destination, date, seat_number):
-        """Add new reservation"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-                       INSERT INTO reservations (name, flight_number, departure, destination, date, seat_number)
-                       VALUES (?, ?, ?, ?, ?, ?)
-                       ''', (name, flight_number, departure, destination, date, seat_number))
-
-        conn.commit()
-        conn.close()
-        return True
-
-    def get_all_reservations(self):
-        """Get all reservations"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM reservations ORDER BY id DESC')
-        reservations = cursor.fetchall()
-
-        conn.close()
-        return reservations
-
-    def get_reservation_by_id(self, reservation_id):
-        """Get single reservation by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM reservations WHERE id = ?', (reservation_id,))
-        reservation = cursor.fetchone()
-
-        conn.close()
-        return reservation
-
-    def update_reservation(self, reservation_id, name, flight_number, departure, destination, date, seat_number):
-        """Update existing reservation"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-                       UPDATE reservations
-                       SET name          = ?,
-                           flight_number = ?,
-                           departure     = ?,
-                           destination   = ?,
-                           date          = ?,
-                           seat_number   = ?
-                       WHERE id = ?
-                       ''', (name, flight_number, departure, destination, date, seat_number, reservation_id))
-
-        conn.commit()
-        conn.close()
-        return True
-
-    def delete_reservation(self, reservation_id):
-        """Delete reservation"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('DELETE FROM reservations WHERE id = ?', (reservation_id,))
-
-        conn.commit()
-        conn.close()
-        return True
-
-
-# For testing
-if __name__ == "__main__":
-    db = DatabaseManager()
-    print("Database created successfully!")
\ No newline at end of file
+import sqlite3
+import os
+import re
+
+from connection_pool import ConnectionPool
+from storage_profile import StorageProfile, WalCheckpointer
+from backup import BackupScheduler, default_directory
+from seat_map import SeatInventory, SeatTakenError, normalize_seat
+from flight_catalog import FlightCatalog
+from reports import ReportEngine
+from change_stream import ChangeStream
+from cache import LRUCache, MISSING
+from metrics import InstrumentedConnection, Metrics, timed
+from migrations import BASELINE_VERSION, Migrator, _add_row_version
+from records import RESERVATION_FIELDS, Reservation, ReservationColumns, reservation_factory
+from storage import CHANGE_LOG_RETENTION, ChangeSet, ReservationConflictError, StorageBackend
+
+RESERVATION_COLUMNS = ', '.join(RESERVATION_FIELDS)
+
+# Adds a flight number to the catalogue the first time it is booked
+UPSERT_FLIGHT_SQL = 'INSERT OR IGNORE INTO flights (flight_number, departure, destination) VALUES (?, ?, ?)'
+
+# Same parameters as before; ?2 is reused to link the catalogue entry
+INSERT_RESERVATION_SQL = '''
+                         INSERT INTO reservations (name, flight_number, departure, destination, date, seat_number,
+                                                   flight_id)
+                         VALUES (?1, ?2, ?3, ?4, ?5, ?6, (SELECT id FROM flights WHERE flight_number = ?2))
+                         '''
+
+# Version written by _create_schema; later changes go in migrations.py, not here
+SCHEMA_VERSION = BASELINE_VERSION
+
+# Upper bound for a single page from search_reservations
+MAX_PAGE_SIZE = 1000
+
+# SQLite's default limit on bound parameters is 999
+MAX_QUERY_PARAMS = 900
+
+# Columns indexed for full-text passenger search
+SEARCH_COLUMNS = ('name', 'flight_number', 'departure', 'destination')
+
+
+def search_filters(name=None, flight_number=None, departure=None, destination=None, date_from=None, date_to=None,
+                   cursor=None):
+    """WHERE conditions and parameters for search_reservations"""
+    conditions = []
+    params = []
+
+    if name:
+        conditions.append('name = ? COLLATE NOCASE')
+        params.append(name)
+    if flight_number:
+        conditions.append('flight_number = ?')
+        params.append(flight_number)
+    if departure:
+        conditions.append('departure = ?')
+        params.append(departure)
+    if destination:
+        conditions.append('destination = ?')
+        params.append(destination)
+    if date_from:
+        conditions.append('date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('date <= ?')
+        params.append(date_to)
+
+    # Keyset pagination: continue below the last id of the previous page
+    if cursor is not None:
+        conditions.append('id < ?')
+        params.append(cursor)
+    return conditions, params
+
+
+def passenger_filters(words):
+    """LIKE conditions and parameters matching every word in one of the search columns"""
+    conditions = []
+    params = []
+    for word in words:
+        conditions.append('(' + ' OR '.join(f'{column} LIKE ?' for column in SEARCH_COLUMNS) + ')')
+        params.extend([f'%{word}%'] * len(SEARCH_COLUMNS))
+    return conditions, params
+
+
+class DatabaseManager(StorageBackend):
+    def __init__(self, db_name="flights.db", pool_size=5, profile=None, cache_size=4096, cache_ttl=60.0,
+                 defer_init=False, migrate=True, metrics=None):
+        self.db_name = db_name
+        # Off unless FLIGHTS_DB_METRICS=1 or switched on from the debug panel
+        self.metrics = metrics or Metrics()
+        self.profile = profile or StorageProfile.for_database(db_name)
+        self.pool = ConnectionPool(self.get_connection, size=pool_size)
+        self.seats = SeatInventory(self)
+        self.flights = FlightCatalog(self, ttl=cache_ttl)
+        self.reports = ReportEngine(self)
+        self.events = ChangeStream(self)
+        # Rows by id; the TTL bounds staleness from writes made by other processes
+        self.reservation_cache = LRUCache(cache_size, ttl=cache_ttl)
+        self.metrics.add_gauge_source(self.metric_gauges)
+        self.has_fts = False
+        # The _insert/_update/_delete_reservation hooks can run inside a shared GroupCommitWriter transaction
+        self.supports_group_commit = True
+        self.checkpointer = None
+        self.backups = None
+        # manage.py turns this off to run migrations itself
+        self.migrate = migrate
+
+        # The GUI runs init_database on its worker thread instead, so the window shows first
+        if not defer_init:
+            self.init_database()
+
+    def get_connection(self):
+        """Create database connection"""
+        # Pooled connections are shared between threads, one at a time
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, factory=InstrumentedConnection)
+        conn.metrics = self.metrics
+        self.metrics.increment('connections_opened')
+        return self.profile.apply(conn)
+
+    def metric_gauges(self):
+        """Current pool and cache sizes for the metrics export"""
+        pool = self.pool.stats()
+        cache = self.reservation_cache.stats()
+        return {
+            'pool_open_connections': pool['open'],
+            'pool_idle_connections': pool['idle'],
+            'reservation_cache_entries': cache['size'],
+            'reservation_cache_hit_ratio': round(cache['hit_rate'], 4),
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        if self.backups:
+            self.backups.stop()
+        if self.checkpointer:
+            self.checkpointer.stop()
+        self.pool.close()
+
+    @timed
+    def init_database(self):
+        """Create table if it doesn't exist"""
+        with self.pool.connection() as conn:
+            existing = conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION
+            if existing:
+                # Baseline schema exists, only the FTS flag has to be read back
+                self.has_fts = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'reservations_fts'").fetchone() is not None
+            else:
+                self._create_schema(conn)
+        if self.migrate:
+            Migrator(self).run()
+        if existing:
+            # Missing if duplicate bookings blocked it before; try again in case they were fixed
+            with self.pool.connection() as conn:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_reservations_seat'").fetchone() is None:
+                    self._create_seat_index(conn.cursor())
+                    conn.commit()
+        self.prune_changes()
+
+        # Keep the WAL short without making writers pay for checkpoints
+        if self.checkpointer is None and self.profile.uses_wal and self.profile['checkpoint_interval'] > 0:
+            self.checkpointer = WalCheckpointer(self.pool, self.profile['checkpoint_interval']).start()
+        if self.backups is None and self.profile['backup_interval'] > 0 and self.db_name != ':memory:':
+            self.backups = BackupScheduler(self, default_directory(self.db_name), self.profile['backup_interval'],
+                                           self.profile['backup_keep']).start()
+        print("Database initialized successfully!")
+
+    def _create_schema(self, conn):
+        """Run the schema DDL on a connection"""
+        cursor = conn.cursor()
+
+        # Create reservations table
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS reservations
+                       (
+                           id
+                           INTEGER
+                           PRIMARY
+                           KEY
+                           AUTOINCREMENT,
+                           name
+                           TEXT
+                           NOT
+                           NULL,
+                           flight_number
+                           TEXT
+                           NOT
+                           NULL,
+                           departure
+                           TEXT
+                           NOT
+                           NULL,
+                           destination
+                           TEXT
+                           NOT
+                           NULL,
+                           date
+                           TEXT
+                           NOT
+                           NULL,
+                           seat_number
+                           TEXT
+                           NOT
+                           NULL,
+                           version
+                           INTEGER
+                           NOT
+                           NULL
+                           DEFAULT
+                           1
+                       )
+                       ''')
+
+        # Flights/routes catalogue, one row per flight number
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS flights
+                       (
+                           id            INTEGER PRIMARY KEY AUTOINCREMENT,
+                           flight_number TEXT NOT NULL UNIQUE,
+                           departure     TEXT NOT NULL,
+                           destination   TEXT NOT NULL
+                       )
+                       ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_flights_route ON flights (departure, destination)')
+
+        # Databases created before the catalogue existed need the column and a backfill
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(reservations)')}
+        if 'flight_id' not in columns:
+            self._migrate_flight_ids(cursor)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_flight_id ON reservations (flight_id)')
+        # Editing relies on row versions, so they can't wait for migration 4 (skipped with migrate=False)
+        _add_row_version(cursor)
+
+        # Secondary indexes for the filters in search_reservations; the
+        # implicit rowid suffix keeps each one usable for ORDER BY id DESC
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_name ON reservations (name COLLATE NOCASE)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_flight ON reservations (flight_number)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_route ON reservations (departure, destination)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_date ON reservations (date)')
+
+        self._create_seat_index(cursor)
+
+        self.has_fts = self._create_search_index(cursor)
+
+        # Change log kept by triggers, so views can apply only what changed
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS reservation_changes
+                       (
+                           version        INTEGER PRIMARY KEY AUTOINCREMENT,
+                           reservation_id INTEGER NOT NULL,
+                           operation      TEXT    NOT NULL
+                       )
+                       ''')
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_track_insert
+                           AFTER INSERT ON reservations
+                       BEGIN
+                           INSERT INTO reservation_changes (reservation_id, operation) VALUES (NEW.id, 'insert');
+                       END
+                       ''')
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_track_update
+                           AFTER UPDATE OF name, flight_number, departure, destination, date, seat_number
+                           ON reservations
+                       BEGIN
+                           INSERT INTO reservation_changes (reservation_id, operation) VALUES (NEW.id, 'update');
+                       END
+                       ''')
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_track_delete
+                           AFTER DELETE ON reservations
+                       BEGIN
+                           INSERT INTO reservation_changes (reservation_id, operation) VALUES (OLD.id, 'delete');
+                       END
+                       ''')
+
+        # Set even without the seat index, so migrations still run; init_database retries the index
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        conn.commit()
+
+    def _create_seat_index(self, cursor):
+        """One booking per seat per flight and date; also serves seat map lookups. False while duplicates exist"""
+        try:
+            cursor.execute('''
+                           CREATE UNIQUE INDEX IF NOT EXISTS idx_reservations_seat
+                               ON reservations (flight_number, date, seat_number)
+                           ''')
+        except sqlite3.IntegrityError:
+            print("Warning: duplicate seat bookings exist, double-booking protection is off until they are fixed")
+            return False
+        return True
+
+    def _create_search_index(self, cursor):
+        """Create the FTS5 passenger index and its sync triggers; False if FTS5 is unavailable"""
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'reservations_fts'").fetchone()
+        try:
+            # External content table: the text lives in reservations, only the index is stored
+            cursor.execute('''
+                           CREATE VIRTUAL TABLE IF NOT EXISTS reservations_fts USING fts5
+                           (
+                               name, flight_number, departure, destination,
+                               content='reservations', content_rowid='id', prefix='2 3'
+                           )
+                           ''')
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable ({e}), falling back to LIKE")
+            return False
+
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_fts_insert
+                           AFTER INSERT ON reservations
+                       BEGIN
+                           INSERT INTO reservations_fts (rowid, name, flight_number, departure, destination)
+                           VALUES (NEW.id, NEW.name, NEW.flight_number, NEW.departure, NEW.destination);
+                       END
+                       ''')
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_fts_delete
+                           AFTER DELETE ON reservations
+                       BEGIN
+                           INSERT INTO reservations_fts (reservations_fts, rowid, name, flight_number, departure, destination)
+                           VALUES ('delete', OLD.id, OLD.name, OLD.flight_number, OLD.departure, OLD.destination);
+                       END
+                       ''')
+        cursor.execute('''
+                       CREATE TRIGGER IF NOT EXISTS reservations_fts_update
+                           AFTER UPDATE OF name, flight_number, departure, destination
+                           ON reservations
+                       BEGIN
+                           INSERT INTO reservations_fts (reservations_fts, rowid, name, flight_number, departure, destination)
+                           VALUES ('delete', OLD.id, OLD.name, OLD.flight_number, OLD.departure, OLD.destination);
+                           INSERT INTO reservations_fts (rowid, name, flight_number, departure, destination)
+                           VALUES (NEW.id, NEW.name, NEW.flight_number, NEW.departure, NEW.destination);
+                       END
+                       ''')
+
+        # Index the rows that existed before the search table
+        if not exists:
+            cursor.execute("INSERT INTO reservations_fts (reservations_fts) VALUES ('rebuild')")
+        return True
+
+    def _migrate_flight_ids(self, cursor):
+        """Add reservations.flight_id and fill the catalogue from existing bookings"""
+        cursor.execute('ALTER TABLE reservations ADD COLUMN flight_id INTEGER REFERENCES flights (id)')
+
+        # The most recent booking of each flight number decides its route
+        cursor.execute('''
+                       INSERT OR IGNORE INTO flights (flight_number, departure, destination)
+                       SELECT flight_number, departure, destination
+                       FROM (SELECT flight_number, departure, destination, MAX(id)
+                             FROM reservations
+                             GROUP BY flight_number)
+                       ''')
+        cursor.execute('''
+                       UPDATE reservations
+                       SET flight_id = (SELECT id FROM flights WHERE flights.flight_number = reservations.flight_number)
+                       ''')
+
+    def _upsert_flight(self, cursor, flight_number, departure, destination):
+        """Make sure a flight number is in the catalogue; returns its id if it was new"""
+        cursor.execute(UPSERT_FLIGHT_SQL, (flight_number, departure, destination))
+        return cursor.lastrowid if cursor.rowcount == 1 else None
+
+    @timed
+    def create_reservation(self, name, flight_number, departure, destination, date, seat_number):
+        """Add new reservation and return its id"""
+        with self.pool.connection() as conn:
+            reservation_id, after_commit = self._insert_reservation(
+                conn.cursor(), name, flight_number, departure, destination, date, seat_number)
+            conn.commit()
+        after_commit()
+        return reservation_id
+
+    def _insert_reservation(self, cursor, name, flight_number, departure, destination, date, seat_number):
+        """Insert inside the caller's transaction; returns (id, cache update to run after commit)"""
+        seat_number = normalize_seat(seat_number)
+        new_flight_id = self._upsert_flight(cursor, flight_number, departure, destination)
+
+        # The unique seat index makes the claim atomic, even across processes
+        try:
+            cursor.execute(INSERT_RESERVATION_SQL,
+                           (name, flight_number, departure, destination, date, seat_number))
+        except sqlite3.IntegrityError as e:
+            self._raise_if_seat_taken(e, flight_number, date, seat_number)
+            raise
+
+        def after_commit():
+            self.seats.mark_taken(flight_number, date, seat_number)
+            if new_flight_id:
+                self.flights.added(new_flight_id, flight_number, departure, destination)
+
+        return cursor.lastrowid, after_commit
+
+    def _raise_if_seat_taken(self, error, flight_number, date, seat_number):
+        """Turn a unique seat index violation into SeatTakenError"""
+        if 'reservations.seat_number' in str(error):
+            self.seats.mark_taken(flight_number, date, seat_number)
+            raise SeatTakenError(flight_number, date, seat_number) from error
+
+    @timed
+    def get_seat_status(self, flight_number, date, seat_number):
+        """Get (seat is free, number of free seats) for a flight and date"""
+        seat_map = self.seats.get(flight_number, date)
+        available = not seat_map.is_taken(normalize_seat(seat_number)) if seat_number else None
+        return available, seat_map.free_count()
+
+    @timed
+    def get_all_reservations(self, columnar=False):
+        """Get all reservations, as Reservation records or packed into ReservationColumns"""
+        with self.pool.connection() as conn:
+            if columnar:
+                # Plain tuples go straight into the columns without a record per row
+                return ReservationColumns(conn.execute(
+                    f'SELECT {RESERVATION_COLUMNS} FROM reservations ORDER BY id DESC'))
+
+            cursor = self._reservation_cursor(conn)
+
+            cursor.execute(f'SELECT {RESERVATION_COLUMNS} FROM reservations ORDER BY id DESC')
+            reservations = cursor.fetchall()
+
+        return reservations
+
+    def _reservation_cursor(self, conn):
+        """Cursor whose rows come back as Reservation records"""
+        cursor = conn.cursor()
+        cursor.row_factory = reservation_factory
+        return cursor
+
+    @timed
+    def count_reservations(self):
+        """Get the number of reservations"""
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM reservations').fetchone()[0]
+
+    @timed
+    def get_reservations_window(self, offset, limit):
+        """Get a slice of reservations (newest first) by row position"""
+        with self.pool.connection() as conn:
+            cursor = self._reservation_cursor(conn)
+            return cursor.execute(f'''
+                                  SELECT {RESERVATION_COLUMNS}
+                                  FROM reservations
+                                  ORDER BY id DESC
+                                  LIMIT ? OFFSET ?
+                                  ''', (limit, offset)).fetchall()
+
+    @timed
+    def search_reservations(self, name=None, flight_number=None, departure=None, destination=None,
+                            date_from=None, date_to=None, cursor=None, limit=50):
+        """Get one page of reservations (newest first) and the cursor for the next page"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conditions, params = search_filters(name, flight_number, departure, destination, date_from, date_to,
+                                            cursor)
+
+        query = f'SELECT {RESERVATION_COLUMNS} FROM reservations'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self.pool.connection() as conn:
+            rows = self._reservation_cursor(conn).execute(query, params).fetchall()
+
+        # The extra row only tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1].id
+        return rows, next_cursor
+
+    @timed
+    def get_change_version(self):
+        """Get the newest change log version"""
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(MAX(version), 0) FROM reservation_changes').fetchone()[0]
+
+    @timed
+    def get_changes_since(self, version, max_changes=5000):
+        """Get a ChangeSet of everything after a change version, or None to reload everything"""
+        with self.pool.connection() as conn:
+            # Separate subqueries so each bound is a single index seek
+            low, high = conn.execute('SELECT (SELECT MIN(version) FROM reservation_changes), '
+                                     '(SELECT MAX(version) FROM reservation_changes)').fetchone()
+            if high is None:
+                return ChangeSet(version, [], [], 0) if version == 0 else None
+
+            # The log was pruned past this version, or belongs to another database
+            if version < low - 1 or version > high:
+                return None
+
+            # Ids are never reused, so a logged insert means the row is new to the caller
+            latest = conn.execute('''
+                                  SELECT reservation_id, MAX(version), MAX(operation = 'insert')
+                                  FROM reservation_changes
+                                  WHERE version > ?
+                                  GROUP BY reservation_id
+                                  ''', (version,)).fetchall()
+            if len(latest) > max_changes:
+                return None
+
+            ids = [reservation_id for reservation_id, _, _ in latest]
+            rows = self._fetch_by_ids(conn, ids)
+
+        # Whatever no longer has a row was deleted, whatever the last logged operation
+        found = {row.id for row in rows}
+        deleted = [reservation_id for reservation_id in ids if reservation_id not in found]
+
+        # The change log also covers other processes, so it keeps cached rows honest
+        for row in rows:
+            if self.reservation_cache.pop(row.id) is not MISSING:
+                self.reservation_cache.put(row.id, row)
+        for reservation_id in deleted:
+            self.reservation_cache.pop(reservation_id)
+        existed_before = sum(1 for _, _, inserted in latest if not inserted)
+        new_version = max((v for _, v, _ in latest), default=version)
+        return ChangeSet(new_version, rows, deleted, len(found) - existed_before)
+
+    def _fetch_by_ids(self, conn, ids):
+        """Read the rows for a list of ids, in chunks that fit the parameter limit"""
+        cursor = self._reservation_cursor(conn)
+        rows = []
+        for start in range(0, len(ids), MAX_QUERY_PARAMS):
+            chunk = ids[start:start + MAX_QUERY_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows.extend(cursor.execute(f'''
+                                       SELECT {RESERVATION_COLUMNS}
+                                       FROM reservations
+                                       WHERE id IN ({placeholders})
+                                       ''', chunk).fetchall())
+        return rows
+
+    @timed
+    def get_reservations_by_ids(self, reservation_ids):
+        """Get several reservations in one query; missing ids are skipped"""
+        with self.pool.connection() as conn:
+            return self._fetch_by_ids(conn, list(reservation_ids))
+
+    @timed
+    def prune_changes(self, keep=CHANGE_LOG_RETENTION):
+        """Drop all but the newest change log entries"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                         DELETE FROM reservation_changes
+                         WHERE version <= (SELECT MAX(version) FROM reservation_changes) - ?
+                         ''', (keep,))
+            conn.commit()
+
+    @timed
+    def search_passengers(self, text, limit=200, use_fts=None):
+        """Find reservations by passenger name, flight or city, best matches first"""
+        words = re.findall(r'\w+', text)
+        if not words:
+            return []
+        if use_fts is None:
+            use_fts = self.has_fts
+
+        with self.pool.connection() as conn:
+            if use_fts:
+                # Every word must match; the last one is still being typed, so it's a prefix
+                match = ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+                columns = ', '.join(f'r.{column}' for column in RESERVATION_FIELDS)
+                cursor = self._reservation_cursor(conn)
+                return cursor.execute(f'''
+                                      SELECT {columns}
+                                      FROM reservations_fts
+                                      JOIN reservations r ON r.id = reservations_fts.rowid
+                                      WHERE reservations_fts MATCH ?
+                                      ORDER BY rank
+                                      LIMIT ?
+                                      ''', (match, limit)).fetchall()
+
+            # Fallback without FTS5: every word must appear in one of the columns
+            conditions, params = passenger_filters(words)
+            params.append(limit)
+            cursor = self._reservation_cursor(conn)
+            return cursor.execute(f'''
+                                  SELECT {RESERVATION_COLUMNS}
+                                  FROM reservations
+                                  WHERE {' AND '.join(conditions)}
+                                  ORDER BY id DESC
+                                  LIMIT ?
+                                  ''', params).fetchall()
+
+    @timed
+    def get_reservation_by_id(self, reservation_id):
+        """Get single reservation by ID"""
+        reservation = self.reservation_cache.get(reservation_id)
+        if reservation is not MISSING:
+            return reservation
+
+        reservation = self._load_reservation(reservation_id)
+        if reservation is not None:
+            self.reservation_cache.put(reservation_id, reservation)
+        return reservation
+
+    def _load_reservation(self, reservation_id):
+        """Read one reservation, bypassing the cache"""
+        with self.pool.connection() as conn:
+            cursor = self._reservation_cursor(conn)
+
+            cursor.execute(f'SELECT {RESERVATION_COLUMNS} FROM reservations WHERE id = ?', (reservation_id,))
+            reservation = cursor.fetchone()
+
+        return reservation
+
+    @timed
+    def get_versioned_reservation(self, reservation_id):
+        """Get (reservation, version) read together for editing, or None; always bypasses the cache"""
+        with self.pool.connection() as conn:
+            row = conn.execute(f'SELECT {RESERVATION_COLUMNS}, version FROM reservations WHERE id = ?',
+                               (reservation_id,)).fetchone()
+        if row is None:
+            return None
+        return Reservation._make(row[:-1]), row[-1]
+
+    @timed
+    def update_reservation(self, reservation_id, name, flight_number, departure, destination, date, seat_number,
+                           expected_version=None):
+        """Update existing reservation; False if it doesn't exist
+
+        With expected_version the update only applies if nobody changed the row since
+        that version was read, otherwise ReservationConflictError carries the current row.
+        """
+        with self.pool.connection() as conn:
+            updated, after_commit = self._update_reservation(
+                conn.cursor(), reservation_id, name, flight_number, departure, destination, date, seat_number,
+                expected_version)
+            conn.commit()
+        after_commit()
+        return updated
+
+    def _update_reservation(self, cursor, reservation_id, name, flight_number, departure, destination, date,
+                            seat_number, expected_version=None):
+        """Update inside the caller's transaction; returns (found, cache update to run after commit)"""
+        seat_number = normalize_seat(seat_number)
+        previous = cursor.execute('SELECT flight_number, date, seat_number FROM reservations WHERE id = ?',
+                                  (reservation_id,)).fetchone()
+        if previous is None:
+            self.reservation_cache.pop(reservation_id)
+            return False, lambda: None
+
+        new_flight_id = self._upsert_flight(cursor, flight_number, departure, destination)
+
+        # Compare-and-swap: the version check and the write are one statement, so no
+        # other writer can slip in between them
+        query = '''
+                UPDATE reservations
+                SET name          = ?,
+                    flight_number = ?,
+                    departure     = ?,
+                    destination   = ?,
+                    date          = ?,
+                    seat_number   = ?,
+                    flight_id     = (SELECT id FROM flights WHERE flight_number = ?),
+                    version       = version + 1
+                WHERE id = ?
+                '''
+        params = [name, flight_number, departure, destination, date, seat_number, flight_number, reservation_id]
+        if expected_version is not None:
+            query += ' AND version = ?'
+            params.append(expected_version)
+        try:
+            cursor.execute(query, params)
+        except sqlite3.IntegrityError as e:
+            self._raise_if_seat_taken(e, flight_number, date, seat_number)
+            raise
+
+        if cursor.rowcount == 0:
+            # Deleted or changed since previous was read; the caller's rollback undoes the flight upsert
+            self.reservation_cache.pop(reservation_id)
+            current = cursor.execute(f'SELECT {RESERVATION_COLUMNS}, version FROM reservations WHERE id = ?',
+                                     (reservation_id,)).fetchone()
+            if current is None:
+                return False, lambda: None
+            raise ReservationConflictError(reservation_id, expected_version, Reservation._make(current[:-1]),
+                                           current[-1])
+
+        def after_commit():
+            self.reservation_cache.put(reservation_id, Reservation(reservation_id, name, flight_number, departure,
+                                                                   destination, date, seat_number))
+            self.seats.mark_free(*previous)
+            self.seats.mark_taken(flight_number, date, seat_number)
+            if new_flight_id:
+                self.flights.added(new_flight_id, flight_number, departure, destination)
+
+        return True, after_commit
+
+    @timed
+    def delete_reservation(self, reservation_id):
+        """Delete reservation; False if it doesn't exist"""
+        with self.pool.connection() as conn:
+            deleted, after_commit = self._delete_reservation(conn.cursor(), reservation_id)
+            conn.commit()
+        after_commit()
+        return deleted
+
+    def _delete_reservation(self, cursor, reservation_id):
+        """Delete inside the caller's transaction; returns (found, cache update to run after commit)"""
+        previous = cursor.execute('SELECT flight_number, date, seat_number FROM reservations WHERE id = ?',
+                                  (reservation_id,)).fetchone()
+        if previous is None:
+            self.reservation_cache.pop(reservation_id)
+            return False, lambda: None
+
+        cursor.execute('DELETE FROM reservations WHERE id = ?', (reservation_id,))
+
+        def after_commit():
+            self.reservation_cache.pop(reservation_id)
+            self.seats.mark_free(*previous)
+
+        return True, after_commit
+
+
+# For testing
+if __name__ == "__main__":
+    db = DatabaseManager()
+    print("Database created successfully!")
+    db.close()
\ No newline at end of file
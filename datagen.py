@@ -0,0 +1,274 @@
+import argparse
+import datetime
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from database import DatabaseManager, CHANGE_LOG_RETENTION, INSERT_RESERVATION_SQL, UPSERT_FLIGHT_SQL
+from seat_map import SEAT_ROWS, SEAT_LETTERS
+
+# Bump whenever the generated data changes, so cached datasets get rebuilt
+DATAGEN_VERSION = 1
+
+# Named sizes accepted wherever a row count is expected
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000, '10m': 10000000, '50m': 50000000}
+
+# Where benchmarks cache generated datasets
+DATA_DIR = 'bench-data'
+
+# Airports and their relative traffic; routes between big hubs get more bookings
+AIRPORTS = {
+    'London': 10, 'Dubai': 9, 'Paris': 8, 'New York': 8, 'Istanbul': 7, 'Cairo': 7, 'Frankfurt': 6,
+    'Madrid': 5, 'Rome': 5, 'Tokyo': 5, 'Amsterdam': 5, 'Doha': 4, 'Berlin': 4, 'Jeddah': 4,
+    'Athens': 3, 'Riyadh': 3, 'Vienna': 3, 'Toronto': 3, 'Luxor': 2, 'Sharm El Sheikh': 2,
+}
+
+AIRLINES = ('MS', 'BA', 'AF', 'EK', 'TK', 'LH', 'IB', 'AZ', 'JL', 'QR', 'KL', 'SV')
+
+# Ordered roughly by how common they are; picked with Zipf weights so some names repeat a lot
+FIRST_NAMES = (
+    'Mohamed', 'Ahmed', 'Sara', 'John', 'Maria', 'Omar', 'Fatma', 'David', 'Mona', 'James', 'Ali',
+    'Anna', 'Mahmoud', 'Emma', 'Nour', 'Peter', 'Yasmin', 'Michael', 'Hana', 'Karim', 'Laura',
+    'Mostafa', 'Sofia', 'Youssef', 'Linda', 'Hassan', 'Grace', 'Khaled', 'Julia', 'Mina', 'Elena',
+    'Tarek', 'Lucas', 'Salma', 'Daniel', 'Aya', 'Carlos', 'Layla', 'Thomas', 'Dina', 'Kenji', 'Rana',
+    'Luca', 'Heba', 'Hans', 'Mariam', 'George', 'Yuki', 'Pavly', 'Nadia',
+)
+LAST_NAMES = (
+    'Hassan', 'Mohamed', 'Ali', 'Smith', 'Ibrahim', 'Ahmed', 'Johnson', 'Garcia', 'Mahmoud', 'Brown',
+    'Mostafa', 'Rossi', 'Muller', 'Khalil', 'Williams', 'Said', 'Jones', 'Martin', 'Youssef', 'Lopez',
+    'Farouk', 'Schmidt', 'Adel', 'Tanaka', 'Mansour', 'Taylor', 'Nasser', 'Bianchi', 'Wilson', 'Sayed',
+    'Weber', 'Gamal', 'Moore', 'Fathy', 'Clark', 'Suzuki', 'Hamdy', 'Ferrari', 'Lewis', 'Salem',
+    'Walker', 'Fouad', 'Hall', 'Ramadan', 'Young', 'Sato', 'Zaki', 'King', 'Wright', 'Naguib',
+)
+
+SEATS = [f"{row}{letter}" for row in range(1, SEAT_ROWS + 1) for letter in SEAT_LETTERS]
+CAPACITY = len(SEATS)
+
+# Steps coprime with CAPACITY, so offset + k * step visits every seat once in a scattered order
+SEAT_STEPS = [step for step in range(7, CAPACITY) if math.gcd(step, CAPACITY) == 1]
+
+# Relative demand by weekday (Monday first) and by month (January first)
+WEEKDAY_DEMAND = (0.9, 0.75, 0.8, 0.95, 1.25, 1.0, 1.2)
+MONTH_DEMAND = (0.8, 0.75, 0.9, 1.0, 0.95, 1.1, 1.35, 1.3, 1.0, 0.95, 0.85, 1.15)
+
+FLIGHTS = 300
+FIRST_DATE = datetime.date(2025, 1, 1)
+
+# Bookings never fill more than this share of all seats, so clipping full flights stays rare
+MAX_AVERAGE_LOAD = 0.5
+
+
+def parse_rows(text):
+    """Row count from '10k', '1m', '10m' or a plain number"""
+    text = str(text).strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    return int(text.replace('_', ''))
+
+
+def size_label(rows):
+    """Short name for a row count, e.g. 1000000 -> '1m'"""
+    for label, count in SIZES.items():
+        if count == rows:
+            return label
+    return str(rows)
+
+
+def _zipf_cum_weights(count, exponent=1.0):
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+FIRST_NAME_WEIGHTS = _zipf_cum_weights(len(FIRST_NAMES), 0.8)
+LAST_NAME_WEIGHTS = _zipf_cum_weights(len(LAST_NAMES), 0.8)
+
+
+def build_catalog(rng, flights=FLIGHTS):
+    """Flight numbers with their routes and demand, as (flight_number, departure, destination, demand)"""
+    airports = list(AIRPORTS)
+    weights = [AIRPORTS[airport] for airport in airports]
+    catalog = []
+    numbers = set()
+    while len(catalog) < flights:
+        departure, destination = rng.choices(airports, weights, k=2)
+        if departure == destination:
+            continue
+        number = f"{rng.choice(AIRLINES)}{rng.randrange(100, 1000)}"
+        if number in numbers:
+            continue
+        numbers.add(number)
+        # Hub-to-hub routes sell more seats, with some spread between flights on the same route
+        demand = AIRPORTS[departure] * AIRPORTS[destination] * rng.lognormvariate(0, 0.4)
+        catalog.append((number, departure, destination, demand))
+    return catalog
+
+
+def allocate(rng, weights, rows, capacity=CAPACITY):
+    """Split rows over slots in proportion to weights, at most capacity per slot"""
+    total = sum(weights)
+    counts = []
+    for weight in weights:
+        expected = rows * weight / total
+        count = int(expected)
+        if rng.random() < expected - count:
+            count += 1
+        counts.append(min(count, capacity))
+
+    # Rounding and full flights leave the total a little off; fix it one booking at a time
+    difference = rows - sum(counts)
+    slots = range(len(counts))
+    while difference > 0:
+        for slot in rng.choices(slots, weights, k=difference):
+            if counts[slot] < capacity and difference > 0:
+                counts[slot] += 1
+                difference -= 1
+    while difference < 0:
+        slot = rng.randrange(len(counts))
+        if counts[slot]:
+            counts[slot] -= 1
+            difference += 1
+    return counts
+
+
+def day_count(rows, flights=FLIGHTS):
+    """Days of departures needed to hold rows bookings, at least a year"""
+    return max(365, math.ceil(rows / (flights * CAPACITY * MAX_AVERAGE_LOAD)))
+
+
+def generate_rows(rng, catalog, rows):
+    """Yield reservation tuples for the catalog's flights in departure date order"""
+    flights = len(catalog)
+    days = day_count(rows, flights)
+    dates = [FIRST_DATE + datetime.timedelta(days=day) for day in range(days)]
+    weights = [demand * WEEKDAY_DEMAND[date.weekday()] * MONTH_DEMAND[date.month - 1]
+               for date in dates
+               for _, _, _, demand in catalog]
+    counts = allocate(rng, weights, rows)
+
+    for day, date in enumerate(dates):
+        date_text = date.isoformat()
+        day_rows = []
+        for flight, (number, departure, destination, _) in enumerate(catalog):
+            booked = counts[day * flights + flight]
+            if not booked:
+                continue
+            offset = rng.randrange(CAPACITY)
+            step = rng.choice(SEAT_STEPS)
+            first_names = rng.choices(FIRST_NAMES, cum_weights=FIRST_NAME_WEIGHTS, k=booked)
+            last_names = rng.choices(LAST_NAMES, cum_weights=LAST_NAME_WEIGHTS, k=booked)
+            for k in range(booked):
+                day_rows.append((f"{first_names[k]} {last_names[k]}", number, departure, destination,
+                                 date_text, SEATS[(offset + k * step) % CAPACITY]))
+        # Bookings for a day arrive mixed across its flights, not one flight at a time
+        rng.shuffle(day_rows)
+        yield from day_rows
+
+
+def generate(path, rows, seed=42, batch_size=50000, progress=None):
+    """Build a database at path holding rows synthetic reservations; returns seconds taken"""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    start = time.perf_counter()
+
+    # Full schema and migrations first, so the file is exactly what the app would create
+    DatabaseManager(path).close()
+
+    conn = sqlite3.connect(path)
+    # A half-written file is thrown away anyway, so skip the fsyncs
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+
+    # Per-row trigger work (FTS, change log) dominates loading; drop the triggers and restore them after
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master "
+                            "WHERE type = 'trigger' AND tbl_name = 'reservations'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER {name}')
+
+    rng = random.Random(seed)
+    catalog = build_catalog(rng)
+    conn.executemany(UPSERT_FLIGHT_SQL, [entry[:3] for entry in catalog])
+
+    written = 0
+    batch = []
+    for row in generate_rows(rng, catalog, rows):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(INSERT_RESERVATION_SQL, batch)
+            conn.commit()
+            written += len(batch)
+            batch = []
+            if progress:
+                progress(written, rows)
+    if batch:
+        conn.executemany(INSERT_RESERVATION_SQL, batch)
+    conn.commit()
+
+    # What the triggers would have left behind: a full search index and the newest change log entries
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'reservations_fts'").fetchone():
+        conn.execute("INSERT INTO reservations_fts (reservations_fts) VALUES ('rebuild')")
+    conn.execute('''
+                 INSERT INTO reservation_changes (reservation_id, operation)
+                 SELECT id, 'insert'
+                 FROM (SELECT id FROM reservations ORDER BY id DESC LIMIT ?)
+                 ORDER BY id
+                 ''', (CHANGE_LOG_RETENTION,))
+    for _, sql in triggers:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def dataset_path(data_dir, rows, seed=42):
+    """Where the cached dataset for a size and seed lives"""
+    return os.path.join(data_dir, f"flights-{size_label(rows)}-seed{seed}-v{DATAGEN_VERSION}.db")
+
+
+def ensure_dataset(data_dir, rows, seed=42, progress=None):
+    """Path of a cached dataset, generating it first if needed"""
+    path = dataset_path(data_dir, rows, seed)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(data_dir, exist_ok=True)
+    # Built under a temporary name so an interrupted run never leaves a partial dataset behind
+    partial = path + '.partial'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(partial + suffix):
+            os.remove(partial + suffix)
+    generate(partial, rows, seed, progress=progress)
+    os.replace(partial, path)
+    return path
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic flights database")
+    parser.add_argument('path', help="database file to create")
+    parser.add_argument('--rows', default='10k', help=f"row count or one of {', '.join(SIZES)} (default 10k)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default 42)")
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+
+    def progress(written, total):
+        print(f"\r  {written}/{total} rows", end='', flush=True)
+
+    try:
+        seconds = generate(args.path, rows, args.seed, progress=progress)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"\nGenerated {rows} reservations in {args.path} in {seconds:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
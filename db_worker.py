@@ -0,0 +1,73 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DatabaseWorker:
+    """Runs database calls off the Tk thread and delivers results back on it"""
+
+    def __init__(self, root, poll_interval=15, metrics=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        # Optional Metrics; records submit-to-callback time per call as ui_<function>
+        self.metrics = metrics
+
+        # One thread keeps calls in submission order (a booking before the refresh after it)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-worker")
+        self._results = queue.Queue()
+        self._after_id = None
+        self.pending = 0
+
+    def start(self):
+        """Start polling for finished calls"""
+        self._poll()
+        return self
+
+    def submit(self, fn, *args, callback=None, errback=None, **kwargs):
+        """Queue fn(*args, **kwargs); callback(result) or errback(exc) runs on the Tk thread"""
+        self.pending += 1
+        submitted = time.perf_counter()
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self._results.put((f, callback, errback, fn, submitted)))
+        return future
+
+    def _poll(self):
+        """Deliver finished results; called from the Tk event loop"""
+        while True:
+            try:
+                future, callback, errback, fn, submitted = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            error = future.exception()
+            try:
+                if error is None:
+                    if callback:
+                        callback(future.result())
+                elif errback:
+                    errback(error)
+                else:
+                    print(f"Database call failed: {error}")
+            except Exception as e:
+                print(f"Database callback failed: {e}")
+
+            if self.metrics is not None and self.metrics.enabled:
+                name = getattr(fn, '__name__', '')
+                self.metrics.observe(f"ui_{name if name.isidentifier() else 'call'}", time.perf_counter() - submitted)
+
+        self._after_id = self.root.after(self.poll_interval, self._poll)
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def stop(self):
+        """Finish queued calls and stop the worker thread"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,129 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+
+class DebugPanel(tk.Toplevel):
+    """Window with live database timings, counters and the slow query log"""
+
+    def __init__(self, controller, refresh_interval=1000):
+        tk.Toplevel.__init__(self, controller.root)
+        self.controller = controller
+        self.metrics = controller.db.metrics
+        self.refresh_interval = refresh_interval
+        self._after_id = None
+        self.slow_queries = []
+
+        self.title("Debug Panel")
+        self.geometry("760x560")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        """Setup the debug panel UI"""
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(expand=True, fill='both')
+
+        # Controls
+        controls_frame = ttk.Frame(main_frame)
+        controls_frame.pack(fill='x', pady=(0, 10))
+
+        self.enabled_var = tk.BooleanVar(value=self.metrics.enabled)
+        enabled_check = ttk.Checkbutton(controls_frame, text="Collect metrics",
+                                        variable=self.enabled_var, command=self.toggle_enabled)
+        enabled_check.pack(side='left')
+
+        export_btn = ttk.Button(controls_frame, text="💾 Export Prometheus", command=self.export)
+        export_btn.pack(side='right')
+
+        reset_btn = ttk.Button(controls_frame, text="🔄 Reset", command=self.reset)
+        reset_btn.pack(side='right', padx=(0, 10))
+
+        # Per-operation latency
+        columns = ('Operation', 'Calls', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms')
+        self.operations_tree = ttk.Treeview(main_frame, columns=columns, show='headings', height=10)
+        for col in columns:
+            self.operations_tree.heading(col, text=col, anchor='center')
+            self.operations_tree.column(col, width=180 if col == 'Operation' else 90, anchor='center')
+        self.operations_tree.pack(fill='both', expand=True)
+
+        # Counters, gauges and UI responsiveness
+        self.counters_label = ttk.Label(main_frame, text="", font=('Arial', 10), justify='left')
+        self.counters_label.pack(fill='x', pady=10)
+
+        # Slow query log; selecting one shows its query plan
+        slow_columns = ('ms', 'Query')
+        self.slow_tree = ttk.Treeview(main_frame, columns=slow_columns, show='headings', height=6)
+        self.slow_tree.heading('ms', text='ms', anchor='center')
+        self.slow_tree.column('ms', width=80, anchor='center')
+        self.slow_tree.heading('Query', text='Slow queries', anchor='w')
+        self.slow_tree.column('Query', width=640, anchor='w')
+        self.slow_tree.pack(fill='both', expand=True)
+        self.slow_tree.bind('<<TreeviewSelect>>', self.show_plan)
+
+        self.plan_text = tk.Text(main_frame, height=5, font=('Courier', 9))
+        self.plan_text.pack(fill='x', pady=(10, 0))
+
+    def refresh(self):
+        """Redraw from the current metrics, then schedule the next refresh"""
+        snapshot = self.metrics.snapshot()
+
+        self.operations_tree.delete(*self.operations_tree.get_children())
+        for operation, calls, p50, p95, p99, worst, _ in snapshot['operations']:
+            self.operations_tree.insert('', 'end', values=(
+                operation, calls, f"{p50 * 1000:.2f}", f"{p95 * 1000:.2f}", f"{p99 * 1000:.2f}",
+                f"{worst * 1000:.2f}"))
+
+        ui = self.controller.ui_monitor.stats()
+        numbers = list(snapshot['counters'].items()) + list(snapshot['gauges'].items())
+        self.counters_label.config(text=(
+            "   ".join(f"{name}: {value}" for name, value in numbers) +
+            f"\nUI event loop: max stall {ui['max_lag_ms']} ms, {ui['stalls']} stalls, "
+            f"{ui['blocked_ms']} ms blocked   worker queue: {self.controller.worker.pending}"
+        ))
+
+        # The slow log only grows, so only redraw it when it changed
+        if len(snapshot['slow_queries']) != len(self.slow_queries) or \
+                (snapshot['slow_queries'] and snapshot['slow_queries'][-1] is not self.slow_queries[-1]):
+            self.slow_queries = snapshot['slow_queries']
+            self.slow_tree.delete(*self.slow_tree.get_children())
+            for i, query in enumerate(reversed(self.slow_queries)):
+                self.slow_tree.insert('', 'end', iid=str(i), values=(f"{query.seconds * 1000:.1f}", query.sql))
+
+        self._after_id = self.after(self.refresh_interval, self.refresh)
+
+    def show_plan(self, event=None):
+        selection = self.slow_tree.selection()
+        if not selection:
+            return
+        query = list(reversed(self.slow_queries))[int(selection[0])]
+        self.plan_text.delete('1.0', 'end')
+        self.plan_text.insert('end', query.sql + "\n\n" + ("\n".join(query.plan) or "(no plan available)"))
+
+    def toggle_enabled(self):
+        self.metrics.enabled = self.enabled_var.get()
+
+    def reset(self):
+        self.metrics.reset()
+        self.slow_queries = []
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        self.plan_text.delete('1.0', 'end')
+
+    def export(self):
+        """Save a Prometheus text dump of the current metrics"""
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".prom",
+                                            filetypes=[("Prometheus text", "*.prom"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.prometheus())
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export metrics: {str(e)}", parent=self)
+
+    def close(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self.controller.debug_panel = None
+        self.destroy()
@@ -1,186 +1,433 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-
-
-class EditReservationPage(tk.Frame):
-    def __init__(self, parent, controller, db):
-        tk.Frame.__init__(self, parent)
-        self.controller = controller
-        self.db = db
-        self.current_reservation_id = None
-        self.setup_ui()
-
-    def setup_ui(self):
-        """Setup the edit reservation page UI"""
-        # Main container
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(expand=True, fill='both')
-
-        # Header frame
-        header_frame = ttk.Frame(main_frame)
-        header_frame.pack(fill='x', pady=(0, 20))
-
-        # Title
-        self.title_label = ttk.Label(header_frame, text="Edit Reservation",
-                                     style='Title.TLabel')
-        self.title_label.pack(side='left')
-
-        # Back button
-        back_btn = ttk.Button(header_frame, text="← Back to Reservations",
-                              command=lambda: self.controller.show_frame("ReservationsPage"))
-        back_btn.pack(side='right')
-
-        # Form frame
-        form_frame = ttk.LabelFrame(main_frame, text="Reservation Details", padding="20")
-        form_frame.pack(fill='both', expand=True)
-
-        # Create entry fields
-        self.entries = {}
-        fields = [
-            ('Name', 'Passenger full name'),
-            ('Flight Number', 'e.g., AA1234'),
-            ('Departure', 'Departure city'),
-            ('Destination', 'Destination city'),
-            ('Date', 'YYYY-MM-DD format'),
-            ('Seat Number', 'e.g., 12A')
-        ]
-
-        for i, (field, placeholder) in enumerate(fields):
-            # Label
-            label = ttk.Label(form_frame, text=f"{field}:")
-            label.grid(row=i, column=0, sticky='w', pady=5, padx=(0, 10))
-
-            # Entry
-            entry = ttk.Entry(form_frame, width=30, font=('Arial', 11))
-            entry.grid(row=i, column=1, sticky='ew', pady=5)
-
-            # Placeholder hint
-            hint_label = ttk.Label(form_frame, text=f"({placeholder})",
-                                   font=('Arial', 9), foreground='gray')
-            hint_label.grid(row=i, column=2, sticky='w', pady=5, padx=(10, 0))
-
-            self.entries[field] = entry
-
-        # Configure column weights
-        form_frame.columnconfigure(1, weight=1)
-
-        # Info frame
-        info_frame = ttk.Frame(main_frame)
-        info_frame.pack(fill='x', pady=10)
-
-        self.info_label = ttk.Label(info_frame, text="", font=('Arial', 10),
-                                    foreground='blue')
-        self.info_label.pack()
-
-        # Buttons frame
-        buttons_frame = ttk.Frame(main_frame)
-        buttons_frame.pack(fill='x', pady=20)
-
-        # Update button
-        update_btn = ttk.Button(buttons_frame, text="💾 Update Reservation",
-                                command=self.update_reservation,
-                                style='Action.TButton')
-        update_btn.pack(side='left', padx=(0, 10))
-
-        # Delete button
-        delete_btn = ttk.Button(buttons_frame, text="🗑️ Delete Reservation",
-                                command=self.delete_reservation)
-        delete_btn.pack(side='left', padx=(0, 10))
-
-        # Cancel button
-        cancel_btn = ttk.Button(buttons_frame, text="❌ Cancel",
-                                command=lambda: self.controller.show_frame("ReservationsPage"))
-        cancel_btn.pack(side='right')
-
-    def load_reservation(self, reservation_id):
-        """Load reservation data into the form"""
-        try:
-            self.current_reservation_id = reservation_id
-            reservation = self.db.get_reservation_by_id(reservation_id)
-
-            if reservation:
-                # Clear existing data
-                self.clear_form()
-
-                # Load data into fields (skip ID field)
-                field_names = ['Name', 'Flight Number', 'Departure', 'Destination', 'Date', 'Seat Number']
-                for i, field_name in enumerate(field_names):
-                    self.entries[field_name].insert(0, reservation[i + 1])  # Skip ID (index 0)
-
-                self.info_label.config(text=f"Editing Reservation ID: {reservation_id}")
-                self.title_label.config(text=f"Edit Reservation #{reservation_id}")
-            else:
-                messagebox.showerror("Error", "Reservation not found!")
-                self.controller.show_frame("ReservationsPage")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load reservation: {str(e)}")
-            self.controller.show_frame("ReservationsPage")
-
-    def update_reservation(self):
-        """Update the reservation"""
-        if not self.current_reservation_id:
-            messagebox.showerror("Error", "No reservation selected!")
-            return
-
-        try:
-            # Get values from entries
-            values = {}
-            for field, entry in self.entries.items():
-                value = entry.get().strip()
-                if not value:
-                    messagebox.showerror("Error", f"Please fill the {field} field!")
-                    entry.focus()
-                    return
-                values[field] = value
-
-            # Update in database
-            self.db.update_reservation(
-                self.current_reservation_id,
-                values['Name'],
-                values['Flight Number'],
-                values['Departure'],
-                values['Destination'],
-                values['Date'],
-                values['Seat Number']
-            )
-
-            messagebox.showinfo("Success", "Reservation updated successfully!")
-            self.controller.show_frame("ReservationsPage")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update reservation: {str(e)}")
-
-    def delete_reservation(self):
-        """Delete the current reservation"""
-        if not self.current_reservation_id:
-            messagebox.showerror("Error", "No reservation selected!")
-            return
-
-        # Get passenger name for confirmation
-        passenger_name = self.entries['Name'].get().strip()
-
-        # Confirm deletion
-        result = messagebox.askyesnocancel(
-            "Confirm Delete",
-            f"Are you sure you want to delete this reservation?\n\n"
-            f"Passenger: {passenger_name}\n"
-            f"Flight: {self.entries['Flight Number'].get()}\n"
-            f"This action cannot be undone!"
-        )
-
-        if result:
-            try:
-                self.db.delete_reservation(self.current_reservation_id)
-                messagebox.showinfo("Success", "Reservation deleted successfully!")
-                self.controller.show_frame("ReservationsPage")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete reservation: {str(e)}")
-
-    def clear_form(self):
-        """Clear all form fields"""
-        for entry in self.entries.values():
-            entry.delete(0, tk.END)
-        self.current_reservation_id = None
-        self.info_label.config(text="")
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from database import ReservationConflictError
+from seat_map import SeatTakenError
+from seat_status import SeatStatusLabel
+from validation import ValidationError, clean_form, find_duplicate
+
+# Form field label -> Reservation attribute
+FIELD_ATTRIBUTES = {
+    'Name': 'name',
+    'Flight Number': 'flight_number',
+    'Departure': 'departure',
+    'Destination': 'destination',
+    'Date': 'date',
+    'Seat Number': 'seat_number',
+}
+
+
+def reservation_values(reservation):
+    """Form values of a Reservation, by field label"""
+    return {field: getattr(reservation, attribute) for field, attribute in FIELD_ATTRIBUTES.items()}
+
+
+def normalized_values(values):
+    """Form values as clean_form would save them, or unchanged if they do not validate"""
+    try:
+        return clean_form(values)
+    except ValidationError:
+        return values
+
+
+def merge_reservation(original, mine, theirs):
+    """Three-way merge of form values against the row someone else saved
+
+    A field changed on only one side takes that side's value. Returns the merged
+    values and the fields both sides changed differently, where the user's value is kept.
+    Values are compared normalised, so "ms777" against a stored "MS777" is no change.
+    """
+    base = normalized_values(reservation_values(original))
+    other = normalized_values(reservation_values(theirs))
+    merged = {}
+    conflicts = []
+    for field, ours in normalized_values(mine).items():
+        if ours == base[field] or ours == other[field]:
+            merged[field] = other[field]
+        elif other[field] == base[field]:
+            merged[field] = ours
+        else:
+            merged[field] = ours
+            conflicts.append(field)
+    return merged, conflicts
+
+
+class ConflictDialog(tk.Toplevel):
+    """Shows both sides of a conflicting edit and asks how to resolve it"""
+
+    def __init__(self, parent, original, mine, theirs, conflicts):
+        tk.Toplevel.__init__(self, parent)
+        self.choice = None
+        self.title("Reservation Changed")
+        self.transient(parent.winfo_toplevel())
+        self.protocol("WM_DELETE_WINDOW", lambda: self.choose(None))
+
+        main_frame = ttk.Frame(self, padding="15")
+        main_frame.pack(expand=True, fill='both')
+
+        message = ttk.Label(main_frame, font=('Arial', 10), text=(
+            "Someone else saved this reservation while you were editing it.\n"
+            "Merge keeps the changes from both sides; fields you both changed keep your value."))
+        message.pack(fill='x', pady=(0, 10))
+
+        columns = ('Field', 'When you opened it', 'Your edit', 'Saved by someone else')
+        tree = ttk.Treeview(main_frame, columns=columns, show='headings', height=len(FIELD_ATTRIBUTES))
+        for col in columns:
+            tree.heading(col, text=col, anchor='center')
+            tree.column(col, width=100 if col == 'Field' else 160, anchor='center')
+        tree.tag_configure('conflict', background='#f8d7da')
+        tree.tag_configure('changed', background='#fff3cd')
+
+        base = reservation_values(original)
+        other = reservation_values(theirs)
+        for field in FIELD_ATTRIBUTES:
+            if field in conflicts:
+                tags = ('conflict',)
+            elif other[field] != base[field]:
+                tags = ('changed',)
+            else:
+                tags = ()
+            tree.insert('', 'end', values=(field, base[field], mine[field], other[field]), tags=tags)
+        tree.pack(fill='both', expand=True)
+
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(fill='x', pady=(15, 0))
+
+        merge_btn = ttk.Button(buttons_frame, text="🔀 Merge", command=lambda: self.choose('merge'),
+                               style='Action.TButton')
+        merge_btn.pack(side='left', padx=(0, 10))
+
+        overwrite_btn = ttk.Button(buttons_frame, text="💾 Save Mine", command=lambda: self.choose('overwrite'))
+        overwrite_btn.pack(side='left', padx=(0, 10))
+
+        reload_btn = ttk.Button(buttons_frame, text="🔄 Reload Theirs", command=lambda: self.choose('reload'))
+        reload_btn.pack(side='left', padx=(0, 10))
+
+        cancel_btn = ttk.Button(buttons_frame, text="❌ Cancel", command=lambda: self.choose(None))
+        cancel_btn.pack(side='right')
+
+        self.grab_set()
+        merge_btn.focus()
+
+    def choose(self, choice):
+        self.choice = choice
+        self.grab_release()
+        self.destroy()
+
+
+class EditReservationPage(tk.Frame):
+    def __init__(self, parent, controller, db):
+        tk.Frame.__init__(self, parent)
+        self.controller = controller
+        self.db = db
+        self.current_reservation_id = None
+        # The row and version the form was filled from; updates only apply if it is still current
+        self.loaded_reservation = None
+        self.loaded_version = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the edit reservation page UI"""
+        # Main container
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill='both')
+
+        # Header frame
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill='x', pady=(0, 20))
+
+        # Title
+        self.title_label = ttk.Label(header_frame, text="Edit Reservation",
+                                     style='Title.TLabel')
+        self.title_label.pack(side='left')
+
+        # Back button
+        back_btn = ttk.Button(header_frame, text="← Back to Reservations",
+                              command=lambda: self.controller.show_frame("ReservationsPage"))
+        back_btn.pack(side='right')
+
+        # Form frame
+        form_frame = ttk.LabelFrame(main_frame, text="Reservation Details", padding="20")
+        form_frame.pack(fill='both', expand=True)
+
+        # Create entry fields
+        self.entries = {}
+        fields = [
+            ('Name', 'Passenger full name'),
+            ('Flight Number', 'e.g., AA1234'),
+            ('Departure', 'Departure city'),
+            ('Destination', 'Destination city'),
+            ('Date', 'YYYY-MM-DD format'),
+            ('Seat Number', 'e.g., 12A')
+        ]
+
+        for i, (field, placeholder) in enumerate(fields):
+            # Label
+            label = ttk.Label(form_frame, text=f"{field}:")
+            label.grid(row=i, column=0, sticky='w', pady=5, padx=(0, 10))
+
+            # Entry
+            entry = ttk.Entry(form_frame, width=30, font=('Arial', 11))
+            entry.grid(row=i, column=1, sticky='ew', pady=5)
+
+            # Placeholder hint
+            hint_label = ttk.Label(form_frame, text=f"({placeholder})",
+                                   font=('Arial', 9), foreground='gray')
+            hint_label.grid(row=i, column=2, sticky='w', pady=5, padx=(10, 0))
+
+            self.entries[field] = entry
+
+        # Live seat availability under the form
+        self.seat_status = SeatStatusLabel(form_frame, self.controller, self.db, self.entries)
+        self.seat_status.grid(row=len(fields), column=1, sticky='w', pady=(5, 0))
+
+        # Configure column weights
+        form_frame.columnconfigure(1, weight=1)
+
+        # Info frame
+        info_frame = ttk.Frame(main_frame)
+        info_frame.pack(fill='x', pady=10)
+
+        self.info_label = ttk.Label(info_frame, text="", font=('Arial', 10),
+                                    foreground='blue')
+        self.info_label.pack()
+
+        # Buttons frame
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(fill='x', pady=20)
+
+        # Update button
+        self.update_btn = ttk.Button(buttons_frame, text="💾 Update Reservation",
+                                     command=self.update_reservation,
+                                     style='Action.TButton')
+        self.update_btn.pack(side='left', padx=(0, 10))
+
+        # Delete button
+        self.delete_btn = ttk.Button(buttons_frame, text="🗑️ Delete Reservation",
+                                     command=self.delete_reservation)
+        self.delete_btn.pack(side='left', padx=(0, 10))
+
+        # Cancel button
+        cancel_btn = ttk.Button(buttons_frame, text="❌ Cancel",
+                                command=lambda: self.controller.show_frame("ReservationsPage"))
+        cancel_btn.pack(side='right')
+
+    def load_reservation(self, reservation_id):
+        """Load reservation data into the form"""
+        try:
+            # Clear existing data
+            self.clear_form()
+            self.current_reservation_id = reservation_id
+
+            self.set_loading(True, f"Loading reservation #{reservation_id}...")
+            self.controller.worker.submit(
+                self.db.get_versioned_reservation, reservation_id,
+                callback=lambda result: self.on_reservation_loaded(reservation_id, result),
+                errback=self.on_load_failed
+            )
+
+        except Exception as e:
+            self.on_load_failed(e)
+
+    def on_reservation_loaded(self, reservation_id, result):
+        """Fill the form once the reservation and its version have been read"""
+        # Ignore results for a reservation we have already navigated away from
+        if reservation_id != self.current_reservation_id:
+            return
+        self.set_loading(False)
+
+        if result:
+            reservation, version = result
+            self.set_loaded(reservation, version)
+            self.fill_form(reservation_values(reservation))
+
+            self.info_label.config(text=f"Editing Reservation ID: {reservation_id}")
+            self.title_label.config(text=f"Edit Reservation #{reservation_id}")
+        else:
+            messagebox.showerror("Error", "Reservation not found!")
+            self.controller.show_frame("ReservationsPage")
+
+    def on_load_failed(self, error):
+        """Called on the Tk thread if the reservation could not be read"""
+        self.set_loading(False)
+        messagebox.showerror("Error", f"Failed to load reservation: {str(error)}")
+        self.controller.show_frame("ReservationsPage")
+
+    def update_reservation(self):
+        """Update the reservation"""
+        if not self.current_reservation_id:
+            messagebox.showerror("Error", "No reservation selected!")
+            return
+
+        try:
+            values = self.form_values()
+            if values is None:
+                return
+
+            # Another booking of the same passenger on the same flight? Checked on the worker thread
+            self.set_loading(True, "Saving changes...")
+            reservation_id = self.current_reservation_id
+            self.controller.worker.submit(
+                find_duplicate, self.db, values['Name'], values['Flight Number'], values['Date'],
+                exclude_id=reservation_id,
+                callback=lambda duplicate: self.save_changes(reservation_id, values, duplicate),
+                errback=self.on_update_failed
+            )
+
+        except Exception as e:
+            self.on_update_failed(e)
+
+    def save_changes(self, reservation_id, values, duplicate):
+        """Save the update once the duplicate check is back, asking first if it found one"""
+        if duplicate and not messagebox.askyesno(
+                "Possible Duplicate",
+                f"{duplicate.name} also has reservation #{duplicate.id} on flight {duplicate.flight_number} "
+                f"for {duplicate.date} (seat {duplicate.seat_number}).\n\nSave these changes anyway?"):
+            self.set_loading(False)
+            self.info_label.config(text="Not saved")
+            return
+
+        # Update in database on the worker thread, only if nobody saved it since it was loaded
+        self.controller.worker.submit(
+            self.db.update_reservation,
+            reservation_id,
+            values['Name'],
+            values['Flight Number'],
+            values['Departure'],
+            values['Destination'],
+            values['Date'],
+            values['Seat Number'],
+            expected_version=self.loaded_version,
+            callback=self.on_updated,
+            errback=self.on_update_failed
+        )
+
+    def on_updated(self, result):
+        """Called on the Tk thread once the update is saved"""
+        self.set_loading(False)
+        if not result:
+            messagebox.showerror("Error", "This reservation no longer exists!")
+            self.controller.show_frame("ReservationsPage")
+            return
+        messagebox.showinfo("Success", "Reservation updated successfully!")
+        self.controller.show_frame("ReservationsPage")
+
+    def on_update_failed(self, error):
+        """Called on the Tk thread if the update could not be saved"""
+        self.set_loading(False)
+        if isinstance(error, ReservationConflictError):
+            self.resolve_conflict(error)
+            return
+        messagebox.showerror("Error", f"Failed to update reservation: {str(error)}")
+
+        # Someone else got the seat first; show what is still free
+        if isinstance(error, SeatTakenError):
+            self.seat_status.check()
+
+    def resolve_conflict(self, error):
+        """Someone saved the reservation first: merge, overwrite or reload"""
+        mine = {field: entry.get().strip() for field, entry in self.entries.items()}
+        merged, conflicts = merge_reservation(self.loaded_reservation, mine, error.current)
+
+        dialog = ConflictDialog(self, self.loaded_reservation, mine, error.current, conflicts)
+        self.wait_window(dialog)
+        if dialog.choice is None:
+            self.info_label.config(text="Not saved: this reservation was changed by someone else")
+            return
+
+        # Whatever happens next builds on the row as it is now
+        self.set_loaded(error.current, error.current_version)
+        if dialog.choice == 'merge':
+            self.fill_form(merged)
+            self.seat_status.check()
+            if conflicts:
+                self.info_label.config(text=f"Merged; you both changed {', '.join(conflicts)}, your values kept. "
+                                            f"Review and update again.")
+            else:
+                self.info_label.config(text="Merged with the latest version. Review and update again.")
+        elif dialog.choice == 'reload':
+            self.fill_form(reservation_values(error.current))
+            self.seat_status.check()
+            self.info_label.config(text="Reloaded the latest version")
+        else:
+            self.update_reservation()
+
+    def set_loaded(self, reservation, version):
+        """Remember the row the form is based on"""
+        self.loaded_reservation = reservation
+        self.loaded_version = version
+        # The reservation's own seat counts as free while editing it
+        self.seat_status.own_seat = (reservation.flight_number, reservation.date, reservation.seat_number)
+
+    def form_values(self):
+        """Checked values from the entries by field label, or None after telling the user what is wrong"""
+        try:
+            return clean_form({field: entry.get() for field, entry in self.entries.items()})
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            self.entries[e.label].focus()
+            return None
+
+    def fill_form(self, values):
+        """Put values by field label into the entries"""
+        for field, value in values.items():
+            self.entries[field].delete(0, tk.END)
+            self.entries[field].insert(0, value)
+
+    def delete_reservation(self):
+        """Delete the current reservation"""
+        if not self.current_reservation_id:
+            messagebox.showerror("Error", "No reservation selected!")
+            return
+
+        # Get passenger name for confirmation
+        passenger_name = self.entries['Name'].get().strip()
+
+        # Confirm deletion
+        result = messagebox.askyesnocancel(
+            "Confirm Delete",
+            f"Are you sure you want to delete this reservation?\n\n"
+            f"Passenger: {passenger_name}\n"
+            f"Flight: {self.entries['Flight Number'].get()}\n"
+            f"This action cannot be undone!"
+        )
+
+        if result:
+            self.set_loading(True, "Deleting reservation...")
+            self.controller.worker.submit(
+                self.db.delete_reservation, self.current_reservation_id,
+                callback=self.on_deleted,
+                errback=self.on_delete_failed
+            )
+
+    def on_deleted(self, result):
+        """Called on the Tk thread once the reservation is deleted"""
+        self.set_loading(False)
+        messagebox.showinfo("Success", "Reservation deleted successfully!")
+        self.controller.show_frame("ReservationsPage")
+
+    def on_delete_failed(self, error):
+        """Called on the Tk thread if the reservation could not be deleted"""
+        self.set_loading(False)
+        messagebox.showerror("Error", f"Failed to delete reservation: {str(error)}")
+
+    def set_loading(self, loading, message=""):
+        """Disable the form buttons while a database call is running"""
+        state = 'disabled' if loading else 'normal'
+        self.update_btn.config(state=state)
+        self.delete_btn.config(state=state)
+        self.config(cursor='watch' if loading else '')
+        if loading:
+            self.info_label.config(text=message)
+
+    def clear_form(self):
+        """Clear all form fields"""
+        for entry in self.entries.values():
+            entry.delete(0, tk.END)
+        self.seat_status.clear()
+        self.seat_status.own_seat = None
+        self.current_reservation_id = None
+        self.loaded_reservation = None
+        self.loaded_version = None
+        self.info_label.config(text="")
         self.title_label.config(text="Edit Reservation")
\ No newline at end of file
@@ -0,0 +1,91 @@
+import bisect
+import threading
+
+from cache import LRUCache, MISSING
+
+
+class Flight:
+    """Catalogue entry for one flight number"""
+
+    __slots__ = ('id', 'flight_number', 'departure', 'destination')
+
+    def __init__(self, id, flight_number, departure, destination):
+        self.id = id
+        self.flight_number = flight_number
+        self.departure = departure
+        self.destination = destination
+
+    def __repr__(self):
+        return f"Flight({self.flight_number}: {self.departure} -> {self.destination})"
+
+
+class FlightCatalog:
+    """Cached view of the flights table for lookups and autocomplete"""
+
+    def __init__(self, db, cache_size=1024, ttl=60.0):
+        self.db = db
+        # The TTL lets flights added by another process replace a cached "unknown"
+        self._cache = LRUCache(cache_size, ttl=ttl)
+        # Sorted flight numbers for prefix completion, loaded on first use
+        self._numbers = None
+        self._lock = threading.Lock()
+
+    def lookup(self, flight_number):
+        """Get the Flight for a number, or None if it isn't in the catalogue"""
+        flight = self._cache.get(flight_number)
+        if flight is not MISSING:
+            return flight
+
+        with self.db.pool.connection() as conn:
+            row = conn.execute('''
+                               SELECT id, flight_number, departure, destination
+                               FROM flights
+                               WHERE flight_number = ?
+                               ''', (flight_number,)).fetchone()
+
+        # Unknown numbers are cached too so typing doesn't query again
+        flight = Flight(*row) if row else None
+        self._cache.put(flight_number, flight)
+        return flight
+
+    def load_numbers(self):
+        """Read every flight number once for autocomplete"""
+        with self.db.pool.connection() as conn:
+            numbers = [number for (number,) in conn.execute('SELECT flight_number FROM flights ORDER BY flight_number')]
+        with self._lock:
+            self._numbers = numbers
+        return len(numbers)
+
+    @property
+    def loaded(self):
+        return self._numbers is not None
+
+    def complete(self, prefix, limit=10):
+        """Flight numbers starting with prefix, any case (empty until load_numbers has run)"""
+        numbers = self._numbers
+        if not numbers or not prefix:
+            return []
+        # Flight numbers are stored upper-cased
+        prefix = prefix.upper()
+        start = bisect.bisect_left(numbers, prefix)
+        matches = []
+        for number in numbers[start:start + limit]:
+            if not number.startswith(prefix):
+                break
+            matches.append(number)
+        return matches
+
+    def added(self, flight_id, flight_number, departure, destination):
+        """Record a flight that was just inserted into the catalogue"""
+        self._cache.put(flight_number, Flight(flight_id, flight_number, departure, destination))
+        with self._lock:
+            if self._numbers is not None:
+                i = bisect.bisect_left(self._numbers, flight_number)
+                if i == len(self._numbers) or self._numbers[i] != flight_number:
+                    self._numbers.insert(i, flight_number)
+
+    def clear(self):
+        """Forget cached flights, e.g. after a bulk import"""
+        self._cache.clear()
+        with self._lock:
+            self._numbers = None
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from connection_pool import PoolClosedError
+
+# Queued in place of an operation to stop the writer thread
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued reservation changes in shared transactions"""
+
+    def __init__(self, db, max_batch=200, max_delay=0.001):
+        if not getattr(db, 'supports_group_commit', False):
+            raise ValueError(f"{type(db).__name__} can't share write transactions; use it without group commit")
+        self.db = db
+        self.max_batch = max_batch
+        # How long the first queued operation may wait for others to join its batch
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._closed = False
+        self.batches = 0
+        self.operations = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, operation, *args):
+        """Queue db.<operation>(cursor, *args); the Future resolves once it is committed"""
+        if self._closed:
+            raise PoolClosedError("Group commit writer is stopped")
+        if self._thread.ident is not None and not self._thread.is_alive():
+            # Nobody would ever drain the queue
+            raise PoolClosedError("Group commit writer thread has died")
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future
+
+    def create_reservation(self, name, flight_number, departure, destination, date, seat_number):
+        return self.submit(self.db._insert_reservation, name, flight_number, departure, destination, date,
+                           seat_number)
+
+    def update_reservation(self, reservation_id, name, flight_number, departure, destination, date, seat_number):
+        return self.submit(self.db._update_reservation, reservation_id, name, flight_number, departure,
+                           destination, date, seat_number)
+
+    def delete_reservation(self, reservation_id):
+        return self.submit(self.db._delete_reservation, reservation_id)
+
+    def _next_batch(self):
+        """Block for one operation, then collect more until the batch is full or max_delay passes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                self._commit(batch)
+            if stopping:
+                break
+
+    def _commit(self, batch):
+        """Run a batch in one transaction; each operation gets a savepoint so one failure doesn't sink the rest"""
+        done = []
+        try:
+            with self.db.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Take the write lock up front instead of upgrading halfway through the batch
+                cursor.execute('BEGIN IMMEDIATE')
+                for operation, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    cursor.execute('SAVEPOINT operation')
+                    try:
+                        result, after_commit = operation(cursor, *args)
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO operation')
+                        cursor.execute('RELEASE operation')
+                        future.set_exception(e)
+                        continue
+                    cursor.execute('RELEASE operation')
+                    done.append((future, result, after_commit))
+                conn.commit()
+        except Exception as e:
+            # Nothing in the batch was committed; that includes operations never started
+            # because the connection or the write lock couldn't be had. Any error, not just
+            # SQLite's, lands here: letting it escape would kill the thread and strand every write
+            for operation, args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(done)
+        for future, result, after_commit in done:
+            # The change is committed whatever a cache refresh does; keep the thread alive
+            try:
+                after_commit()
+            except Exception as e:
+                print(f"Group commit callback failed: {e}")
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'operations': self.operations,
+            'average_batch': self.operations / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def stop(self):
+        """Commit everything already queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        if self._thread.is_alive():
+            self._thread.join()
@@ -1,99 +1,142 @@
-import tkinter as tk
-from tkinter import ttk
-import sys
-import os
-
-# Add the current directory to Python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-try:
-    from database import DatabaseManager
-    from home import HomePage
-    from booking import BookingPage
-    from reservations import ReservationsPage
-    from edit_reservation import EditReservationPage
-except ImportError as e:
-    print(f"Import error: {e}")
-    print("Please make sure all required files are in the same directory.")
-    input("Press Enter to exit...")
-    sys.exit(1)
-
-
-class FlightReservationApp:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("Flight Reservation System")
-        self.root.geometry("800x600")
-        self.root.resizable(True, True)
-
-        # Initialize database
-        self.db = DatabaseManager()
-
-        # Configure style
-        self.setup_style()
-
-        # Container for different pages
-        self.container = tk.Frame(self.root)
-        self.container.pack(fill="both", expand=True)
-        self.container.grid_rowconfigure(0, weight=1)
-        self.container.grid_columnconfigure(0, weight=1)
-
-        # Dictionary to hold different pages
-        self.frames = {}
-
-        # Initialize all pages
-        self.init_pages()
-
-        # Show home page first
-        self.show_frame("HomePage")
-
-    def setup_style(self):
-        """Setup the application style"""
-        style = ttk.Style()
-        style.theme_use('clam')
-
-        # Configure colors
-        style.configure('Title.TLabel', font=('Arial', 16, 'bold'))
-        style.configure('Heading.TLabel', font=('Arial', 12, 'bold'))
-        style.configure('Action.TButton', font=('Arial', 10, 'bold'))
-
-    def init_pages(self):
-        """Initialize all application pages"""
-        for PageClass in (HomePage, BookingPage, ReservationsPage, EditReservationPage):
-            page_name = PageClass.__name__
-            frame = PageClass(parent=self.container, controller=self, db=self.db)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-
-    def show_frame(self, page_name):
-        """Show a specific frame"""
-        frame = self.frames[page_name]
-        frame.tkraise()
-
-        # Refresh data if it's reservations page
-        if page_name == "ReservationsPage":
-            frame.refresh_data()
-
-    def show_edit_page(self, reservation_id):
-        """Show edit page with specific reservation data"""
-        edit_frame = self.frames["EditReservationPage"]
-        edit_frame.load_reservation(reservation_id)
-        edit_frame.tkraise()
-
-    def run(self):
-        """Start the application"""
-        self.root.mainloop()
-
-
-def main():
-    """Main function to run the application"""
-    try:
-        app = FlightReservationApp()
-        app.run()
-    except Exception as e:
-        print(f"Error starting application: {e}")
-        input("Press Enter to exit...")
-
-
-if __name__ == "__main__":
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from storage import open_backend
+    from home import HomePage
+    from booking import BookingPage
+    from reservations import ReservationsPage
+    from edit_reservation import EditReservationPage
+    from dashboard import DashboardPage
+    from db_worker import DatabaseWorker
+    from ui_monitor import EventLoopMonitor
+    from debug_panel import DebugPanel
+except ImportError as e:
+    print(f"Import error: {e}")
+    print("Please make sure all required files are in the same directory.")
+    input("Press Enter to exit...")
+    sys.exit(1)
+
+
+class FlightReservationApp:
+    def __init__(self, db_name="flights.db"):
+        self.root = tk.Tk()
+        self.root.title("Flight Reservation System")
+        self.root.geometry("800x600")
+        self.root.resizable(True, True)
+
+        # Initialize database: a SQLite file, "memory[:snapshot.json]" or "shards:<directory>"
+        self.db = open_backend(db_name, defer_init=True)
+
+        # Database calls from the pages run on this worker, not the Tk thread
+        self.worker = DatabaseWorker(self.root, metrics=self.db.metrics).start()
+
+        # Schema checks run first on the worker, ahead of any query from the pages
+        self.worker.submit(self.db.init_database, errback=self.on_database_failed)
+
+        # Record how long the event loop gets blocked
+        self.ui_monitor = EventLoopMonitor(self.root).start()
+
+        # F12 opens the timing and slow query panel
+        self.debug_panel = None
+        self.root.bind('<F12>', lambda e: self.show_debug_panel())
+
+        # Configure style
+        self.setup_style()
+
+        # Container for different pages
+        self.container = tk.Frame(self.root)
+        self.container.pack(fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+
+        # Dictionary to hold different pages, filled as they are first shown
+        self.frames = {}
+        self.page_classes = {}
+
+        # Initialize all pages
+        self.init_pages()
+
+        # Show home page first
+        self.show_frame("HomePage")
+
+    def setup_style(self):
+        """Setup the application style"""
+        style = ttk.Style()
+        style.theme_use('clam')
+
+        # Configure colors
+        style.configure('Title.TLabel', font=('Arial', 16, 'bold'))
+        style.configure('Heading.TLabel', font=('Arial', 12, 'bold'))
+        style.configure('Action.TButton', font=('Arial', 10, 'bold'))
+
+    def init_pages(self):
+        """Register all application pages; each one is built the first time it is shown"""
+        for PageClass in (HomePage, BookingPage, ReservationsPage, EditReservationPage, DashboardPage):
+            self.page_classes[PageClass.__name__] = PageClass
+
+    def get_frame(self, page_name):
+        """Get a page, building it on first use"""
+        frame = self.frames.get(page_name)
+        if frame is None:
+            frame = self.page_classes[page_name](parent=self.container, controller=self, db=self.db)
+            self.frames[page_name] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+        return frame
+
+    def show_frame(self, page_name):
+        """Show a specific frame"""
+        frame = self.get_frame(page_name)
+        frame.tkraise()
+
+        # Bring data pages up to date with what changed since they were last shown
+        if page_name in ("ReservationsPage", "DashboardPage"):
+            frame.sync_data()
+
+    def show_edit_page(self, reservation_id):
+        """Show edit page with specific reservation data"""
+        edit_frame = self.get_frame("EditReservationPage")
+        edit_frame.load_reservation(reservation_id)
+        edit_frame.tkraise()
+
+    def show_debug_panel(self):
+        """Open the debug panel, or bring it to the front if it is already open"""
+        if self.debug_panel is None:
+            self.debug_panel = DebugPanel(self)
+        else:
+            self.debug_panel.lift()
+
+    def on_database_failed(self, error):
+        """Called on the Tk thread if the database could not be opened"""
+        messagebox.showerror("Error", f"Failed to open the database: {str(error)}")
+
+    def run(self):
+        """Start the application"""
+        try:
+            self.root.mainloop()
+        finally:
+            stats = self.ui_monitor.stop()
+            print(f"UI event loop: max stall {stats['max_lag_ms']} ms, "
+                  f"{stats['stalls']} stalls, {stats['blocked_ms']} ms blocked")
+            self.worker.stop()
+            self.db.close()
+
+
+def main():
+    """Main function to run the application"""
+    try:
+        # Optional storage spec, e.g. "python main.py memory:kiosk.json"
+        app = FlightReservationApp(*sys.argv[1:2])
+        app.run()
+    except Exception as e:
+        print(f"Error starting application: {e}")
+        input("Press Enter to exit...")
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
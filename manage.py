@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+import backup
+import bulk
+from migrations import Migrator
+from sharding import ShardedDatabaseManager
+from storage import backend_kind, open_backend
+
+
+def cmd_import(db, args):
+    """Import reservations from a CSV or JSONL file"""
+    result = bulk.import_reservations(db, args.file, fmt=args.format, batch_size=args.batch_size,
+                                      workers=args.workers)
+    print(f"Read {result.rows_read} rows, imported {result.imported}, rejected {result.rejected} "
+          f"in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec)")
+
+    for line_no, reason, _ in result.rejects[:20]:
+        print(f"  line {line_no}: {reason}")
+    if result.rejected > 20:
+        print(f"  ... and {result.rejected - 20} more")
+
+    if args.rejects and result.rejects:
+        bulk.write_rejects(result, args.rejects)
+        print(f"Rejected rows written to {args.rejects}")
+    return 1 if result.rejected and not result.imported else 0
+
+
+def cmd_export(db, args):
+    """Export all reservations to a CSV or JSONL file"""
+    result = bulk.export_reservations(db, args.file, fmt=args.format)
+    print(f"Exported {result.exported} rows to {args.file} "
+          f"in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec)")
+    return 0
+
+
+def cmd_migrate(db, args):
+    """Show or apply pending schema migrations"""
+    migrator = Migrator(db, batch_size=args.batch_size, pause=args.pause)
+    pending = migrator.pending()
+    print(f"Schema version {migrator.current_version()}, {len(pending)} pending")
+    if args.status:
+        for version, description, started, finished in migrator.history():
+            print(f"  {version:>3} {'done' if finished else 'INCOMPLETE':<10} {description}")
+        for migration in pending:
+            print(f"  {migration.version:>3} {'pending':<10} {migration.description}")
+        return 0
+
+    def progress(migration, position, last_id):
+        print(f"\r  backfilled {position}/{last_id}", end='', flush=True)
+
+    for result in migrator.run(progress=progress):
+        if result.batches:
+            print()
+        print(f"  done in {result.seconds:.2f}s, {result.rows_changed} rows changed, "
+              f"longest lock {result.max_lock_seconds * 1000:.1f} ms")
+    return 0
+
+
+def cmd_summaries(db, args):
+    """Turn the trigger-maintained report summary tables on or off"""
+    if args.state == 'on':
+        db.reports.enable_summaries()
+        print("Report summary tables enabled and filled from current bookings")
+    else:
+        db.reports.disable_summaries()
+        print("Report summary tables dropped; reports read the reservations indexes")
+    return 0
+
+
+def cmd_events(db, args):
+    """Turn the change event stream on or off, or show where its consumers are"""
+    if args.state == 'on':
+        db.events.enable()
+        print("Change events enabled; every reservation write from now on is logged")
+    elif args.state == 'off':
+        db.events.disable()
+        print("Change events disabled; logged events and consumer offsets are kept")
+    else:
+        print(f"Change events {'enabled' if db.events.enabled() else 'disabled'}, "
+              f"latest event {db.events.latest()}")
+        for name, seq, lag in db.events.consumers():
+            print(f"  {name:<24} at {seq:>10}, {lag} behind")
+    return 0
+
+
+def cmd_events_compact(db, args):
+    """Remove events all consumers have seen and events superseded by newer ones"""
+    print(f"Removed {db.events.compact()} events")
+    return 0
+
+
+def cmd_events_tail(db, args):
+    """Print events as JSON lines as they are written, committing the consumer's offset"""
+    consumer = db.events.consumer(args.name, start=args.start)
+    stop = threading.Event()
+    try:
+        for events in consumer.tail(stop, poll_interval=args.interval):
+            for event in events:
+                print(json.dumps({'seq': event.seq, 'operation': event.operation, 'row': event.row}), flush=True)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_shards_list(db, args):
+    """Show every live monthly shard"""
+    total_rows = total_bytes = 0
+    for month, rows, size in db.shard_stats():
+        print(f"  {month:<8} {rows:>10} rows {size / 1e6:>10.1f} MB")
+        total_rows += rows
+        total_bytes += size
+    print(f"{len(db.months)} shards, {total_rows} reservations, {total_bytes / 1e6:.1f} MB")
+    return 0
+
+
+def cmd_shards_split(db, args):
+    """Copy a single-file database into monthly shards"""
+    copied = db.split_database(args.source, progress=lambda month, rows: print(f"  {month}: {rows} rows"))
+    print(f"Copied {copied} reservations into {len(db.months)} shards")
+    return 0
+
+
+def cmd_shards_archive(db, args):
+    """Move an old month out of the live set"""
+    print(f"Archived {args.month} to {db.archive_shard(args.month, args.to)}")
+    return 0
+
+
+def cmd_shards_drop(db, args):
+    """Delete an old month and its bookings"""
+    db.drop_shard(args.month)
+    print(f"Dropped {args.month}")
+    return 0
+
+
+def cmd_shards_restore(db, args):
+    """Bring an archived month back"""
+    print(f"Restored {db.restore_shard(args.file)} reservations from {args.file}")
+    return 0
+
+
+def cmd_shards_vacuum(db, args):
+    """Rebuild one month's file"""
+    db.vacuum_shard(args.month)
+    print(f"Vacuumed {args.month}")
+    return 0
+
+
+def _print_backup(result):
+    print(f"  {result.bytes / 1e6:.1f} MB, {result.pages} pages in {result.steps} steps, "
+          f"{result.restarts} restarts, {result.seconds:.2f}s{', verified' if result.verified else ''}")
+
+
+def cmd_backup_create(db, args):
+    """Take a verified snapshot of the live database"""
+    directory = args.to or backup.default_directory(db.db_name)
+    os.makedirs(directory, exist_ok=True)
+    result = backup.backup_database(db, os.path.join(directory, backup.snapshot_name(db.db_name)),
+                                    pages=args.pages, pause=args.pause)
+    print(f"Backed up {db.db_name} to {result.path}")
+    _print_backup(result)
+    if args.keep:
+        for path in backup.prune_snapshots(directory, db.db_name, args.keep):
+            print(f"  removed old snapshot {path}")
+    return 0
+
+
+def cmd_backup_list(db, args):
+    """Show the snapshots of the database"""
+    directory = args.dir or backup.default_directory(db.db_name)
+    snapshots = backup.list_snapshots(directory, db.db_name)
+    for path in snapshots:
+        print(f"  {os.path.basename(path):<40} {os.path.getsize(path) / 1e6:>10.1f} MB")
+    print(f"{len(snapshots)} snapshots in {directory}")
+    return 0
+
+
+def cmd_backup_verify(db, args):
+    """Run a full integrity check on a backup file"""
+    print(f"{args.file} is intact, {backup.verify_backup(args.file, quick=False)} reservations")
+    return 0
+
+
+def cmd_backup_restore(db, args):
+    """Replace the database's contents with a backup; run it with the app closed"""
+    result = backup.restore_database(db, args.file)
+    print(f"Restored {db.db_name} from {args.file}")
+    _print_backup(result)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Flight Reservation System command line tools")
+    parser.add_argument('--db', default="flights.db",
+                        help='database file, "memory[:snapshot.json]" or "shards:<directory>" (default: flights.db)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    import_parser = commands.add_parser('import', help="bulk import reservations")
+    import_parser.add_argument('file', help="CSV or JSONL file")
+    import_parser.add_argument('--format', choices=('csv', 'jsonl'), help="override the file extension")
+    import_parser.add_argument('--batch-size', type=int, default=5000, help="rows per transaction")
+    import_parser.add_argument('--rejects', help="write rejected rows to this JSONL file")
+    import_parser.add_argument('--workers', type=int, default=1,
+                               help="validate in this many processes (default 1, no pool)")
+    import_parser.set_defaults(handler=cmd_import)
+
+    export_parser = commands.add_parser('export', help="export all reservations")
+    export_parser.add_argument('file', help="CSV or JSONL file")
+    export_parser.add_argument('--format', choices=('csv', 'jsonl'), help="override the file extension")
+    export_parser.set_defaults(handler=cmd_export)
+
+    migrate_parser = commands.add_parser('migrate', help="apply pending schema migrations")
+    migrate_parser.add_argument('--status', action='store_true', help="list migrations without applying them")
+    migrate_parser.add_argument('--batch-size', type=int, default=5000, help="rows per backfill transaction")
+    migrate_parser.add_argument('--pause', type=float, default=0.005, help="seconds to wait between batches")
+    migrate_parser.set_defaults(handler=cmd_migrate, needs_file=True)
+
+    summaries_parser = commands.add_parser('summaries', help="enable or disable report summary tables")
+    summaries_parser.add_argument('state', choices=('on', 'off'))
+    summaries_parser.set_defaults(handler=cmd_summaries, needs_file=True)
+
+    events_parser = commands.add_parser('events', help="change event stream for downstream systems")
+    events_parser.set_defaults(handler=cmd_events, state='status', needs_file=True)
+    actions = events_parser.add_subparsers(dest='state')
+    actions.add_parser('on', help="start logging reservation writes")
+    actions.add_parser('off', help="stop logging reservation writes")
+    actions.add_parser('status', help="show the latest event and every consumer's position")
+    actions.add_parser('compact', help="shrink the event log").set_defaults(handler=cmd_events_compact)
+    tail_parser = actions.add_parser('tail', help="print events as they arrive, resuming a named consumer")
+    tail_parser.add_argument('name', help="consumer name; its offset is saved in the database")
+    tail_parser.add_argument('--start', choices=('earliest', 'latest'), default='earliest',
+                             help="where a new consumer starts (default: earliest)")
+    tail_parser.add_argument('--interval', type=float, default=0.5, help="seconds between polls when idle")
+    tail_parser.set_defaults(handler=cmd_events_tail)
+
+    shards_parser = commands.add_parser('shards', help="manage monthly shard storage")
+    shards_parser.add_argument('directory', help="shard directory")
+    shards_parser.set_defaults(opener=lambda args: ShardedDatabaseManager(args.directory))
+    actions = shards_parser.add_subparsers(dest='action')
+    actions.required = True
+    actions.add_parser('list', help="list live shards").set_defaults(handler=cmd_shards_list)
+    split_parser = actions.add_parser('split', help="copy a single-file database into monthly shards")
+    split_parser.add_argument('source', help="database file to split")
+    split_parser.set_defaults(handler=cmd_shards_split)
+    archive_parser = actions.add_parser('archive', help="move a month's shard to an archive directory")
+    archive_parser.add_argument('month', help="YYYY-MM")
+    archive_parser.add_argument('--to', default='archive', help="archive directory (default: archive)")
+    archive_parser.set_defaults(handler=cmd_shards_archive)
+    drop_parser = actions.add_parser('drop', help="delete a month's shard")
+    drop_parser.add_argument('month', help="YYYY-MM")
+    drop_parser.set_defaults(handler=cmd_shards_drop)
+    restore_parser = actions.add_parser('restore', help="bring an archived shard back")
+    restore_parser.add_argument('file', help="archived YYYY-MM.db file")
+    restore_parser.set_defaults(handler=cmd_shards_restore)
+    vacuum_parser = actions.add_parser('vacuum', help="rebuild one month's file")
+    vacuum_parser.add_argument('month', help="YYYY-MM")
+    vacuum_parser.set_defaults(handler=cmd_shards_vacuum)
+
+    backup_parser = commands.add_parser('backup', help="online backups and restores")
+    backup_parser.set_defaults(needs_file=True)
+    actions = backup_parser.add_subparsers(dest='action')
+    actions.required = True
+    create_parser = actions.add_parser('create', help="snapshot the database while it is in use")
+    create_parser.add_argument('--to', help="backup directory (default: backups next to the database)")
+    create_parser.add_argument('--keep', type=int, help="then delete all but the newest KEEP snapshots")
+    create_parser.add_argument('--pages', type=int, default=backup.BACKUP_PAGES, help="pages copied per step")
+    create_parser.add_argument('--pause', type=float, default=backup.BACKUP_PAUSE,
+                               help="seconds to wait between steps")
+    create_parser.set_defaults(handler=cmd_backup_create)
+    list_parser = actions.add_parser('list', help="list snapshots")
+    list_parser.add_argument('--dir', help="backup directory (default: backups next to the database)")
+    list_parser.set_defaults(handler=cmd_backup_list)
+    verify_parser = actions.add_parser('verify', help="integrity-check a backup file")
+    verify_parser.add_argument('file', help="backup file")
+    verify_parser.set_defaults(handler=cmd_backup_verify)
+    restore_parser = actions.add_parser('restore', help="replace the database with a backup (app closed)")
+    restore_parser.add_argument('file', help="backup file")
+    restore_parser.set_defaults(handler=cmd_backup_restore)
+
+    return parser
+
+
+def main(argv=None):
+    """Run a management command"""
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'needs_file', False) and backend_kind(args.db) != 'sqlite':
+        print(f"Error: {args.command} works on a single SQLite database file, not {args.db}")
+        return 1
+    if getattr(args, 'opener', None):
+        db = args.opener(args)
+    else:
+        # migrate runs the migrations itself, with its own batch settings
+        db = open_backend(args.db, migrate=args.command != 'migrate')
+    try:
+        return args.handler(db, args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
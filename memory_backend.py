@@ -0,0 +1,548 @@
+import bisect
+import heapq
+import json
+import os
+import re
+import string
+import threading
+from collections import defaultdict
+
+from database import MAX_PAGE_SIZE, SEARCH_COLUMNS
+from flight_catalog import Flight, FlightCatalog
+from metrics import Metrics, timed
+from records import RESERVATION_FIELDS, Reservation, ReservationColumns
+from reports import CAPACITY
+from seat_map import SeatMap, SeatTakenError, normalize_seat
+from storage import CHANGE_LOG_RETENTION, ChangeSet, ReservationConflictError, StorageBackend
+
+# Bump when the snapshot file layout changes
+SNAPSHOT_FORMAT = 1
+
+# SQLite's NOCASE and LIKE only fold ASCII letters; matching that keeps both backends in agreement
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Column positions searched by search_passengers
+SEARCH_POSITIONS = tuple(RESERVATION_FIELDS.index(column) for column in SEARCH_COLUMNS)
+
+
+def fold(text):
+    """Case-fold the way SQLite's NOCASE collation does"""
+    return text.translate(ASCII_LOWER)
+
+
+class MemoryFlightCatalog(FlightCatalog):
+    """FlightCatalog reading the in-memory flights dict instead of the flights table"""
+
+    def lookup(self, flight_number):
+        with self.db.lock:
+            return self.db.flight_rows.get(flight_number)
+
+    def load_numbers(self):
+        with self.db.lock:
+            numbers = sorted(self.db.flight_rows)
+        with self._lock:
+            self._numbers = numbers
+        return len(numbers)
+
+
+class MemoryReportEngine:
+    """ReportEngine over per-flight booking counts kept up to date on every write"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def summaries_enabled(self):
+        # The counts are maintained like the SQLite summary table, so they are always on
+        return True
+
+    def _counts(self, date_from, date_to):
+        with self.db.lock:
+            return [(key, count) for key, count in self.db.bookings.items()
+                    if (not date_from or key[1] >= date_from) and (not date_to or key[1] <= date_to)]
+
+    def load_factors(self, date_from=None, date_to=None, limit=50, use_summary=None):
+        """Fullest flights as (flight_number, date, booked, capacity, load_factor)"""
+        booked = defaultdict(int)
+        for (flight_number, date, _, _), count in self._counts(date_from, date_to):
+            booked[flight_number, date] += count
+        rows = sorted(booked.items(), key=lambda item: (-item[1], item[0][1], item[0][0]))[:limit]
+        return [(flight_number, date, count, CAPACITY, count / CAPACITY) for (flight_number, date), count in rows]
+
+    def route_daily(self, departure=None, destination=None, date_from=None, date_to=None, limit=500,
+                    use_summary=None):
+        """Bookings per route and day as (departure, destination, date, bookings)"""
+        bookings = defaultdict(int)
+        for (_, date, dep, dst), count in self._counts(date_from, date_to):
+            if (not departure or dep == departure) and (not destination or dst == destination):
+                bookings[dep, dst, date] += count
+        return [key + (count,) for key, count in sorted(bookings.items())[:limit]]
+
+    def top_destinations(self, date_from=None, date_to=None, limit=10, use_summary=None):
+        """Most booked destinations as (destination, bookings)"""
+        bookings = defaultdict(int)
+        for (_, _, _, destination), count in self._counts(date_from, date_to):
+            bookings[destination] += count
+        return sorted(bookings.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def dashboard(self, date_from=None, date_to=None):
+        """Everything the dashboard page shows, read in one worker call"""
+        return {
+            'summaries': True,
+            'load_factors': self.load_factors(date_from, date_to),
+            'route_daily': self.route_daily(date_from=date_from, date_to=date_to),
+            'top_destinations': self.top_destinations(date_from, date_to),
+        }
+
+
+class SnapshotWriter:
+    """Background thread that saves a MemoryBackend snapshot whenever it has unsaved changes"""
+
+    def __init__(self, backend, interval):
+        self.backend = backend
+        self.interval = interval
+        self.saves = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.backend.save_snapshot(only_if_dirty=True):
+                    self.saves += 1
+            except OSError as e:
+                print(f"Snapshot save failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class MemoryBackend(StorageBackend):
+    """Storage held in dicts keyed by id, with secondary indexes and optional snapshots to disk
+
+    Meant for demos, kiosks and throwaway test data: everything lives in RAM, so
+    reads never touch the disk, and a snapshot file (if given) carries the data
+    over to the next start. Not shared between processes.
+    """
+
+    def __init__(self, snapshot_path=None, snapshot_interval=0, defer_init=False, metrics=None):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.metrics = metrics or Metrics()
+        self.flights = MemoryFlightCatalog(self)
+        self.reports = MemoryReportEngine(self)
+        self.has_fts = False
+        self.supports_group_commit = False
+        self.lock = threading.RLock()
+
+        self._reset()
+        self.snapshot_writer = None
+        self._initialized = False
+        self.metrics.add_gauge_source(self.metric_gauges)
+
+        if not defer_init:
+            self.init_database()
+
+    def _reset(self):
+        """Start from empty tables; callers hold the lock or are still constructing"""
+        self.rows = {}                  # id -> Reservation
+        self.versions = {}              # id -> row version for compare-and-swap updates
+        self.ids = []                   # every id, ascending, for windows and full scans
+        self.flight_rows = {}           # flight_number -> Flight
+        self.bookings = defaultdict(int)  # (flight_number, date, departure, destination) -> bookings
+        # Secondary indexes: value -> set of ids
+        self.by_name = defaultdict(set)         # folded name
+        self.by_flight = defaultdict(set)
+        self.by_departure = defaultdict(set)
+        self.by_destination = defaultdict(set)
+        self.by_date = defaultdict(set)
+        self.dates = []                 # sorted keys of by_date, for date ranges
+        # id -> folded search columns joined by NUL, which no search word can span
+        self.search_text = {}
+        # (flight_number, date) -> {seat_number: id}; the in-memory unique seat index
+        self.seats = defaultdict(dict)
+
+        self.next_id = 1
+        self.next_flight_id = 1
+        # Change log as (version, id, operation); versions are consecutive
+        self.changes = []
+        self.change_version = 0
+        self.dirty = False
+
+    def metric_gauges(self):
+        """Row and change log sizes for the metrics export"""
+        return {
+            'memory_reservations': len(self.rows),
+            'memory_change_log_entries': len(self.changes),
+        }
+
+    @timed
+    def init_database(self):
+        """Load the snapshot, if there is one"""
+        with self.lock:
+            if self._initialized:
+                return
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                self.load_snapshot(self.snapshot_path)
+            self._initialized = True
+        if self.snapshot_path and self.snapshot_interval > 0 and self.snapshot_writer is None:
+            self.snapshot_writer = SnapshotWriter(self, self.snapshot_interval).start()
+        print(f"In-memory storage ready ({len(self.rows)} reservations)")
+
+    def close(self):
+        """Stop the snapshot thread and write a final snapshot"""
+        if self.snapshot_writer:
+            self.snapshot_writer.stop()
+            self.snapshot_writer = None
+        if self.snapshot_path:
+            self.save_snapshot(only_if_dirty=True)
+
+    # Snapshots
+
+    def save_snapshot(self, path=None, only_if_dirty=False):
+        """Write every row to a JSON file atomically; False if there was nothing to save"""
+        path = path or self.snapshot_path
+        with self.lock:
+            if only_if_dirty and not self.dirty:
+                return False
+            data = {
+                'format': SNAPSHOT_FORMAT,
+                'next_id': self.next_id,
+                'change_version': self.change_version,
+                'flights': [[flight.id, flight.flight_number, flight.departure, flight.destination]
+                            for flight in self.flight_rows.values()],
+                'reservations': [list(self.rows[reservation_id]) + [self.versions[reservation_id]]
+                                 for reservation_id in self.ids],
+            }
+            self.dirty = False
+
+        # Written next to the target and renamed, so a crash never leaves half a snapshot
+        partial = path + '.partial'
+        try:
+            with open(partial, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, path)
+        except OSError:
+            with self.lock:
+                self.dirty = True
+            raise
+        return True
+
+    def load_snapshot(self, path):
+        """Replace everything in memory with a snapshot's contents"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is snapshot format {data.get('format')}, expected {SNAPSHOT_FORMAT}")
+
+        with self.lock:
+            self._reset()
+            self.flights.clear()
+            for flight_id, flight_number, departure, destination in data['flights']:
+                self.flight_rows[flight_number] = Flight(flight_id, flight_number, departure, destination)
+                self.next_flight_id = max(self.next_flight_id, flight_id + 1)
+            for row in data['reservations']:
+                reservation = Reservation._make(row[:-1])
+                self._index(reservation)
+                self.versions[reservation.id] = row[-1]
+                self.ids.append(reservation.id)
+            self.ids.sort()
+            self.next_id = data['next_id']
+            # The log itself isn't saved; readers behind this version reload everything
+            self.change_version = data['change_version']
+
+    # Index maintenance; callers hold the lock
+
+    def _index(self, row):
+        self.rows[row.id] = row
+        self.search_text[row.id] = '\0'.join(fold(row[position]) for position in SEARCH_POSITIONS)
+        self.by_name[fold(row.name)].add(row.id)
+        self.by_flight[row.flight_number].add(row.id)
+        self.by_departure[row.departure].add(row.id)
+        self.by_destination[row.destination].add(row.id)
+        if row.date not in self.by_date:
+            bisect.insort(self.dates, row.date)
+        self.by_date[row.date].add(row.id)
+        self.seats[row.flight_number, row.date][row.seat_number] = row.id
+        self.bookings[row.flight_number, row.date, row.departure, row.destination] += 1
+
+    def _unindex(self, row):
+        del self.rows[row.id]
+        del self.search_text[row.id]
+        self._discard(self.by_name, fold(row.name), row.id)
+        self._discard(self.by_flight, row.flight_number, row.id)
+        self._discard(self.by_departure, row.departure, row.id)
+        self._discard(self.by_destination, row.destination, row.id)
+        if self._discard(self.by_date, row.date, row.id):
+            del self.dates[bisect.bisect_left(self.dates, row.date)]
+        self._discard(self.seats, (row.flight_number, row.date), row.seat_number)
+        key = (row.flight_number, row.date, row.departure, row.destination)
+        self.bookings[key] -= 1
+        if self.bookings[key] <= 0:
+            del self.bookings[key]
+
+    @staticmethod
+    def _discard(index, key, value):
+        """Remove value from index[key], dropping the key once empty; True if it was dropped"""
+        members = index[key]
+        if isinstance(members, dict):
+            members.pop(value, None)
+        else:
+            members.discard(value)
+        if not members:
+            del index[key]
+            return True
+        return False
+
+    def _claim_seat(self, flight_number, date, seat_number, reservation_id=None):
+        owner = self.seats.get((flight_number, date), {}).get(seat_number)
+        if owner is not None and owner != reservation_id:
+            raise SeatTakenError(flight_number, date, seat_number)
+
+    def _upsert_flight(self, flight_number, departure, destination):
+        # Same as INSERT OR IGNORE: the first booking of a number decides its route
+        if flight_number not in self.flight_rows:
+            flight = Flight(self.next_flight_id, flight_number, departure, destination)
+            self.flight_rows[flight_number] = flight
+            self.next_flight_id += 1
+            self.flights.added(flight.id, flight_number, departure, destination)
+
+    def _log(self, reservation_id, operation):
+        self.change_version += 1
+        self.changes.append((self.change_version, reservation_id, operation))
+        self.dirty = True
+        # Pruned as it grows rather than only at startup, since a kiosk may never restart
+        if len(self.changes) > 2 * CHANGE_LOG_RETENTION:
+            self.prune_changes()
+
+    # Writes
+
+    @timed
+    def create_reservation(self, name, flight_number, departure, destination, date, seat_number):
+        """Add new reservation and return its id"""
+        seat_number = normalize_seat(seat_number)
+        with self.lock:
+            self._claim_seat(flight_number, date, seat_number)
+            self._upsert_flight(flight_number, departure, destination)
+            reservation_id = self.next_id
+            self.next_id += 1
+            self._index(Reservation(reservation_id, name, flight_number, departure, destination, date, seat_number))
+            self.versions[reservation_id] = 1
+            self.ids.append(reservation_id)
+            self._log(reservation_id, 'insert')
+            return reservation_id
+
+    @timed
+    def update_reservation(self, reservation_id, name, flight_number, departure, destination, date, seat_number,
+                           expected_version=None):
+        """Update existing reservation; False if it doesn't exist, ReservationConflictError if stale"""
+        seat_number = normalize_seat(seat_number)
+        with self.lock:
+            previous = self.rows.get(reservation_id)
+            if previous is None:
+                return False
+            version = self.versions[reservation_id]
+            if expected_version is not None and version != expected_version:
+                raise ReservationConflictError(reservation_id, expected_version, previous, version)
+            self._claim_seat(flight_number, date, seat_number, reservation_id)
+            self._upsert_flight(flight_number, departure, destination)
+            self._unindex(previous)
+            self._index(Reservation(reservation_id, name, flight_number, departure, destination, date, seat_number))
+            self.versions[reservation_id] = version + 1
+            self._log(reservation_id, 'update')
+            return True
+
+    @timed
+    def delete_reservation(self, reservation_id):
+        """Delete reservation; False if it doesn't exist"""
+        with self.lock:
+            previous = self.rows.get(reservation_id)
+            if previous is None:
+                return False
+            self._unindex(previous)
+            del self.versions[reservation_id]
+            del self.ids[bisect.bisect_left(self.ids, reservation_id)]
+            self._log(reservation_id, 'delete')
+            return True
+
+    # Reads
+
+    @timed
+    def get_reservation_by_id(self, reservation_id):
+        """Get single reservation by ID, or None"""
+        return self.rows.get(reservation_id)
+
+    @timed
+    def get_versioned_reservation(self, reservation_id):
+        """Get (reservation, version) read together for editing, or None"""
+        with self.lock:
+            row = self.rows.get(reservation_id)
+            return None if row is None else (row, self.versions[reservation_id])
+
+    @timed
+    def get_reservations_by_ids(self, reservation_ids):
+        """Get several reservations, in id order; missing ids are skipped"""
+        with self.lock:
+            return [self.rows[i] for i in sorted(set(reservation_ids)) if i in self.rows]
+
+    @timed
+    def get_seat_status(self, flight_number, date, seat_number):
+        """Get (seat is free, number of free seats) for a flight and date"""
+        seat_map = SeatMap()
+        with self.lock:
+            for taken in self.seats.get((flight_number, date), ()):
+                seat_map.mark(taken)
+        available = not seat_map.is_taken(normalize_seat(seat_number)) if seat_number else None
+        return available, seat_map.free_count()
+
+    @timed
+    def count_reservations(self):
+        """Get the number of reservations"""
+        return len(self.rows)
+
+    @timed
+    def get_all_reservations(self, columnar=False):
+        """Get all reservations, as Reservation records or packed into ReservationColumns"""
+        with self.lock:
+            rows = [self.rows[i] for i in reversed(self.ids)]
+        return ReservationColumns(rows) if columnar else rows
+
+    @timed
+    def get_reservations_window(self, offset, limit):
+        """Get a slice of reservations (newest first) by row position"""
+        with self.lock:
+            end = max(len(self.ids) - offset, 0)
+            start = max(end - limit, 0)
+            return [self.rows[i] for i in reversed(self.ids[start:end])]
+
+    @timed
+    def search_reservations(self, name=None, flight_number=None, departure=None, destination=None,
+                            date_from=None, date_to=None, cursor=None, limit=50):
+        """Get one page of reservations (newest first) and the cursor for the next page"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        folded = fold(name) if name else None
+
+        def matches(row):
+            return ((not folded or fold(row.name) == folded)
+                    and (not flight_number or row.flight_number == flight_number)
+                    and (not departure or row.departure == departure)
+                    and (not destination or row.destination == destination)
+                    and (not date_from or row.date >= date_from)
+                    and (not date_to or row.date <= date_to))
+
+        with self.lock:
+            # Start from the smallest equality index, like the query planner would
+            candidates = None
+            for index, key in ((self.by_name, folded), (self.by_flight, flight_number),
+                               (self.by_departure, departure), (self.by_destination, destination)):
+                if key:
+                    ids = index.get(key, ())
+                    if candidates is None or len(ids) < len(candidates):
+                        candidates = ids
+
+            if candidates is None and (date_from or date_to):
+                start = bisect.bisect_left(self.dates, date_from) if date_from else 0
+                end = bisect.bisect_right(self.dates, date_to) if date_to else len(self.dates)
+                buckets = [self.by_date[date] for date in self.dates[start:end]]
+                # A wide range is cheaper to walk in id order, stopping after one page
+                if sum(len(bucket) for bucket in buckets) < len(self.rows) // 8:
+                    candidates = [i for bucket in buckets for i in bucket]
+
+            if candidates is None:
+                # Walk ids downwards from the cursor until the page (plus one) is full
+                end = bisect.bisect_left(self.ids, cursor) if cursor is not None else len(self.ids)
+                rows = []
+                for i in range(end - 1, -1, -1):
+                    row = self.rows[self.ids[i]]
+                    if matches(row):
+                        rows.append(row)
+                        if len(rows) > limit:
+                            break
+            else:
+                ids = heapq.nlargest(limit + 1, (i for i in candidates
+                                                 if (cursor is None or i < cursor) and matches(self.rows[i])))
+                rows = [self.rows[i] for i in ids]
+
+        # The extra row only tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1].id
+        return rows, next_cursor
+
+    @timed
+    def search_passengers(self, text, limit=200, use_fts=None):
+        """Find reservations by passenger name, flight or city, newest first
+
+        Works like the SQLite backend's LIKE fallback: every word must appear in one of the columns.
+        """
+        words = [fold(word) for word in re.findall(r'\w+', text)]
+        if not words:
+            return []
+        first, rest = words[0], words[1:]
+        found = []
+        with self.lock:
+            texts = self.search_text
+            for i in reversed(self.ids):
+                text = texts[i]
+                # Plain loops: this runs once per row, so generator overhead adds up
+                if first not in text:
+                    continue
+                for word in rest:
+                    if word not in text:
+                        break
+                else:
+                    found.append(self.rows[i])
+                    if len(found) >= limit:
+                        break
+        return found
+
+    # Change log
+
+    @timed
+    def get_change_version(self):
+        """Get the newest change log version"""
+        return self.change_version
+
+    @timed
+    def get_changes_since(self, version, max_changes=5000):
+        """Get a ChangeSet of everything after a change version, or None to reload everything"""
+        with self.lock:
+            if not self.changes:
+                return ChangeSet(version, [], [], 0) if version == self.change_version else None
+
+            low = self.changes[0][0]
+            if version < low - 1 or version > self.change_version:
+                return None
+
+            # Versions are consecutive, so the entries after version start at a known position
+            latest = {}
+            inserted = set()
+            for change_version, reservation_id, operation in self.changes[version - low + 1:]:
+                latest[reservation_id] = change_version
+                if operation == 'insert':
+                    inserted.add(reservation_id)
+            if len(latest) > max_changes:
+                return None
+
+            rows = [self.rows[i] for i in sorted(latest) if i in self.rows]
+
+        found = {row.id for row in rows}
+        deleted = [reservation_id for reservation_id in latest if reservation_id not in found]
+        existed_before = sum(1 for reservation_id in latest if reservation_id not in inserted)
+        new_version = max(latest.values(), default=version)
+        return ChangeSet(new_version, rows, deleted, len(found) - existed_before)
+
+    @timed
+    def prune_changes(self, keep=CHANGE_LOG_RETENTION):
+        """Drop all but the newest change log entries"""
+        with self.lock:
+            if len(self.changes) > keep:
+                del self.changes[:len(self.changes) - keep]
@@ -0,0 +1,226 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Histogram bucket upper bounds in seconds, as in Prometheus client defaults plus sub-millisecond ones
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric names in the Prometheus dump start with this
+PREFIX = 'flights_db'
+
+
+class Histogram:
+    """Latency counts in fixed buckets, plus a running sum and maximum"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th observation"""
+        if not self.count:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class SlowQuery:
+    """One statement that took longer than the slow query threshold"""
+
+    __slots__ = ('sql', 'params', 'seconds', 'plan', 'at')
+
+    def __init__(self, sql, params, seconds, plan):
+        self.sql = ' '.join(sql.split())
+        self.params = params
+        self.seconds = seconds
+        self.plan = plan
+        self.at = time.time()
+
+
+class Metrics:
+    """Operation latencies, query counts and a slow query log for one DatabaseManager"""
+
+    def __init__(self, enabled=None, slow_query_threshold=0.1, slow_log_size=100):
+        if enabled is None:
+            enabled = os.environ.get('FLIGHTS_DB_METRICS') == '1'
+        # Checked before any timing work, so a disabled registry costs one attribute read
+        self.enabled = enabled
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.histograms = {}
+        self.counters = {'queries': 0, 'slow_queries': 0, 'connections_opened': 0}
+        self.gauges = {}
+        # Callables returning {name: value}, read whenever metrics are exported
+        self._gauge_sources = []
+        self._lock = threading.Lock()
+
+    def observe(self, operation, seconds):
+        with self._lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def record_query(self, conn, sql, params, seconds):
+        """Count a statement and log it with its query plan if it was slow"""
+        self.increment('queries')
+        if seconds < self.slow_query_threshold:
+            return
+        self.increment('slow_queries')
+        plan = []
+        if sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            try:
+                # A plain cursor, so explaining isn't itself timed and logged
+                plan = [row[-1] for row in conn.cursor(sqlite3.Cursor).execute('EXPLAIN QUERY PLAN ' + sql,
+                                                                               params or ())]
+            except sqlite3.Error:
+                pass
+        self.slow_queries.append(SlowQuery(sql, params, seconds, plan))
+        print(f"Slow query ({seconds * 1000:.1f} ms): {' '.join(sql.split())[:200]}")
+        for line in plan:
+            print(f"  {line}")
+
+    def add_gauge_source(self, source):
+        self._gauge_sources.append(source)
+
+    def _refresh_gauges(self):
+        for source in self._gauge_sources:
+            try:
+                self.gauges.update(source())
+            except Exception as e:
+                print(f"Metrics gauge source failed: {e}")
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.slow_queries.clear()
+            for counter in self.counters:
+                self.counters[counter] = 0
+
+    def snapshot(self):
+        """Plain data for the debug panel: per-operation latency summary, counters, gauges"""
+        self._refresh_gauges()
+        with self._lock:
+            operations = [
+                (operation, histogram.count, histogram.percentile(50), histogram.percentile(95),
+                 histogram.percentile(99), histogram.max, histogram.sum)
+                for operation, histogram in sorted(self.histograms.items())
+            ]
+            return {
+                'enabled': self.enabled,
+                'operations': operations,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'slow_queries': list(self.slow_queries),
+            }
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        self._refresh_gauges()
+        lines = [
+            f'# HELP {PREFIX}_operation_seconds DatabaseManager call latency',
+            f'# TYPE {PREFIX}_operation_seconds histogram',
+        ]
+        with self._lock:
+            for operation, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'{PREFIX}_operation_seconds_bucket{{operation="{operation}",le="+Inf"}} '
+                             f'{histogram.count}')
+                lines.append(f'{PREFIX}_operation_seconds_sum{{operation="{operation}"}} {histogram.sum:.6f}')
+                lines.append(f'{PREFIX}_operation_seconds_count{{operation="{operation}"}} {histogram.count}')
+
+            for counter, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {PREFIX}_{counter}_total counter')
+                lines.append(f'{PREFIX}_{counter}_total {value}')
+            for gauge, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {PREFIX}_{gauge} gauge')
+                lines.append(f'{PREFIX}_{gauge} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports statement timings to its connection's Metrics"""
+
+    def execute(self, sql, parameters=()):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_query(self.connection, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_query(self.connection, sql, None, time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are InstrumentedCursors"""
+
+    metrics = Metrics(enabled=False)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3's own shortcuts call the C-level execute, skipping the override above
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def timed(method):
+    """Record a DatabaseManager method's latency under its name while metrics are enabled"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+
+    return wrapper
@@ -0,0 +1,185 @@
+import sqlite3
+import time
+
+# user_version written by DatabaseManager._create_schema; migrations start after it
+BASELINE_VERSION = 1
+
+
+class Migration:
+    """One schema step, identified by the user_version it leaves behind
+
+    schema(cursor) runs in a single short transaction and must be safe to repeat.
+    backfill(cursor, first_id, last_id) then runs over reservations in id ranges,
+    one transaction per range, so other writers get the lock between batches.
+    """
+
+    def __init__(self, version, description, schema=None, backfill=None):
+        self.version = version
+        self.description = description
+        self.schema = schema
+        self.backfill = backfill
+
+    def __repr__(self):
+        return f"Migration({self.version}: {self.description})"
+
+
+def _normalize_seat_numbers(cursor, first_id, last_id):
+    # OR IGNORE leaves rows alone when the normalised seat is already booked;
+    # those are real double bookings for a person to sort out
+    cursor.execute('''
+                   UPDATE OR IGNORE reservations
+                   SET seat_number = UPPER(TRIM(seat_number))
+                   WHERE id BETWEEN ? AND ?
+                     AND seat_number != UPPER(TRIM(seat_number))
+                   ''', (first_id, last_id))
+    return cursor.rowcount
+
+
+def _add_route_date_index(cursor):
+    # Covers the per-route daily report; the old (departure, destination) index is its prefix
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_route_date ON reservations (departure, destination, date)')
+    cursor.execute('DROP INDEX IF EXISTS idx_reservations_route')
+
+
+def _add_row_version(cursor):
+    # Bumped by every update, so editors can detect changes made since they read a row.
+    # A constant default makes this a metadata-only change, with no table rewrite
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(reservations)')}
+    if 'version' not in columns:
+        cursor.execute('ALTER TABLE reservations ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+# Append only, in version order; never edit a migration that has shipped
+MIGRATIONS = [
+    Migration(2, "normalise seat numbers booked before they were upper-cased",
+              backfill=_normalize_seat_numbers),
+    Migration(3, "covering index for route reports",
+              schema=_add_route_date_index),
+    Migration(4, "row versions for optimistic concurrency",
+              schema=_add_row_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else BASELINE_VERSION
+
+
+class MigrationResult:
+    """Timing for one applied migration"""
+
+    def __init__(self, migration):
+        self.migration = migration
+        self.seconds = 0.0
+        self.batches = 0
+        self.rows_changed = 0
+        # Longest single transaction, i.e. the longest other writers had to wait
+        self.max_lock_seconds = 0.0
+
+
+class Migrator:
+    """Brings a database up to LATEST_VERSION, resuming interrupted backfills"""
+
+    def __init__(self, db, migrations=MIGRATIONS, batch_size=5000, pause=0.005):
+        self.db = db
+        self.migrations = migrations
+        self.batch_size = batch_size
+        # Sleep between backfill batches; without it, writers sleeping in the busy handler
+        # rarely win the lock before the next batch takes it again
+        self.pause = pause
+
+    def current_version(self):
+        with self.db.pool.connection() as conn:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def pending(self):
+        version = self.current_version()
+        if version < BASELINE_VERSION:
+            # The baseline schema has to be created first
+            return []
+        return [migration for migration in self.migrations if migration.version > version]
+
+    def history(self):
+        """Applied and in-progress migrations as (version, description, started, finished)"""
+        with self.db.pool.connection() as conn:
+            self._create_history(conn)
+            return conn.execute('''
+                                SELECT version, description, started_at, finished_at
+                                FROM schema_migrations
+                                ORDER BY version
+                                ''').fetchall()
+
+    def _create_history(self, conn):
+        conn.execute('''
+                     CREATE TABLE IF NOT EXISTS schema_migrations
+                     (
+                         version       INTEGER PRIMARY KEY,
+                         description   TEXT    NOT NULL,
+                         started_at    TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                         finished_at   TEXT,
+                         backfilled_to INTEGER NOT NULL DEFAULT 0
+                     )
+                     ''')
+        conn.commit()
+
+    def run(self, progress=None):
+        """Apply every pending migration in order; returns a MigrationResult for each"""
+        results = []
+        for migration in self.pending():
+            print(f"Applying migration {migration.version}: {migration.description}")
+            results.append(self.apply(migration, progress))
+        return results
+
+    def apply(self, migration, progress=None):
+        result = MigrationResult(migration)
+        start = time.perf_counter()
+
+        with self.db.pool.connection() as conn:
+            self._create_history(conn)
+            cursor = conn.cursor()
+
+            lock_start = time.perf_counter()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('INSERT OR IGNORE INTO schema_migrations (version, description) VALUES (?, ?)',
+                           (migration.version, migration.description))
+            if migration.schema:
+                migration.schema(cursor)
+            conn.commit()
+            result.max_lock_seconds = time.perf_counter() - lock_start
+
+            if migration.backfill:
+                self._backfill(conn, migration, result, progress)
+
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute("UPDATE schema_migrations SET finished_at = CURRENT_TIMESTAMP WHERE version = ?",
+                           (migration.version,))
+            cursor.execute(f'PRAGMA user_version = {int(migration.version)}')
+            conn.commit()
+
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _backfill(self, conn, migration, result, progress):
+        """Run the backfill in id ranges, recording progress so a restart picks up where it stopped"""
+        cursor = conn.cursor()
+        position = cursor.execute('SELECT backfilled_to FROM schema_migrations WHERE version = ?',
+                                  (migration.version,)).fetchone()[0]
+        last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM reservations').fetchone()[0]
+
+        while position < last_id:
+            end = min(position + self.batch_size, last_id)
+            lock_start = time.perf_counter()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                result.rows_changed += max(migration.backfill(cursor, position + 1, end), 0)
+                cursor.execute('UPDATE schema_migrations SET backfilled_to = ? WHERE version = ?',
+                               (end, migration.version))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            result.max_lock_seconds = max(result.max_lock_seconds, time.perf_counter() - lock_start)
+            result.batches += 1
+            position = end
+
+            if progress:
+                progress(migration, position, last_id)
+            if self.pause:
+                time.sleep(self.pause)
@@ -0,0 +1,77 @@
+from array import array
+from collections import namedtuple
+
+RESERVATION_FIELDS = ('id', 'name', 'flight_number', 'departure', 'destination', 'date', 'seat_number')
+
+
+class Reservation(namedtuple('Reservation', RESERVATION_FIELDS)):
+    """One reservations row; still a tuple, so positional code and Treeview values keep working"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return dict(zip(RESERVATION_FIELDS, self))
+
+
+def reservation_factory(cursor, row):
+    """sqlite3 row_factory that builds Reservation records"""
+    # tuple.__new__ skips the namedtuple argument parsing, which matters on big scans
+    return tuple.__new__(Reservation, row)
+
+
+class ReservationColumns:
+    """Column-oriented reservations for large scans: ids in an array, text columns dictionary-encoded
+
+    Flight numbers, cities and dates repeat across thousands of rows, so each distinct
+    string is stored once and rows only hold 4-byte codes.
+    """
+
+    TEXT_FIELDS = RESERVATION_FIELDS[1:]
+
+    def __init__(self, rows=()):
+        self.ids = array('q')
+        self._codes = [array('I') for _ in self.TEXT_FIELDS]
+        self._values = [[] for _ in self.TEXT_FIELDS]
+        self._lookup = [{} for _ in self.TEXT_FIELDS]
+        self.extend(rows)
+
+    def append(self, row):
+        self.ids.append(row[0])
+        for codes, values, lookup, value in zip(self._codes, self._values, self._lookup, row[1:]):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(values)
+                values.append(value)
+            codes.append(code)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return tuple.__new__(Reservation, [self.ids[index]] + [
+            values[codes[index]] for codes, values in zip(self._codes, self._values)
+        ])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, field):
+        """All values of one field, in row order"""
+        if field == 'id':
+            return list(self.ids)
+        i = self.TEXT_FIELDS.index(field)
+        values = self._values[i]
+        return [values[code] for code in self._codes[i]]
+
+    def distinct(self, field):
+        """Number of different values stored for a text field"""
+        return len(self._values[self.TEXT_FIELDS.index(field)])
@@ -0,0 +1,192 @@
+import sqlite3
+
+from seat_map import SEAT_ROWS, SEAT_LETTERS
+
+# Seats per flight in the standard cabin layout
+CAPACITY = SEAT_ROWS * len(SEAT_LETTERS)
+
+SUMMARY_TABLE = 'report_flight_daily'
+
+# Bookings per flight, date and route, kept current by triggers once enabled
+SUMMARY_DDL = [
+    f'''
+    CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE}
+    (
+        flight_number TEXT    NOT NULL,
+        date          TEXT    NOT NULL,
+        departure     TEXT    NOT NULL,
+        destination   TEXT    NOT NULL,
+        bookings      INTEGER NOT NULL,
+        PRIMARY KEY (flight_number, date, departure, destination)
+    ) WITHOUT ROWID
+    ''',
+    f'CREATE INDEX IF NOT EXISTS idx_{SUMMARY_TABLE}_route ON {SUMMARY_TABLE} (departure, destination, date)',
+    f'CREATE INDEX IF NOT EXISTS idx_{SUMMARY_TABLE}_date ON {SUMMARY_TABLE} (date)',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_insert
+        AFTER INSERT ON reservations
+    BEGIN
+        INSERT INTO {SUMMARY_TABLE} (flight_number, date, departure, destination, bookings)
+        VALUES (NEW.flight_number, NEW.date, NEW.departure, NEW.destination, 1)
+        ON CONFLICT (flight_number, date, departure, destination) DO UPDATE SET bookings = bookings + 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_delete
+        AFTER DELETE ON reservations
+    BEGIN
+        UPDATE {SUMMARY_TABLE} SET bookings = bookings - 1
+        WHERE flight_number = OLD.flight_number AND date = OLD.date
+          AND departure = OLD.departure AND destination = OLD.destination;
+        DELETE FROM {SUMMARY_TABLE}
+        WHERE flight_number = OLD.flight_number AND date = OLD.date
+          AND departure = OLD.departure AND destination = OLD.destination AND bookings <= 0;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_update
+        AFTER UPDATE OF flight_number, date, departure, destination ON reservations
+    BEGIN
+        UPDATE {SUMMARY_TABLE} SET bookings = bookings - 1
+        WHERE flight_number = OLD.flight_number AND date = OLD.date
+          AND departure = OLD.departure AND destination = OLD.destination;
+        DELETE FROM {SUMMARY_TABLE}
+        WHERE flight_number = OLD.flight_number AND date = OLD.date
+          AND departure = OLD.departure AND destination = OLD.destination AND bookings <= 0;
+        INSERT INTO {SUMMARY_TABLE} (flight_number, date, departure, destination, bookings)
+        VALUES (NEW.flight_number, NEW.date, NEW.departure, NEW.destination, 1)
+        ON CONFLICT (flight_number, date, departure, destination) DO UPDATE SET bookings = bookings + 1;
+    END
+    ''',
+]
+
+
+def _date_filter(column, date_from, date_to, conditions, params):
+    if date_from:
+        conditions.append(f'{column} >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append(f'{column} <= ?')
+        params.append(date_to)
+
+
+def _where(conditions):
+    return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+class ReportEngine:
+    """Aggregate booking reports, read from the summary table when it is enabled"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def summaries_enabled(self):
+        with self.db.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                (SUMMARY_TABLE,)).fetchone() is not None
+
+    def enable_summaries(self):
+        """Create the summary table and its triggers, filled from the current bookings"""
+        with self.db.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in SUMMARY_DDL:
+                    cursor.execute(statement)
+                cursor.execute(f'DELETE FROM {SUMMARY_TABLE}')
+                cursor.execute(f'''
+                               INSERT INTO {SUMMARY_TABLE} (flight_number, date, departure, destination, bookings)
+                               SELECT flight_number, date, departure, destination, COUNT(*)
+                               FROM reservations
+                               GROUP BY flight_number, date, departure, destination
+                               ''')
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+    def disable_summaries(self):
+        """Drop the summary table and triggers; reports fall back to the reservations indexes"""
+        with self.db.pool.connection() as conn:
+            for action in ('insert', 'delete', 'update'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {SUMMARY_TABLE}_{action}')
+            conn.execute(f'DROP TABLE IF EXISTS {SUMMARY_TABLE}')
+            conn.commit()
+
+    def load_factors(self, date_from=None, date_to=None, limit=50, use_summary=None):
+        """Fullest flights as (flight_number, date, booked, capacity, load_factor)"""
+        if use_summary is None:
+            use_summary = self.summaries_enabled()
+        conditions, params = [], []
+        _date_filter('date', date_from, date_to, conditions, params)
+        params.append(limit)
+
+        # Without summaries, idx_reservations_seat covers (flight_number, date)
+        source = SUMMARY_TABLE if use_summary else 'reservations'
+        booked = 'SUM(bookings)' if use_summary else 'COUNT(*)'
+        with self.db.pool.connection() as conn:
+            rows = conn.execute(f'''
+                                SELECT flight_number, date, {booked} AS booked
+                                FROM {source}{_where(conditions)}
+                                GROUP BY flight_number, date
+                                ORDER BY booked DESC, date, flight_number
+                                LIMIT ?
+                                ''', params).fetchall()
+        return [(flight_number, date, booked, CAPACITY, booked / CAPACITY)
+                for flight_number, date, booked in rows]
+
+    def route_daily(self, departure=None, destination=None, date_from=None, date_to=None, limit=500,
+                    use_summary=None):
+        """Bookings per route and day as (departure, destination, date, bookings)"""
+        if use_summary is None:
+            use_summary = self.summaries_enabled()
+        conditions, params = [], []
+        if departure:
+            conditions.append('departure = ?')
+            params.append(departure)
+        if destination:
+            conditions.append('destination = ?')
+            params.append(destination)
+        _date_filter('date', date_from, date_to, conditions, params)
+        params.append(limit)
+
+        # Without summaries, idx_reservations_route_date covers the whole query
+        source = SUMMARY_TABLE if use_summary else 'reservations'
+        bookings = 'SUM(bookings)' if use_summary else 'COUNT(*)'
+        with self.db.pool.connection() as conn:
+            return conn.execute(f'''
+                                SELECT departure, destination, date, {bookings}
+                                FROM {source}{_where(conditions)}
+                                GROUP BY departure, destination, date
+                                ORDER BY departure, destination, date
+                                LIMIT ?
+                                ''', params).fetchall()
+
+    def top_destinations(self, date_from=None, date_to=None, limit=10, use_summary=None):
+        """Most booked destinations as (destination, bookings)"""
+        if use_summary is None:
+            use_summary = self.summaries_enabled()
+        conditions, params = [], []
+        _date_filter('date', date_from, date_to, conditions, params)
+        params.append(limit)
+
+        source = SUMMARY_TABLE if use_summary else 'reservations'
+        bookings = 'SUM(bookings)' if use_summary else 'COUNT(*)'
+        with self.db.pool.connection() as conn:
+            return conn.execute(f'''
+                                SELECT destination, {bookings} AS bookings
+                                FROM {source}{_where(conditions)}
+                                GROUP BY destination
+                                ORDER BY bookings DESC, destination
+                                LIMIT ?
+                                ''', params).fetchall()
+
+    def dashboard(self, date_from=None, date_to=None):
+        """Everything the dashboard page shows, read in one worker call"""
+        use_summary = self.summaries_enabled()
+        return {
+            'summaries': use_summary,
+            'load_factors': self.load_factors(date_from, date_to, use_summary=use_summary),
+            'route_daily': self.route_daily(date_from=date_from, date_to=date_to, use_summary=use_summary),
+            'top_destinations': self.top_destinations(date_from, date_to, use_summary=use_summary),
+        }
@@ -1,157 +1,364 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-
-
-class ReservationsPage(tk.Frame):
-    def __init__(self, parent, controller, db):
-        tk.Frame.__init__(self, parent)
-        self.controller = controller
-        self.db = db
-        self.setup_ui()
-
-    def setup_ui(self):
-        """Setup the reservations page UI"""
-        # Main container
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(expand=True, fill='both')
-
-        # Header frame
-        header_frame = ttk.Frame(main_frame)
-        header_frame.pack(fill='x', pady=(0, 20))
-
-        # Title
-        title_label = ttk.Label(header_frame, text="All Reservations",
-                                style='Title.TLabel')
-        title_label.pack(side='left')
-
-        # Buttons in header
-        buttons_frame = ttk.Frame(header_frame)
-        buttons_frame.pack(side='right')
-
-        refresh_btn = ttk.Button(buttons_frame, text="🔄 Refresh",
-                                 command=self.refresh_data)
-        refresh_btn.pack(side='left', padx=(0, 10))
-
-        back_btn = ttk.Button(buttons_frame, text="← Back to Home",
-                              command=lambda: self.controller.show_frame("HomePage"))
-        back_btn.pack(side='left')
-
-        # Table frame
-        table_frame = ttk.Frame(main_frame)
-        table_frame.pack(fill='both', expand=True)
-
-        # Create treeview
-        columns = ('ID', 'Name', 'Flight', 'Departure', 'Destination', 'Date', 'Seat')
-        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
-
-        # Define headings and column widths
-        column_widths = {'ID': 60, 'Name': 150, 'Flight': 100, 'Departure': 120,
-                         'Destination': 120, 'Date': 100, 'Seat': 80}
-
-        for col in columns:
-            self.tree.heading(col, text=col, anchor='center')
-            self.tree.column(col, width=column_widths[col], anchor='center')
-
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
-        h_scrollbar = ttk.Scrollbar(table_frame, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-        # Grid treeview and scrollbars
-        self.tree.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
-        h_scrollbar.grid(row=1, column=0, sticky='ew')
-
-        # Configure grid weights
-        table_frame.columnconfigure(0, weight=1)
-        table_frame.rowconfigure(0, weight=1)
-
-        # Action buttons frame
-        action_frame = ttk.Frame(main_frame)
-        action_frame.pack(fill='x', pady=20)
-
-        # Action buttons
-        edit_btn = ttk.Button(action_frame, text="✏️ Edit Selected",
-                              command=self.edit_selected,
-                              style='Action.TButton')
-        edit_btn.pack(side='left', padx=(0, 10))
-
-        delete_btn = ttk.Button(action_frame, text="🗑️ Delete Selected",
-                                command=self.delete_selected)
-        delete_btn.pack(side='left', padx=(0, 10))
-
-        book_new_btn = ttk.Button(action_frame, text="➕ Book New Flight",
-                                  command=lambda: self.controller.show_frame("BookingPage"))
-        book_new_btn.pack(side='right')
-
-        # Info label
-        self.info_label = ttk.Label(main_frame, text="", font=('Arial', 10))
-        self.info_label.pack(pady=10)
-
-        # Double-click binding for edit
-        self.tree.bind('<Double-1>', lambda e: self.edit_selected())
-
-        # Load initial data
-        self.refresh_data()
-
-    def refresh_data(self):
-        """Refresh the reservations data"""
-        try:
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            # Load data from database
-            reservations = self.db.get_all_reservations()
-
-            if reservations:
-                for reservation in reservations:
-                    self.tree.insert('', 'end', values=reservation)
-                self.info_label.config(text=f"Total reservations: {len(reservations)}")
-            else:
-                self.info_label.config(text="No reservations found. Click 'Book New Flight' to add one.")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load reservations: {str(e)}")
-            self.info_label.config(text="Error loading data")
-
-    def get_selected_reservation(self):
-        """Get the selected reservation"""
-        selection = self.tree.selection()
-        if not selection:
-            messagebox.showwarning("Warning", "Please select a reservation first!")
-            return None
-
-        item = self.tree.item(selection[0])
-        return item['values']
-
-    def edit_selected(self):
-        """Edit the selected reservation"""
-        reservation = self.get_selected_reservation()
-        if reservation:
-            reservation_id = reservation[0]
-            self.controller.show_edit_page(reservation_id)
-
-    def delete_selected(self):
-        """Delete the selected reservation"""
-        reservation = self.get_selected_reservation()
-        if not reservation:
-            return
-
-        # Confirm deletion
-        result = messagebox.askyesnocancel(
-            "Confirm Delete",
-            f"Are you sure you want to delete this reservation?\n\n"
-            f"Passenger: {reservation[1]}\n"
-            f"Flight: {reservation[2]}\n"
-            f"Date: {reservation[5]}"
-        )
-
-        if result:
-            try:
-                reservation_id = reservation[0]
-                self.db.delete_reservation(reservation_id)
-                messagebox.showinfo("Success", "Reservation deleted successfully!")
-                self.refresh_data()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete reservation: {str(e)}")
\ No newline at end of file
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from records import Reservation
+from virtual_tree import VirtualTreeview
+
+# Above this many reservations the table only builds the rows on screen
+VIRTUAL_THRESHOLD = 1000
+
+# Search runs this long after the last keystroke, and shows at most this many rows
+SEARCH_DELAY = 300
+SEARCH_LIMIT = 200
+
+
+def load_reservations(db, page, page_size):
+    """Everything a table refresh reads: (version, total, all rows or None, {page: rows} or None)"""
+    # Read the version first; changes racing the load are applied again on the next sync
+    version = db.get_change_version()
+    total = db.count_reservations()
+
+    if total > VIRTUAL_THRESHOLD:
+        # Only the page under the current scroll position is needed up front
+        rows = db.get_reservations_window(page * page_size, page_size)
+        return version, total, None, {page: rows}
+
+    return version, total, db.get_all_reservations(), None
+
+
+class ReservationsPage(tk.Frame):
+    def __init__(self, parent, controller, db):
+        tk.Frame.__init__(self, parent)
+        self.controller = controller
+        self.db = db
+        self.refresh_generation = 0
+        self.synced_version = None  # change log version the table reflects
+        self.total = 0
+        self.search_job = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the reservations page UI"""
+        # Main container
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill='both')
+
+        # Header frame
+        header_frame = ttk.Frame(main_frame)
+        header_frame.pack(fill='x', pady=(0, 20))
+
+        # Title
+        title_label = ttk.Label(header_frame, text="All Reservations",
+                                style='Title.TLabel')
+        title_label.pack(side='left')
+
+        # Buttons in header
+        buttons_frame = ttk.Frame(header_frame)
+        buttons_frame.pack(side='right')
+
+        refresh_btn = ttk.Button(buttons_frame, text="🔄 Refresh",
+                                 command=self.refresh_data)
+        refresh_btn.pack(side='left', padx=(0, 10))
+
+        back_btn = ttk.Button(buttons_frame, text="← Back to Home",
+                              command=lambda: self.controller.show_frame("HomePage"))
+        back_btn.pack(side='left')
+
+        # Search frame
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill='x', pady=(0, 10))
+
+        search_label = ttk.Label(search_frame, text="🔍 Search:")
+        search_label.pack(side='left', padx=(0, 10))
+
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=('Arial', 11))
+        self.search_entry.pack(side='left', fill='x', expand=True)
+        self.search_entry.bind('<KeyRelease>', self.schedule_search)
+
+        clear_search_btn = ttk.Button(search_frame, text="✖ Clear",
+                                      command=self.clear_search)
+        clear_search_btn.pack(side='left', padx=(10, 0))
+
+        # Table frame
+        table_frame = ttk.Frame(main_frame)
+        table_frame.pack(fill='both', expand=True)
+
+        # Create treeview
+        columns = ('ID', 'Name', 'Flight', 'Departure', 'Destination', 'Date', 'Seat')
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
+
+        # Define headings and column widths
+        column_widths = {'ID': 60, 'Name': 150, 'Flight': 100, 'Departure': 120,
+                         'Destination': 120, 'Date': 100, 'Seat': 80}
+
+        for col in columns:
+            self.tree.heading(col, text=col, anchor='center')
+            self.tree.column(col, width=column_widths[col], anchor='center')
+
+        # Scrollbars
+        v_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
+        h_scrollbar = ttk.Scrollbar(table_frame, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+
+        # Virtual scrolling for large tables, rows are fetched page by page on the worker
+        self.virtual = VirtualTreeview(self.tree, v_scrollbar, self.db.get_reservations_window,
+                                       fetch_after=self.rows_after, submit=self.controller.worker.submit)
+
+        # Grid treeview and scrollbars
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        v_scrollbar.grid(row=0, column=1, sticky='ns')
+        h_scrollbar.grid(row=1, column=0, sticky='ew')
+
+        # Configure grid weights
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+
+        # Action buttons frame
+        action_frame = ttk.Frame(main_frame)
+        action_frame.pack(fill='x', pady=20)
+
+        # Action buttons
+        edit_btn = ttk.Button(action_frame, text="✏️ Edit Selected",
+                              command=self.edit_selected,
+                              style='Action.TButton')
+        edit_btn.pack(side='left', padx=(0, 10))
+
+        delete_btn = ttk.Button(action_frame, text="🗑️ Delete Selected",
+                                command=self.delete_selected)
+        delete_btn.pack(side='left', padx=(0, 10))
+
+        book_new_btn = ttk.Button(action_frame, text="➕ Book New Flight",
+                                  command=lambda: self.controller.show_frame("BookingPage"))
+        book_new_btn.pack(side='right')
+
+        # Info label
+        self.info_label = ttk.Label(main_frame, text="", font=('Arial', 10))
+        self.info_label.pack(pady=10)
+
+        # Double-click binding for edit
+        self.tree.bind('<Double-1>', lambda e: self.edit_selected())
+
+        # Data is loaded by sync_data when the page is first shown
+
+    def refresh_data(self):
+        """Refresh the reservations data"""
+        if self.search_text():
+            self.run_search()
+            return
+
+        # Only the newest refresh may draw; older results are dropped
+        self.refresh_generation += 1
+        generation = self.refresh_generation
+
+        self.info_label.config(text="Loading reservations...")
+        self.config(cursor='watch')
+        try:
+            self.controller.worker.submit(
+                self.load_data,
+                callback=lambda data: self.on_data_loaded(generation, data),
+                errback=self.on_load_failed
+            )
+        except Exception as e:
+            self.on_load_failed(e)
+
+    def rows_after(self, reservation_id, limit):
+        """The next rows below a reservation id, read by key; runs on the worker thread"""
+        rows, _ = self.db.search_reservations(cursor=reservation_id, limit=limit)
+        return rows
+
+    def load_data(self):
+        """Read the rows refresh_data will show; runs on the worker thread"""
+        return load_reservations(self.db, self.virtual.current_page(), self.virtual.page_size)
+
+    def on_data_loaded(self, generation, data):
+        """Fill the table once load_data has finished"""
+        if generation != self.refresh_generation:
+            return
+        self.config(cursor='')
+        version, total, reservations, preloaded = data
+        self.synced_version = version
+        self.total = total
+
+        if reservations is None:
+            # Only the visible window is built, the rest is fetched while scrolling
+            self.virtual.attach()
+            self.virtual.reset(total, preloaded)
+        else:
+            self.virtual.detach()
+
+            # Clear existing items in one call
+            self.tree.delete(*self.tree.get_children())
+
+            # Load data from database
+            for reservation in reservations:
+                self.tree.insert('', 'end', iid=str(reservation.id), values=reservation)
+
+        self.update_total_label()
+
+    def update_total_label(self):
+        """Show the reservation count under the table"""
+        if self.total:
+            self.info_label.config(text=f"Total reservations: {self.total}")
+        else:
+            self.info_label.config(text="No reservations found. Click 'Book New Flight' to add one.")
+
+    def sync_data(self):
+        """Apply only the reservations changed since the last load"""
+        if self.synced_version is None or self.search_text():
+            self.refresh_data()
+            return
+
+        generation = self.refresh_generation
+        try:
+            self.controller.worker.submit(
+                self.db.get_changes_since, self.synced_version,
+                callback=lambda changes: self.on_changes_loaded(generation, changes),
+                errback=self.on_load_failed
+            )
+        except Exception as e:
+            self.on_load_failed(e)
+
+    def on_changes_loaded(self, generation, changes):
+        """Patch the table with a ChangeSet from sync_data"""
+        # A full refresh started meanwhile and will draw everything anyway
+        if generation != self.refresh_generation:
+            return
+
+        # The change log no longer covers our version, or too much changed
+        if changes is None:
+            self.refresh_data()
+            return
+
+        self.synced_version = changes.version
+        if not changes:
+            return
+
+        self.total += changes.added
+        was_virtual = self.virtual.active
+        if was_virtual != (self.total > VIRTUAL_THRESHOLD):
+            self.refresh_data()
+            return
+
+        if was_virtual:
+            # Re-read just the visible window with the new row count
+            self.virtual.reset(self.total)
+        else:
+            for reservation_id in changes.deleted_ids:
+                if self.tree.exists(str(reservation_id)):
+                    self.tree.delete(str(reservation_id))
+
+            # New ids are always the largest, so they go on top in ascending order
+            for reservation in sorted(changes.rows, key=lambda row: row.id):
+                iid = str(reservation.id)
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=reservation)
+                else:
+                    self.tree.insert('', 0, iid=iid, values=reservation)
+
+        self.update_total_label()
+
+    def search_text(self):
+        return self.search_var.get().strip()
+
+    def schedule_search(self, event=None):
+        """Search shortly after the user stops typing"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY, self.refresh_data)
+
+    def run_search(self):
+        """Show the reservations matching the search box"""
+        self.search_job = None
+        self.refresh_generation += 1
+        generation = self.refresh_generation
+        text = self.search_text()
+
+        # The table no longer mirrors the change log; leaving search reloads it
+        self.synced_version = None
+        self.config(cursor='watch')
+        try:
+            self.controller.worker.submit(
+                self.db.search_passengers, text, SEARCH_LIMIT,
+                callback=lambda rows: self.on_search_results(generation, text, rows),
+                errback=self.on_load_failed
+            )
+        except Exception as e:
+            self.on_load_failed(e)
+
+    def on_search_results(self, generation, text, rows):
+        """Fill the table with search results, best match first"""
+        if generation != self.refresh_generation:
+            return
+        self.config(cursor='')
+        self.virtual.detach()
+        self.tree.delete(*self.tree.get_children())
+        for reservation in rows:
+            self.tree.insert('', 'end', iid=str(reservation.id), values=reservation)
+
+        if not rows:
+            self.info_label.config(text=f"No reservations match '{text}'")
+        elif len(rows) >= SEARCH_LIMIT:
+            self.info_label.config(text=f"Showing the best {len(rows)} matches for '{text}'")
+        else:
+            self.info_label.config(text=f"{len(rows)} matches for '{text}'")
+
+    def clear_search(self):
+        """Leave search and show all reservations again"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+        self.search_var.set('')
+        self.refresh_data()
+
+    def on_load_failed(self, error):
+        """Called on the Tk thread if the reservations could not be read"""
+        self.config(cursor='')
+        messagebox.showerror("Error", f"Failed to load reservations: {str(error)}")
+        self.info_label.config(text="Error loading data")
+
+    def get_selected_reservation(self):
+        """Get the selected reservation"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a reservation first!")
+            return None
+
+        item = self.tree.item(selection[0])
+        return Reservation._make(item['values'])
+
+    def edit_selected(self):
+        """Edit the selected reservation"""
+        reservation = self.get_selected_reservation()
+        if reservation:
+            reservation_id = reservation.id
+            self.controller.show_edit_page(reservation_id)
+
+    def delete_selected(self):
+        """Delete the selected reservation"""
+        reservation = self.get_selected_reservation()
+        if not reservation:
+            return
+
+        # Confirm deletion
+        result = messagebox.askyesnocancel(
+            "Confirm Delete",
+            f"Are you sure you want to delete this reservation?\n\n"
+            f"Passenger: {reservation.name}\n"
+            f"Flight: {reservation.flight_number}\n"
+            f"Date: {reservation.date}"
+        )
+
+        if result:
+            reservation_id = reservation.id
+            self.info_label.config(text="Deleting reservation...")
+            self.controller.worker.submit(
+                self.db.delete_reservation, reservation_id,
+                callback=self.on_deleted,
+                errback=lambda error: messagebox.showerror("Error", f"Failed to delete reservation: {str(error)}")
+            )
+
+    def on_deleted(self, result):
+        """Called on the Tk thread once the reservation is deleted"""
+        messagebox.showinfo("Success", "Reservation deleted successfully!")
+        self.sync_data()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Default cabin layout: rows 1-30, seats A-F
+SEAT_ROWS = 30
+SEAT_LETTERS = 'ABCDEF'
+
+SEAT_PATTERN = re.compile(r'^(\d{1,3})([A-Z])$')
+
+
+class SeatTakenError(Exception):
+    """Raised when a seat is already booked on that flight and date"""
+
+    def __init__(self, flight_number, date, seat_number):
+        super().__init__(f"Seat {seat_number} is already booked on flight {flight_number} for {date}")
+        self.flight_number = flight_number
+        self.date = date
+        self.seat_number = seat_number
+
+
+def normalize_seat(seat_number):
+    """Canonical seat spelling, e.g. ' 12a' -> '12A'"""
+    return seat_number.strip().upper()
+
+
+class SeatMap:
+    """Bitmap of booked seats for one flight on one date"""
+
+    __slots__ = ('rows', 'letters', 'bits', 'extra', 'loaded_at')
+
+    def __init__(self, rows=SEAT_ROWS, letters=SEAT_LETTERS):
+        self.rows = rows
+        self.letters = letters
+        self.bits = bytearray((rows * len(letters) + 7) // 8)
+        # Seats outside the standard layout are rare, a set is enough for them
+        self.extra = set()
+        self.loaded_at = time.monotonic()
+
+    @property
+    def capacity(self):
+        return self.rows * len(self.letters)
+
+    def index(self, seat_number):
+        """Bit position of a seat, or None if it's outside the layout"""
+        match = SEAT_PATTERN.match(seat_number)
+        if not match:
+            return None
+        row = int(match.group(1))
+        column = self.letters.find(match.group(2))
+        if row < 1 or row > self.rows or column < 0:
+            return None
+        return (row - 1) * len(self.letters) + column
+
+    def is_taken(self, seat_number):
+        i = self.index(seat_number)
+        if i is None:
+            return seat_number in self.extra
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def mark(self, seat_number):
+        i = self.index(seat_number)
+        if i is None:
+            self.extra.add(seat_number)
+        else:
+            self.bits[i >> 3] |= 1 << (i & 7)
+
+    def release(self, seat_number):
+        i = self.index(seat_number)
+        if i is None:
+            self.extra.discard(seat_number)
+        else:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def booked_count(self):
+        return sum(bin(byte).count('1') for byte in self.bits) + len(self.extra)
+
+    def free_count(self):
+        """Free seats in the standard layout"""
+        return self.capacity - sum(bin(byte).count('1') for byte in self.bits)
+
+    def free_seats(self):
+        """Iterate over free seats in the standard layout"""
+        for row in range(1, self.rows + 1):
+            for letter in self.letters:
+                seat_number = f"{row}{letter}"
+                if not self.is_taken(seat_number):
+                    yield seat_number
+
+
+class SeatInventory:
+    """Seat maps per (flight, date), loaded on demand and kept in step with bookings"""
+
+    def __init__(self, db, max_maps=2048, ttl=30.0):
+        self.db = db
+        self.max_maps = max_maps
+        # Other processes can book too; maps are re-read after this many seconds
+        self.ttl = ttl
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, flight_number, date):
+        """Build a seat map from the (flight_number, date, seat_number) index"""
+        seat_map = SeatMap()
+        with self.db.pool.connection() as conn:
+            for (seat_number,) in conn.execute('''
+                                               SELECT seat_number
+                                               FROM reservations
+                                               WHERE flight_number = ?
+                                                 AND date = ?
+                                               ''', (flight_number, date)):
+                seat_map.mark(seat_number)
+        return seat_map
+
+    def get(self, flight_number, date):
+        """Get the seat map for a flight and date"""
+        key = (flight_number, date)
+        with self._lock:
+            seat_map = self._maps.get(key)
+            if seat_map is not None and time.monotonic() - seat_map.loaded_at < self.ttl:
+                self._maps.move_to_end(key)
+                return seat_map
+
+        seat_map = self._load(flight_number, date)
+        with self._lock:
+            self._maps[key] = seat_map
+            self._maps.move_to_end(key)
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+        return seat_map
+
+    def is_available(self, flight_number, date, seat_number):
+        return not self.get(flight_number, date).is_taken(normalize_seat(seat_number))
+
+    def free_seats(self, flight_number, date, limit=None):
+        seats = []
+        for seat_number in self.get(flight_number, date).free_seats():
+            if limit is not None and len(seats) >= limit:
+                break
+            seats.append(seat_number)
+        return seats
+
+    def mark_taken(self, flight_number, date, seat_number):
+        """Record a seat claim in a cached map (unloaded maps pick it up when read)"""
+        with self._lock:
+            seat_map = self._maps.get((flight_number, date))
+            if seat_map is not None:
+                seat_map.mark(seat_number)
+
+    def mark_free(self, flight_number, date, seat_number):
+        with self._lock:
+            seat_map = self._maps.get((flight_number, date))
+            if seat_map is not None:
+                seat_map.release(seat_number)
+
+    def clear(self):
+        """Forget every cached map, e.g. after a bulk import"""
+        with self._lock:
+            self._maps.clear()
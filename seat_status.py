@@ -0,0 +1,64 @@
+from tkinter import ttk
+
+
+class SeatStatusLabel(ttk.Label):
+    """Shows whether the seat typed into a booking form is still free"""
+
+    def __init__(self, parent, controller, db, entries, delay=250):
+        ttk.Label.__init__(self, parent, text="", font=('Arial', 10))
+        self.controller = controller
+        self.db = db
+        self.entries = entries
+        self.delay = delay
+        # (flight, date, seat) that counts as free anyway, e.g. the seat being edited
+        self.own_seat = None
+        self._job = None
+
+        for field in ('Flight Number', 'Date', 'Seat Number'):
+            entries[field].bind('<KeyRelease>', self.schedule_check, add='+')
+
+    def current_key(self):
+        return tuple(self.entries[field].get().strip()
+                     for field in ('Flight Number', 'Date', 'Seat Number'))
+
+    def schedule_check(self, event=None):
+        """Check availability shortly after the user stops typing"""
+        if self._job is not None:
+            self.after_cancel(self._job)
+        self._job = self.after(self.delay, self.check)
+
+    def check(self):
+        self._job = None
+        flight_number, date, seat_number = key = self.current_key()
+        if not flight_number or not date:
+            self.config(text="")
+            return
+
+        self.controller.worker.submit(
+            self.db.get_seat_status, flight_number, date, seat_number,
+            callback=lambda status: self.show(key, status),
+            errback=lambda error: self.config(text="")
+        )
+
+    def show(self, key, status):
+        """Display a result if the form still holds the values it was asked for"""
+        if key != self.current_key():
+            return
+
+        available, free = status
+        seat_number = key[2].upper()
+        if self.own_seat is not None and (key[0], key[1], seat_number) == self.own_seat:
+            available = True
+
+        if available is None:
+            self.config(text=f"{free} seats free on this flight", foreground='gray')
+        elif available:
+            self.config(text=f"✓ Seat {seat_number} is available ({free} free)", foreground='green')
+        else:
+            self.config(text=f"✗ Seat {seat_number} is already taken ({free} free)", foreground='red')
+
+    def clear(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+        self.config(text="")
@@ -0,0 +1,457 @@
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from database import RESERVATION_FIELDS
+from group_commit import GroupCommitWriter
+from seat_map import SeatTakenError
+from storage import open_backend
+from validation import ValidationError, clean_reservation
+
+STATUS_TEXT = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+WRITE_FIELDS = RESERVATION_FIELDS[1:]
+SEARCH_FILTERS = ('name', 'flight_number', 'departure', 'destination', 'date_from', 'date_to')
+RESERVATION_PATH = re.compile(r'^/reservations/(\d+)$')
+
+# Requests larger than this are refused before being read
+MAX_BODY_SIZE = 1024 * 1024
+
+# SQLite's largest INTEGER; no reservation id or cursor can be above it
+MAX_ROW_ID = 2 ** 63 - 1
+
+
+class HttpError(Exception):
+    """Error that becomes a JSON error response"""
+
+    def __init__(self, status, message, field=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.field = field          # the request field at fault, if any
+
+    def payload(self):
+        return {'error': self.message, 'field': self.field} if self.field else {'error': self.message}
+
+
+def reservation_to_dict(row):
+    return dict(zip(RESERVATION_FIELDS, row))
+
+
+def reservation_id_of(match):
+    """The id in a /reservations/<id> path; 404 for ids too large to exist"""
+    reservation_id = int(match.group(1))
+    if reservation_id > MAX_ROW_ID:
+        raise HttpError(404, f"Reservation {reservation_id} not found")
+    return reservation_id
+
+
+class ReservationService:
+    """Maps JSON API calls onto a storage backend; runs on executor threads"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def handle(self, method, path, query, body):
+        """Run one API call and return (status, payload)"""
+        try:
+            return self._route(method, path, query, body)
+        except HttpError as e:
+            return e.status, e.payload()
+        except SeatTakenError as e:
+            return 409, {'error': str(e)}
+        except sqlite3.OperationalError as e:
+            # Typically "database is locked" after busy_timeout
+            return 503, {'error': str(e)}
+
+    def handle_batch(self, operations):
+        """Run several API calls in one executor job"""
+        if not isinstance(operations, list):
+            return 400, {'error': "Batch body must be a list of operations"}
+
+        results = []
+        for operation in operations:
+            if not isinstance(operation, dict):
+                results.append({'status': 400, 'body': {'error': "Operation must be an object"}})
+                continue
+            parts = urlsplit(str(operation.get('path', '')))
+            status, payload = self.handle(str(operation.get('method', 'GET')).upper(), parts.path,
+                                          parse_qs(parts.query), operation.get('body'))
+            results.append({'status': status, 'body': payload})
+        return 200, {'results': results}
+
+    def _route(self, method, path, query, body):
+        if path == '/health':
+            health = {'status': 'ok'}
+            # The in-memory engine has no connection pool
+            if getattr(self.db, 'pool', None) is not None:
+                health['pool'] = self.db.pool.stats()
+            return 200, health
+
+        if path == '/reservations':
+            if method == 'GET':
+                return self._list(query)
+            if method == 'POST':
+                values = self._reservation_values(body)
+                reservation_id = self.db.create_reservation(*values)
+                return 201, reservation_to_dict((reservation_id,) + values)
+            raise HttpError(405, f"{method} not allowed on {path}")
+
+        match = RESERVATION_PATH.match(path)
+        if match:
+            reservation_id = reservation_id_of(match)
+            if method == 'GET':
+                reservation = self.db.get_reservation_by_id(reservation_id)
+                if not reservation:
+                    raise HttpError(404, f"Reservation {reservation_id} not found")
+                return 200, reservation_to_dict(reservation)
+            if method == 'PUT':
+                values = self._reservation_values(body)
+                if not self.db.update_reservation(reservation_id, *values):
+                    raise HttpError(404, f"Reservation {reservation_id} not found")
+                return 200, reservation_to_dict((reservation_id,) + values)
+            if method == 'DELETE':
+                if not self.db.delete_reservation(reservation_id):
+                    raise HttpError(404, f"Reservation {reservation_id} not found")
+                return 200, {'deleted': reservation_id}
+            raise HttpError(405, f"{method} not allowed on {path}")
+
+        if path == '/search' and method == 'GET':
+            text = self._param(query, 'q') or ''
+            rows = self.db.search_passengers(text, limit=self._limit(query, 50))
+            return 200, {'reservations': [reservation_to_dict(row) for row in rows]}
+
+        raise HttpError(404, f"No route for {path}")
+
+    def _list(self, query):
+        """One keyset page of reservations"""
+        filters = {name: self._param(query, name) for name in SEARCH_FILTERS}
+        cursor = self._param(query, 'cursor')
+        if cursor is not None:
+            if not (cursor.isascii() and cursor.isdigit()) or int(cursor) > MAX_ROW_ID:
+                raise HttpError(400, "cursor must be a reservation id")
+            cursor = int(cursor)
+        rows, next_cursor = self.db.search_reservations(
+            cursor=cursor,
+            limit=self._limit(query, 50),
+            **filters
+        )
+        return 200, {'reservations': [reservation_to_dict(row) for row in rows], 'next_cursor': next_cursor}
+
+    def _param(self, query, name):
+        values = query.get(name)
+        return values[0] if values else None
+
+    def _limit(self, query, default):
+        limit = self._param(query, 'limit')
+        if limit is None:
+            return default
+        if not (limit.isascii() and limit.isdigit()) or int(limit) < 1:
+            raise HttpError(400, "limit must be a positive integer")
+        return int(limit)
+
+    def _reservation_values(self, body):
+        """Validate a JSON reservation body into create/update arguments, by the same rules as the GUI"""
+        if not isinstance(body, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        try:
+            return clean_reservation(*(body.get(field) for field in WRITE_FIELDS))
+        except ValidationError as e:
+            raise HttpError(400, f"Missing field: {e.field}" if e.missing else str(e), e.field) from None
+
+
+class IdLookupBatcher:
+    """Coalesces concurrent GET /reservations/<id> calls into one IN (...) query"""
+
+    def __init__(self, server, max_batch=64, max_delay=0.002):
+        self.server = server
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = {}
+        self._timer = None
+        self.batches = 0
+
+    async def get(self, reservation_id):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(reservation_id, []).append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending):
+        self.batches += 1
+        try:
+            rows = await self.server.run_db(self.server.db.get_reservations_by_ids, list(pending))
+        except HttpError as e:
+            # Busy: retrying the ids one by one would only add load
+            self._fail(pending, e)
+            return
+        except Exception as e:
+            if len(pending) == 1:
+                self._fail(pending, e)
+                return
+            # One bad id mustn't fail the lookups that happened to share its batch
+            for reservation_id, futures in pending.items():
+                await self._run({reservation_id: futures})
+            return
+
+        found = {row[0]: row for row in rows}
+        for reservation_id, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(reservation_id))
+
+    def _fail(self, pending, error):
+        for futures in pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+
+
+class ReservationServer:
+    """Asyncio HTTP/1.1 JSON server with keep-alive and a bounded database executor"""
+
+    def __init__(self, db, host='127.0.0.1', port=8080, workers=4, max_pending=256,
+                 idle_timeout=15.0, batch_delay=0.002, writer=None):
+        self.db = db
+        # Optional GroupCommitWriter; single-row writes then share transactions
+        self.writer = writer
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+
+        self.service = ReservationService(db)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-executor")
+        self.batcher = IdLookupBatcher(self, max_delay=batch_delay)
+        self.pending = 0
+        self.requests = 0
+        self._server = None
+
+    async def run_db(self, fn, *args):
+        """Run a blocking database call on the executor, refusing work past max_pending"""
+        if self.pending >= self.max_pending:
+            raise HttpError(503, "Server busy, try again")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def run_write(self, future):
+        """Wait for a group-committed write without tying up an executor thread"""
+        try:
+            return await asyncio.wrap_future(future)
+        except SeatTakenError as e:
+            raise HttpError(409, str(e))
+        except sqlite3.OperationalError as e:
+            raise HttpError(503, str(e))
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        # Port 0 asks the OS for a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def handle_client(self, reader, writer):
+        """Serve requests on one connection until it closes or goes idle"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                keep_alive = await self.handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, reader, writer):
+        """Read one request, dispatch it and write the response; returns keep-alive"""
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            self.write_response(writer, 400, {'error': "Malformed request line"}, False)
+            return False
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.write_response(writer, 400, {'error': "Malformed Content-Length"}, False)
+            return False
+        if length > MAX_BODY_SIZE:
+            self.write_response(writer, 413, {'error': "Request body too large"}, False)
+            return False
+        raw_body = await reader.readexactly(length) if length else b''
+
+        self.requests += 1
+        if method.upper() == 'GET' and target == '/metrics':
+            self.write_response(writer, 200, self.db.metrics.prometheus(), keep_alive,
+                                content_type='text/plain; version=0.0.4')
+            return keep_alive
+
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            self.write_response(writer, 400, {'error': "Body is not valid JSON"}, keep_alive)
+            return keep_alive
+
+        try:
+            status, payload = await self.dispatch(method.upper(), target, body)
+        except HttpError as e:
+            status, payload = e.status, e.payload()
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+
+        self.write_response(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def dispatch(self, method, target, body):
+        parts = urlsplit(target)
+        path, query = parts.path, parse_qs(parts.query)
+
+        # Single-row reads are batched with whatever else arrives in the same window
+        match = RESERVATION_PATH.match(path)
+        if method == 'GET' and match:
+            reservation_id = reservation_id_of(match)
+            reservation = await self.batcher.get(reservation_id)
+            if not reservation:
+                return 404, {'error': f"Reservation {reservation_id} not found"}
+            return 200, reservation_to_dict(reservation)
+
+        if self.writer is not None:
+            if path == '/reservations' and method == 'POST':
+                values = self.service._reservation_values(body)
+                reservation_id = await self.run_write(self.writer.create_reservation(*values))
+                return 201, reservation_to_dict((reservation_id,) + values)
+            if match and method in ('PUT', 'DELETE'):
+                reservation_id = reservation_id_of(match)
+                if method == 'PUT':
+                    values = self.service._reservation_values(body)
+                    found = await self.run_write(self.writer.update_reservation(reservation_id, *values))
+                    payload = reservation_to_dict((reservation_id,) + values)
+                else:
+                    found = await self.run_write(self.writer.delete_reservation(reservation_id))
+                    payload = {'deleted': reservation_id}
+                if not found:
+                    return 404, {'error': f"Reservation {reservation_id} not found"}
+                return 200, payload
+
+        if path == '/batch':
+            if method != 'POST':
+                return 405, {'error': "Use POST for /batch"}
+            return await self.run_db(self.service.handle_batch, body)
+
+        return await self.run_db(self.service.handle, method, path, query, body)
+
+    def write_response(self, writer, status, payload, keep_alive, content_type='application/json'):
+        if content_type == 'application/json':
+            payload = json.dumps(payload)
+        data = payload.encode('utf-8')
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+
+
+async def serve(args):
+    db = open_backend(args.db, pool_size=args.workers + 2)
+    if args.metrics:
+        db.metrics.enabled = True
+    writer = None
+    if args.group_commit:
+        if db.supports_group_commit:
+            writer = GroupCommitWriter(db, max_delay=args.group_commit / 1000).start()
+        else:
+            print(f"Group commit isn't available for {args.db}; writes commit one by one")
+    server = await ReservationServer(db, args.host, args.port, workers=args.workers,
+                                     max_pending=args.max_pending, writer=writer).start()
+    print(f"Serving {args.db} on http://{server.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        if writer is not None:
+            writer.stop()
+        db.close()
+
+
+def main():
+    """Run the headless JSON API"""
+    parser = argparse.ArgumentParser(description="Flight Reservation System JSON API")
+    parser.add_argument('--db', default="flights.db",
+                        help='database file, "memory[:snapshot.json]" or "shards:<directory>" (default: flights.db)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4, help="database executor threads")
+    parser.add_argument('--max-pending', type=int, default=256, help="queued database calls before 503")
+    parser.add_argument('--group-commit', type=float, default=0, metavar='MS',
+                        help="batch single-row writes for up to MS milliseconds (default: off)")
+    parser.add_argument('--metrics', action='store_true', help="collect timings for GET /metrics")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+
+if __name__ == "__main__":
+    main()
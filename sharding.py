@@ -0,0 +1,809 @@
+import bisect
+import heapq
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from collections import defaultdict
+
+from database import (DatabaseManager, MAX_PAGE_SIZE, MAX_QUERY_PARAMS, RESERVATION_COLUMNS, passenger_filters,
+                      search_filters)
+from records import Reservation, ReservationColumns
+from reports import CAPACITY, _date_filter, _where
+from seat_map import SeatInventory, SeatMap, normalize_seat
+from storage import ReservationConflictError
+from storage_profile import WalCheckpointer
+from metrics import timed
+
+# Catalog file inside the shard directory: flights, the id -> month map, the shard list and the change log
+CATALOG_NAME = 'catalog.db'
+
+# Bookings whose date doesn't start with YYYY-MM share one shard
+UNDATED = 'undated'
+
+MONTH_PATTERN = re.compile(r'^[0-9]{4}-[0-9]{2}')
+MONTH_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+SHARD_NAME_PATTERN = re.compile(r'^([0-9]{4}-[0-9]{2}|undated)$')
+
+# SQLite attaches at most 10 databases per connection; one slot stays free for split_database's source
+MAX_ATTACHED = 8
+
+# Map rows deleted per transaction when a shard is archived or dropped
+RETIRE_BATCH = 50000
+
+CATALOG_DDL = [
+    '''
+    CREATE TABLE IF NOT EXISTS flights
+    (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        flight_number TEXT NOT NULL UNIQUE,
+        departure     TEXT NOT NULL,
+        destination   TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_flights_route ON flights (departure, destination)',
+    # Live shards and their row counts, so counting never opens a shard
+    '''
+    CREATE TABLE IF NOT EXISTS shards
+    (
+        month TEXT PRIMARY KEY,
+        rows  INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    # Hands out ids for every shard and says which shard holds each one
+    '''
+    CREATE TABLE IF NOT EXISTS reservation_shards
+    (
+        id    INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_reservation_shards_month ON reservation_shards (month)',
+    # Same change log as DatabaseManager's, written by the manager since triggers can't span files
+    '''
+    CREATE TABLE IF NOT EXISTS reservation_changes
+    (
+        version        INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INTEGER NOT NULL,
+        operation      TEXT    NOT NULL
+    )
+    ''',
+]
+
+# Per-shard schema; {shard} is the schema name the file is attached as
+SHARD_DDL = [
+    '''
+    CREATE TABLE IF NOT EXISTS {shard}.reservations
+    (
+        id            INTEGER PRIMARY KEY,
+        name          TEXT    NOT NULL,
+        flight_number TEXT    NOT NULL,
+        departure     TEXT    NOT NULL,
+        destination   TEXT    NOT NULL,
+        date          TEXT    NOT NULL,
+        seat_number   TEXT    NOT NULL,
+        version       INTEGER NOT NULL DEFAULT 1
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS {shard}.idx_reservations_name ON reservations (name COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS {shard}.idx_reservations_flight ON reservations (flight_number)',
+    'CREATE INDEX IF NOT EXISTS {shard}.idx_reservations_route_date ON reservations (departure, destination, date)',
+    'CREATE INDEX IF NOT EXISTS {shard}.idx_reservations_date ON reservations (date)',
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS {shard}.idx_reservations_seat
+        ON reservations (flight_number, date, seat_number)
+    ''',
+]
+
+INSERT_SHARD_SQL = ('INSERT INTO {shard}.reservations '
+                    '(id, name, flight_number, departure, destination, date, seat_number, version) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+
+
+def month_of(date):
+    """Shard name for a booking date, e.g. '2025-03-14' -> '2025-03'"""
+    match = MONTH_PATTERN.match(date)
+    return match.group(0) if match else UNDATED
+
+
+def shard_schema(month):
+    """Schema name a month's shard is attached as"""
+    return 'shard_' + month.replace('-', '_')
+
+
+def months_between(months, date_from=None, date_to=None):
+    """The shards that can hold dates from date_from to date_to"""
+    # The undated shard can hold any string, so it is never ruled out
+    return [month for month in months
+            if month == UNDATED or ((not date_from or month >= date_from[:7]) and (not date_to or month <= date_to))]
+
+
+def plan_shards(months, date_from, date_to, conditions):
+    """(shards, conditions) groups for a query filtered by date
+
+    When the filter spans a whole month the date index is no help in that shard, so
+    its date conditions become "+date" and the planner picks the id or covering indexes.
+    """
+    whole = [month for month in months
+             if month != UNDATED and (not date_from or date_from <= month + '-01')
+             and (not date_to or date_to >= month + '-31')]
+    partial = [month for month in months if month not in whole]
+    unindexed = ['+' + condition if condition.startswith('date ') else condition for condition in conditions]
+    return [(shards, shard_conditions) for shards, shard_conditions in ((whole, unindexed), (partial, conditions))
+            if shards]
+
+
+def check_month(month):
+    if not SHARD_NAME_PATTERN.match(month):
+        raise ValueError(f"Not a shard name: {month!r} (expected YYYY-MM or {UNDATED})")
+
+
+class ShardSeatInventory(SeatInventory):
+    """SeatInventory that loads each seat map from the flight date's shard"""
+
+    def _load(self, flight_number, date):
+        seat_map = SeatMap()
+        for (seat_number,) in self.db.query_shard(month_of(date), '''
+                                                  SELECT seat_number
+                                                  FROM {shard}.reservations
+                                                  WHERE flight_number = ?
+                                                    AND date = ?
+                                                  ''', (flight_number, date)):
+            seat_map.mark(seat_number)
+        return seat_map
+
+
+class ShardReportEngine:
+    """Booking reports run shard by shard and merged
+
+    Every report groups by date or sums over groups, and a date lives in exactly
+    one shard, so per-shard results combine without double counting.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def summaries_enabled(self):
+        return False
+
+    def _run(self, date_from, date_to, sql, params):
+        conditions, where_params = [], []
+        _date_filter('date', date_from, date_to, conditions, where_params)
+        rows = []
+        for shards, shard_conditions in plan_shards(months_between(self.db.months, date_from, date_to),
+                                                    date_from, date_to, conditions):
+            for _, shard_rows in self.db.query_shards(shards, sql.replace('{where}', _where(shard_conditions)),
+                                                      where_params + params):
+                rows.extend(shard_rows)
+        return rows
+
+    def load_factors(self, date_from=None, date_to=None, limit=50, use_summary=None):
+        """Fullest flights as (flight_number, date, booked, capacity, load_factor)"""
+        rows = self._run(date_from, date_to, '''
+                         SELECT flight_number, date, COUNT(*) AS booked
+                         FROM {shard}.reservations{where}
+                         GROUP BY flight_number, date
+                         ORDER BY booked DESC, date, flight_number
+                         LIMIT ?
+                         ''', [limit])
+        rows.sort(key=lambda row: (-row[2], row[1], row[0]))
+        return [(flight_number, date, booked, CAPACITY, booked / CAPACITY)
+                for flight_number, date, booked in rows[:limit]]
+
+    def route_daily(self, departure=None, destination=None, date_from=None, date_to=None, limit=500,
+                    use_summary=None):
+        """Bookings per route and day as (departure, destination, date, bookings)"""
+        conditions, params = [], []
+        if departure:
+            conditions.append('departure = ?')
+            params.append(departure)
+        if destination:
+            conditions.append('destination = ?')
+            params.append(destination)
+        _date_filter('date', date_from, date_to, conditions, params)
+        rows = []
+        for shards, shard_conditions in plan_shards(months_between(self.db.months, date_from, date_to),
+                                                    date_from, date_to, conditions):
+            for _, shard_rows in self.db.query_shards(shards, f'''
+                                                      SELECT departure, destination, date, COUNT(*)
+                                                      FROM {{shard}}.reservations{_where(shard_conditions)}
+                                                      GROUP BY departure, destination, date
+                                                      ORDER BY departure, destination, date
+                                                      LIMIT ?
+                                                      ''', params + [limit]):
+                rows.extend(shard_rows)
+        rows.sort()
+        return rows[:limit]
+
+    def top_destinations(self, date_from=None, date_to=None, limit=10, use_summary=None):
+        """Most booked destinations as (destination, bookings)"""
+        bookings = defaultdict(int)
+        for destination, count in self._run(date_from, date_to, '''
+                                            SELECT destination, COUNT(*)
+                                            FROM {shard}.reservations{where}
+                                            GROUP BY destination
+                                            ''', []):
+            bookings[destination] += count
+        return sorted(bookings.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def dashboard(self, date_from=None, date_to=None):
+        """Everything the dashboard page shows, read in one worker call"""
+        return {
+            'summaries': False,
+            'load_factors': self.load_factors(date_from, date_to),
+            'route_daily': self.route_daily(date_from=date_from, date_to=date_to),
+            'top_destinations': self.top_destinations(date_from, date_to),
+        }
+
+
+class ShardedDatabaseManager(DatabaseManager):
+    """DatabaseManager keeping reservations in one SQLite file per departure month
+
+    A directory holds catalog.db and files named like 2025-03.db. Pooled
+    connections open the catalog and ATTACH shards as queries need them,
+    keeping the most recently used ones attached. Writes and date-filtered
+    reads touch only the shards for their dates, and old months can be
+    archived or dropped by moving or deleting one file.
+
+    In WAL mode (the default profile) each file commits atomically on its own;
+    set journal_mode to DELETE in storage_profile.json if a crash must never
+    separate a booking from its entry in the id map.
+    """
+
+    def __init__(self, directory, pool_size=5, profile=None, cache_size=4096, cache_ttl=60.0, defer_init=False,
+                 metrics=None, max_attached=MAX_ATTACHED):
+        self.directory = directory
+        # Moving a booking to another month needs both shards attached at once
+        self.max_attached = max(2, min(max_attached, MAX_ATTACHED))
+        self.months = []                # live shards, sorted
+        self._months_lock = threading.Lock()
+        super().__init__(os.path.join(directory, CATALOG_NAME), pool_size, profile, cache_size, cache_ttl,
+                         defer_init=True, migrate=False, metrics=metrics)
+        self.seats = ShardSeatInventory(self)
+        self.reports = ShardReportEngine(self)
+        # The event triggers need the reservations table in the same file
+        self.events = None
+        # Shards can't be attached inside a transaction, so each write opens its own
+        self.supports_group_commit = False
+
+        if not defer_init:
+            self.init_database()
+
+    def get_connection(self):
+        """Open a catalog connection with no shards attached yet"""
+        conn = super().get_connection()
+        conn.attached = {}              # month -> None, least recently used first
+        return conn
+
+    def metric_gauges(self):
+        gauges = super().metric_gauges()
+        gauges['live_shards'] = len(self.months)
+        return gauges
+
+    @timed
+    def init_database(self):
+        """Create the catalog if needed and read the list of shards"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self.pool.connection() as conn:
+            for statement in CATALOG_DDL:
+                conn.execute(statement)
+            conn.commit()
+            months = [month for (month,) in conn.execute('SELECT month FROM shards ORDER BY month')]
+        with self._months_lock:
+            self.months = months
+        self.prune_changes()
+
+        if self.checkpointer is None and self.profile.uses_wal and self.profile['checkpoint_interval'] > 0:
+            self.checkpointer = WalCheckpointer(self.pool, self.profile['checkpoint_interval']).start()
+        print(f"Sharded database initialized ({len(months)} monthly shards)")
+
+    def shard_path(self, month):
+        return os.path.join(self.directory, f"{month}.db")
+
+    # Attaching shards
+
+    def _attach(self, conn, month, create=False):
+        """Attach a month's shard to a connection and return its schema name; None if it doesn't exist
+
+        Must run outside a transaction, so writers attach everything they need before their first write.
+        """
+        attached = conn.attached
+        schema = shard_schema(month)
+        if month in attached:
+            # dicts keep insertion order, so re-inserting marks the shard most recently used
+            del attached[month]
+            attached[month] = None
+            return schema
+        if month not in self.months and not (create or os.path.exists(self.shard_path(month))):
+            return None
+
+        while len(attached) >= self.max_attached:
+            oldest = next(iter(attached))
+            conn.execute(f'DETACH DATABASE {shard_schema(oldest)}')
+            del attached[oldest]
+        conn.execute(f'ATTACH DATABASE ? AS {schema}', (self.shard_path(month),))
+        attached[month] = None
+        for name in ('journal_mode', 'synchronous', 'cache_size'):
+            conn.execute(f'PRAGMA {schema}.{name} = {self.profile[name]}')
+
+        if month not in self.months:
+            for statement in SHARD_DDL:
+                conn.execute(statement.format(shard=schema))
+            conn.execute('INSERT OR IGNORE INTO shards (month) VALUES (?)', (month,))
+            conn.commit()
+            with self._months_lock:
+                if month not in self.months:
+                    bisect.insort(self.months, month)
+        return schema
+
+    def _detach_everywhere(self, month):
+        """Make sure no pooled connection has a shard attached"""
+        # Holding every connection at once means none of them is mid-query on the shard
+        conns = [self.pool.acquire() for _ in range(self.pool.size)]
+        try:
+            for conn in conns:
+                if month in conn.attached:
+                    conn.execute(f'DETACH DATABASE {shard_schema(month)}')
+                    del conn.attached[month]
+        finally:
+            for conn in conns:
+                self.pool.release(conn)
+
+    def query_shards(self, months, sql, params=(), records=False):
+        """Run a query ({shard} standing for the schema) on each existing shard; returns [(month, rows)]"""
+        results = []
+        with self.pool.connection() as conn:
+            for month in months:
+                schema = self._attach(conn, month)
+                if schema is None:
+                    continue
+                cursor = self._reservation_cursor(conn) if records else conn.cursor()
+                results.append((month, cursor.execute(sql.replace('{shard}', schema), params).fetchall()))
+        return results
+
+    def query_shard(self, month, sql, params=(), records=False):
+        """Rows of a query on one shard; [] if the shard doesn't exist"""
+        results = self.query_shards([month], sql, params, records)
+        return results[0][1] if results else []
+
+    # Writes
+
+    def _log(self, cursor, reservation_id, operation, month, delta=0):
+        cursor.execute('INSERT INTO reservation_changes (reservation_id, operation) VALUES (?, ?)',
+                       (reservation_id, operation))
+        if delta:
+            cursor.execute('UPDATE shards SET rows = rows + ? WHERE month = ?', (delta, month))
+
+    def _insert_reservation(self, cursor, name, flight_number, departure, destination, date, seat_number):
+        """Insert, attaching the month's shard first; returns (id, cache update to run after commit)
+
+        Must start outside a transaction; the caller commits.
+        """
+        seat_number = normalize_seat(seat_number)
+        month = month_of(date)
+        schema = self._attach(cursor.connection, month, create=True)
+        new_flight_id = self._upsert_flight(cursor, flight_number, departure, destination)
+
+        cursor.execute('INSERT INTO reservation_shards (month) VALUES (?)', (month,))
+        reservation_id = cursor.lastrowid
+        try:
+            cursor.execute(INSERT_SHARD_SQL.format(shard=schema),
+                           (reservation_id, name, flight_number, departure, destination, date, seat_number, 1))
+        except sqlite3.IntegrityError as e:
+            self._raise_if_seat_taken(e, flight_number, date, seat_number)
+            raise
+        self._log(cursor, reservation_id, 'insert', month, 1)
+
+        def after_commit():
+            self.seats.mark_taken(flight_number, date, seat_number)
+            if new_flight_id:
+                self.flights.added(new_flight_id, flight_number, departure, destination)
+
+        return reservation_id, after_commit
+
+    def _locate(self, cursor, reservation_id):
+        """(month, schema, row with version) for an id, attaching its shard; None if it doesn't exist"""
+        found = cursor.execute('SELECT month FROM reservation_shards WHERE id = ?', (reservation_id,)).fetchone()
+        if found is None:
+            return None
+        schema = self._attach(cursor.connection, found[0])
+        if schema is None:
+            return None
+        row = cursor.execute(f'SELECT {RESERVATION_COLUMNS}, version FROM {schema}.reservations WHERE id = ?',
+                             (reservation_id,)).fetchone()
+        return None if row is None else (found[0], schema, row)
+
+    def _begin_on(self, cursor, reservation_id, month=None):
+        """BEGIN IMMEDIATE with a booking's shard (and month's, if given) attached
+
+        Returns (month, schema, row with version) read under the write lock, or None if the
+        booking doesn't exist. Shards can't be attached inside a transaction, so if another
+        writer moves the booking to a shard that isn't attached, this starts over.
+        """
+        conn = cursor.connection
+        while True:
+            if self._locate(cursor, reservation_id) is None:
+                return None
+            if month:
+                self._attach(conn, month, create=True)
+            cursor.execute('BEGIN IMMEDIATE')
+            found = cursor.execute('SELECT month FROM reservation_shards WHERE id = ?', (reservation_id,)).fetchone()
+            if found is None:
+                return None
+            if found[0] in conn.attached:
+                schema = shard_schema(found[0])
+                row = cursor.execute(f'SELECT {RESERVATION_COLUMNS}, version FROM {schema}.reservations WHERE id = ?',
+                                     (reservation_id,)).fetchone()
+                return None if row is None else (found[0], schema, row)
+            conn.rollback()
+
+    def _update_reservation(self, cursor, reservation_id, name, flight_number, departure, destination, date,
+                            seat_number, expected_version=None):
+        """Update in a transaction of its own the caller commits; returns (found, cache update to run after commit)"""
+        seat_number = normalize_seat(seat_number)
+        month = month_of(date)
+        # Holds the write locks from the version check until commit, like the one-statement CAS
+        located = self._begin_on(cursor, reservation_id, month)
+        if located is None:
+            self.reservation_cache.pop(reservation_id)
+            return False, lambda: None
+        old_month, old_schema, current = located
+        schema = shard_schema(month)
+        version = current[-1]
+        if expected_version is not None and version != expected_version:
+            self.reservation_cache.pop(reservation_id)
+            raise ReservationConflictError(reservation_id, expected_version, Reservation._make(current[:-1]),
+                                           version)
+
+        new_flight_id = self._upsert_flight(cursor, flight_number, departure, destination)
+        try:
+            if old_month == month:
+                cursor.execute(f'''
+                               UPDATE {schema}.reservations
+                               SET name          = ?,
+                                   flight_number = ?,
+                                   departure     = ?,
+                                   destination   = ?,
+                                   date          = ?,
+                                   seat_number   = ?,
+                                   version       = version + 1
+                               WHERE id = ?
+                               ''', (name, flight_number, departure, destination, date, seat_number,
+                                     reservation_id))
+            else:
+                # A new date in another month moves the booking to that month's shard, keeping its id
+                cursor.execute(f'DELETE FROM {old_schema}.reservations WHERE id = ?', (reservation_id,))
+                cursor.execute(INSERT_SHARD_SQL.format(shard=schema),
+                               (reservation_id, name, flight_number, departure, destination, date, seat_number,
+                                version + 1))
+                cursor.execute('UPDATE reservation_shards SET month = ? WHERE id = ?', (month, reservation_id))
+                cursor.execute('UPDATE shards SET rows = rows - 1 WHERE month = ?', (old_month,))
+                cursor.execute('UPDATE shards SET rows = rows + 1 WHERE month = ?', (month,))
+        except sqlite3.IntegrityError as e:
+            self._raise_if_seat_taken(e, flight_number, date, seat_number)
+            raise
+        self._log(cursor, reservation_id, 'update', month)
+        previous = current[2], current[5], current[6]
+
+        def after_commit():
+            self.reservation_cache.put(reservation_id, Reservation(reservation_id, name, flight_number, departure,
+                                                                   destination, date, seat_number))
+            self.seats.mark_free(*previous)
+            self.seats.mark_taken(flight_number, date, seat_number)
+            if new_flight_id:
+                self.flights.added(new_flight_id, flight_number, departure, destination)
+
+        return True, after_commit
+
+    def _delete_reservation(self, cursor, reservation_id):
+        """Delete in a transaction of its own the caller commits; returns (found, cache update to run after commit)"""
+        located = self._begin_on(cursor, reservation_id)
+        if located is None:
+            self.reservation_cache.pop(reservation_id)
+            return False, lambda: None
+        month, schema, current = located
+        cursor.execute(f'DELETE FROM {schema}.reservations WHERE id = ?', (reservation_id,))
+        cursor.execute('DELETE FROM reservation_shards WHERE id = ?', (reservation_id,))
+        self._log(cursor, reservation_id, 'delete', month, -1)
+        previous = current[2], current[5], current[6]
+
+        def after_commit():
+            self.reservation_cache.pop(reservation_id)
+            self.seats.mark_free(*previous)
+
+        return True, after_commit
+
+    # Reads
+
+    def _rows_for(self, conn, pairs):
+        """Reservations for (id, month) pairs, newest first"""
+        by_month = defaultdict(list)
+        for reservation_id, month in pairs:
+            by_month[month].append(reservation_id)
+        rows = []
+        cursor = self._reservation_cursor(conn)
+        for month, ids in by_month.items():
+            schema = self._attach(conn, month)
+            if schema is None:
+                continue
+            for start in range(0, len(ids), MAX_QUERY_PARAMS):
+                chunk = ids[start:start + MAX_QUERY_PARAMS]
+                rows.extend(cursor.execute(f'''
+                                           SELECT {RESERVATION_COLUMNS}
+                                           FROM {schema}.reservations
+                                           WHERE id IN ({', '.join('?' * len(chunk))})
+                                           ''', chunk).fetchall())
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return rows
+
+    def _fetch_by_ids(self, conn, ids):
+        """Read the rows for a list of ids, finding their shards through the id map"""
+        pairs = []
+        for start in range(0, len(ids), MAX_QUERY_PARAMS):
+            chunk = ids[start:start + MAX_QUERY_PARAMS]
+            pairs.extend(conn.execute(f'''
+                                      SELECT id, month
+                                      FROM reservation_shards
+                                      WHERE id IN ({', '.join('?' * len(chunk))})
+                                      ''', chunk).fetchall())
+        rows = self._rows_for(conn, pairs)
+        rows.reverse()
+        return rows
+
+    def _load_reservation(self, reservation_id):
+        """Read one reservation, bypassing the cache"""
+        with self.pool.connection() as conn:
+            rows = self._fetch_by_ids(conn, [reservation_id])
+        return rows[0] if rows else None
+
+    @timed
+    def get_versioned_reservation(self, reservation_id):
+        """Get (reservation, version) read together for editing, or None; always bypasses the cache"""
+        with self.pool.connection() as conn:
+            located = self._locate(conn.cursor(), reservation_id)
+        if located is None:
+            return None
+        row = located[2]
+        return Reservation._make(row[:-1]), row[-1]
+
+    @timed
+    def count_reservations(self):
+        """Get the number of reservations"""
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(SUM(rows), 0) FROM shards').fetchone()[0]
+
+    @timed
+    def get_all_reservations(self, columnar=False):
+        """Get all reservations, as Reservation records or packed into ReservationColumns"""
+        shards = [rows for _, rows in self.query_shards(
+            list(self.months), f'SELECT {RESERVATION_COLUMNS} FROM {{shard}}.reservations ORDER BY id DESC',
+            records=not columnar)]
+        merged = heapq.merge(*shards, key=lambda row: row[0], reverse=True)
+        return ReservationColumns(merged) if columnar else list(merged)
+
+    @timed
+    def get_reservations_window(self, offset, limit):
+        """Get a slice of reservations (newest first) by row position"""
+        with self.pool.connection() as conn:
+            # The id map is narrow, so skipping offset entries of it is cheap
+            pairs = conn.execute('SELECT id, month FROM reservation_shards ORDER BY id DESC LIMIT ? OFFSET ?',
+                                 (limit, offset)).fetchall()
+            return self._rows_for(conn, pairs)
+
+    @timed
+    def search_reservations(self, name=None, flight_number=None, departure=None, destination=None,
+                            date_from=None, date_to=None, cursor=None, limit=50):
+        """Get one page of reservations (newest first) and the cursor for the next page"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conditions, params = search_filters(name, flight_number, departure, destination, date_from, date_to,
+                                            cursor)
+        params.append(limit + 1)
+
+        # Only shards whose month overlaps the date filter are read; whole months walk ids newest first
+        rows = []
+        for shards, shard_conditions in plan_shards(months_between(self.months, date_from, date_to),
+                                                    date_from, date_to, conditions):
+            query = (f'SELECT {RESERVATION_COLUMNS} FROM {{shard}}.reservations{_where(shard_conditions)} '
+                     f'ORDER BY id DESC LIMIT ?')
+            for _, shard_rows in self.query_shards(shards, query, params, records=True):
+                rows.extend(shard_rows)
+        rows.sort(key=lambda row: row.id, reverse=True)
+
+        # The extra row only tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1].id
+        return rows, next_cursor
+
+    @timed
+    def search_passengers(self, text, limit=200, use_fts=None):
+        """Find reservations by passenger name, flight or city, newest first
+
+        Shards have no full-text index; every word must appear in one of the columns.
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return []
+        conditions, params = passenger_filters(words)
+        rows = []
+        for _, shard_rows in self.query_shards(list(self.months), f'''
+                                               SELECT {RESERVATION_COLUMNS}
+                                               FROM {{shard}}.reservations
+                                               WHERE {' AND '.join(conditions)}
+                                               ORDER BY id DESC
+                                               LIMIT ?
+                                               ''', params + [limit], records=True):
+            rows.extend(shard_rows)
+        rows.sort(key=lambda row: row.id, reverse=True)
+        return rows[:limit]
+
+    # Maintenance
+
+    def shard_stats(self):
+        """(month, reservations, bytes on disk) for every live shard"""
+        with self.pool.connection() as conn:
+            counts = dict(conn.execute('SELECT month, rows FROM shards'))
+        stats = []
+        for month in list(self.months):
+            path = self.shard_path(month)
+            size = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+            stats.append((month, counts.get(month, 0), size))
+        return stats
+
+    def _forget_shard(self, month):
+        """Take a live shard out of service, leaving its file alone"""
+        check_month(month)
+        if month not in self.months:
+            raise ValueError(f"No live shard for {month}")
+        with self._months_lock:
+            self.months.remove(month)
+        self._detach_everywhere(month)
+
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM shards WHERE month = ?', (month,))
+            conn.commit()
+            # In batches, so bookings for other months keep going while the map shrinks
+            while True:
+                deleted = conn.execute('''
+                                       DELETE FROM reservation_shards
+                                       WHERE id IN (SELECT id FROM reservation_shards WHERE month = ? LIMIT ?)
+                                       ''', (month, RETIRE_BATCH)).rowcount
+                conn.commit()
+                if deleted < RETIRE_BATCH:
+                    break
+            # The rows left without change log entries; an empty log makes every view reload
+            conn.execute('DELETE FROM reservation_changes')
+            conn.commit()
+        self.reservation_cache.clear()
+        self.seats.clear()
+
+    def _close_shard_file(self, month):
+        """Fold a detached shard's WAL back in, leaving one self-contained file"""
+        conn = sqlite3.connect(self.shard_path(month))
+        try:
+            conn.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            conn.close()
+
+    @timed
+    def archive_shard(self, month, archive_dir):
+        """Move a month's shard out of the live set into archive_dir; returns the archived file's path"""
+        self._forget_shard(month)
+        self._close_shard_file(month)
+        os.makedirs(archive_dir, exist_ok=True)
+        target = os.path.join(archive_dir, os.path.basename(self.shard_path(month)))
+        # A rename when archive_dir is on the same filesystem
+        shutil.move(self.shard_path(month), target)
+        return target
+
+    @timed
+    def drop_shard(self, month):
+        """Delete a month's shard and every booking in it"""
+        self._forget_shard(month)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.shard_path(month) + suffix):
+                os.remove(self.shard_path(month) + suffix)
+
+    @timed
+    def restore_shard(self, path):
+        """Bring an archived shard file back into the live set; returns the number of bookings restored"""
+        month = os.path.splitext(os.path.basename(path))[0]
+        check_month(month)
+        if month in self.months or os.path.exists(self.shard_path(month)):
+            raise ValueError(f"A live shard for {month} already exists")
+        shutil.copyfile(path, self.shard_path(month))
+
+        with self.pool.connection() as conn:
+            schema = self._attach(conn, month, create=True)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(f'INSERT INTO reservation_shards (id, month) SELECT id, ? FROM {schema}.reservations',
+                             (month,))
+                restored = conn.execute(f'SELECT COUNT(*) FROM {schema}.reservations').fetchone()[0]
+                conn.execute('UPDATE shards SET rows = ? WHERE month = ?', (restored, month))
+                conn.execute('DELETE FROM reservation_changes')
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                conn.execute(f'DETACH DATABASE {schema}')
+                del conn.attached[month]
+                conn.execute('DELETE FROM shards WHERE month = ?', (month,))
+                conn.commit()
+                with self._months_lock:
+                    self.months.remove(month)
+                os.remove(self.shard_path(month))
+                raise
+        self.reservation_cache.clear()
+        self.seats.clear()
+        return restored
+
+    @timed
+    def vacuum_shard(self, month):
+        """Rebuild one shard's file, leaving the others and the catalog untouched"""
+        check_month(month)
+        with self.pool.connection() as conn:
+            schema = self._attach(conn, month)
+            if schema is None:
+                raise ValueError(f"No live shard for {month}")
+            conn.execute(f'VACUUM {schema}')
+
+    @timed
+    def split_database(self, source_path, progress=None):
+        """Copy every booking from a single-file database into monthly shards; returns the number copied"""
+        with self.pool.connection() as conn:
+            if conn.execute('SELECT 1 FROM reservation_shards LIMIT 1').fetchone():
+                raise ValueError(f"{self.directory} already holds reservations")
+            conn.execute('ATTACH DATABASE ? AS source', (source_path,))
+            try:
+                tables = {name for (name,) in conn.execute("SELECT name FROM source.sqlite_master WHERE type = 'table'")}
+                if 'reservations' not in tables:
+                    raise ValueError(f"{source_path} has no reservations table")
+                columns = {row[1] for row in conn.execute('PRAGMA source.table_info(reservations)')}
+                version = 'version' if 'version' in columns else '1'
+                catalog = 'source.flights ORDER BY id' if 'flights' in tables else 'source.reservations ORDER BY id DESC'
+                conn.execute(f'INSERT OR IGNORE INTO flights (flight_number, departure, destination) '
+                             f'SELECT flight_number, departure, destination FROM {catalog}')
+                conn.commit()
+
+                # One pass over the date index finds every month
+                months = sorted({month_of(prefix) for (prefix,) in conn.execute(
+                    'SELECT DISTINCT substr(date, 1, 7) FROM source.reservations')})
+                copied = 0
+                for month in months:
+                    schema = self._attach(conn, month, create=True)
+                    # GLOB with a literal prefix is answered from the date index
+                    condition, pattern = ('date NOT GLOB ?', MONTH_GLOB) if month == UNDATED else \
+                        ('date GLOB ?', month + '*')
+                    conn.execute(f'''
+                                 INSERT INTO {schema}.reservations
+                                     (id, name, flight_number, departure, destination, date, seat_number, version)
+                                 SELECT {RESERVATION_COLUMNS}, {version}
+                                 FROM source.reservations
+                                 WHERE {condition}
+                                 ''', (pattern,))
+                    rows = conn.execute(f'SELECT COUNT(*) FROM {schema}.reservations').fetchone()[0]
+                    conn.execute(f'INSERT INTO reservation_shards (id, month) SELECT id, ? FROM {schema}.reservations',
+                                 (month,))
+                    conn.execute('UPDATE shards SET rows = ? WHERE month = ?', (rows, month))
+                    conn.commit()
+                    copied += rows
+                    if progress:
+                        progress(month, rows)
+
+                # Ids deleted from the source before the split are never handed out again
+                if 'sqlite_sequence' in tables:
+                    conn.execute('''
+                                 UPDATE sqlite_sequence
+                                 SET seq = MAX(seq, COALESCE((SELECT seq FROM source.sqlite_sequence
+                                                              WHERE name = 'reservations'), 0))
+                                 WHERE name = 'reservation_shards'
+                                 ''')
+                    conn.commit()
+            finally:
+                conn.rollback()
+                conn.execute('DETACH DATABASE source')
+        self.seats.clear()
+        self.flights.clear()
+        return copied
@@ -0,0 +1,151 @@
+from abc import ABC, abstractmethod
+
+# How many change log entries survive pruning at startup
+CHANGE_LOG_RETENTION = 100000
+
+# open_backend() spec prefix for the in-memory engine, e.g. "memory" or "memory:demo.json"
+MEMORY_PREFIX = 'memory'
+
+# open_backend() spec prefix for monthly shards in a directory, e.g. "shards:flights-data"
+SHARDS_PREFIX = 'shards'
+
+
+class ChangeSet:
+    """Reservations changed after a given change log version"""
+
+    def __init__(self, version, rows, deleted_ids, added):
+        self.version = version          # change log version the set is complete up to
+        self.rows = rows                # current rows of inserted or updated reservations
+        self.deleted_ids = deleted_ids  # ids that no longer exist
+        self.added = added              # net change in the number of reservations
+
+    def __bool__(self):
+        return bool(self.rows or self.deleted_ids)
+
+
+class ReservationConflictError(Exception):
+    """Raised when a reservation changed after the version an update was based on"""
+
+    def __init__(self, reservation_id, expected_version, current, current_version):
+        super().__init__(f"Reservation {reservation_id} was changed by someone else "
+                         f"(now version {current_version}, edit based on version {expected_version})")
+        self.reservation_id = reservation_id
+        self.expected_version = expected_version
+        self.current = current                  # the Reservation as it is now
+        self.current_version = current_version
+
+
+class StorageBackend(ABC):
+    """What the pages, worker and server rely on from their db object
+
+    Besides these methods a backend has:
+      metrics  -- Metrics registry the @timed methods report to
+      flights  -- FlightCatalog-like object (lookup, load_numbers, loaded, complete)
+      reports  -- ReportEngine-like object (dashboard, load_factors, route_daily, top_destinations)
+      has_fts  -- whether search_passengers uses a full-text index
+      supports_group_commit -- whether a GroupCommitWriter can batch its writes
+
+    Reads return Reservation records, newest (highest id) first. Seat numbers are
+    normalised on write and a seat can be booked once per flight and date
+    (SeatTakenError otherwise).
+    """
+
+    @abstractmethod
+    def init_database(self):
+        """Prepare storage; runs once, possibly on the worker thread (defer_init=True)"""
+
+    @abstractmethod
+    def close(self):
+        """Release resources and persist whatever needs persisting"""
+
+    @abstractmethod
+    def create_reservation(self, name, flight_number, departure, destination, date, seat_number):
+        """Add new reservation and return its id"""
+
+    @abstractmethod
+    def get_reservation_by_id(self, reservation_id):
+        """Get single reservation by ID, or None"""
+
+    @abstractmethod
+    def get_versioned_reservation(self, reservation_id):
+        """Get (reservation, version) read together for editing, or None"""
+
+    @abstractmethod
+    def get_reservations_by_ids(self, reservation_ids):
+        """Get several reservations; missing ids are skipped"""
+
+    @abstractmethod
+    def update_reservation(self, reservation_id, name, flight_number, departure, destination, date, seat_number,
+                           expected_version=None):
+        """Update existing reservation; False if it doesn't exist, ReservationConflictError if stale"""
+
+    @abstractmethod
+    def delete_reservation(self, reservation_id):
+        """Delete reservation; False if it doesn't exist"""
+
+    @abstractmethod
+    def get_seat_status(self, flight_number, date, seat_number):
+        """Get (seat is free, number of free seats) for a flight and date"""
+
+    @abstractmethod
+    def count_reservations(self):
+        """Get the number of reservations"""
+
+    @abstractmethod
+    def get_all_reservations(self, columnar=False):
+        """Get all reservations, as Reservation records or packed into ReservationColumns"""
+
+    @abstractmethod
+    def get_reservations_window(self, offset, limit):
+        """Get a slice of reservations (newest first) by row position"""
+
+    @abstractmethod
+    def search_reservations(self, name=None, flight_number=None, departure=None, destination=None,
+                            date_from=None, date_to=None, cursor=None, limit=50):
+        """Get one page of reservations (newest first) and the cursor for the next page"""
+
+    @abstractmethod
+    def search_passengers(self, text, limit=200, use_fts=None):
+        """Find reservations by passenger name, flight or city"""
+
+    @abstractmethod
+    def get_change_version(self):
+        """Get the newest change log version"""
+
+    @abstractmethod
+    def get_changes_since(self, version, max_changes=5000):
+        """Get a ChangeSet of everything after a change version, or None to reload everything"""
+
+    @abstractmethod
+    def prune_changes(self, keep=CHANGE_LOG_RETENTION):
+        """Drop all but the newest change log entries"""
+
+
+def backend_kind(spec):
+    """'memory', 'shards' or 'sqlite' (a single database file) for an open_backend() spec"""
+    if spec == MEMORY_PREFIX or spec.startswith(MEMORY_PREFIX + ':'):
+        return MEMORY_PREFIX
+    if spec.startswith(SHARDS_PREFIX + ':'):
+        return SHARDS_PREFIX
+    return 'sqlite'
+
+
+def open_backend(spec="flights.db", pool_size=None, migrate=True, **kwargs):
+    """Backend for a spec: a SQLite file name, "memory", "memory:<snapshot file>" or "shards:<directory>"
+
+    Keyword arguments every backend understands (defer_init, metrics) are passed through.
+    pool_size only applies to the SQLite backends and migrate only to a single file.
+    """
+    kind = backend_kind(spec)
+    if kind == MEMORY_PREFIX:
+        from memory_backend import MemoryBackend
+        return MemoryBackend(snapshot_path=spec[len(MEMORY_PREFIX) + 1:] or None, **kwargs)
+
+    if pool_size is not None:
+        kwargs['pool_size'] = pool_size
+    if kind == SHARDS_PREFIX:
+        from sharding import ShardedDatabaseManager
+        return ShardedDatabaseManager(spec[len(SHARDS_PREFIX) + 1:], **kwargs)
+
+    from database import DatabaseManager
+    return DatabaseManager(spec, migrate=migrate, **kwargs)
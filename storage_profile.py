@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class StorageProfile:
+    """SQLite PRAGMA settings applied to every database connection"""
+
+    DEFAULTS = {
+        'journal_mode': 'WAL',          # readers no longer block the writer
+        'synchronous': 'NORMAL',        # safe with WAL, fsync only at checkpoints
+        'busy_timeout': 5000,           # ms to wait for a lock before "database is locked"
+        'cache_size': -16000,           # negative means KiB, so ~16 MB page cache
+        'mmap_size': 268435456,         # 256 MB memory-mapped reads
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,     # pages
+        'checkpoint_interval': 30.0,    # seconds between background checkpoints, 0 disables
+        'backup_interval': 0.0,         # seconds between snapshots into backups/, 0 disables
+        'backup_keep': 7,               # snapshots kept by the scheduler
+    }
+
+    # Allowed textual values; everything else must be an integer
+    CHOICES = {
+        'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+        'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+        'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    }
+
+    PRAGMAS = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size',
+               'mmap_size', 'temp_store', 'wal_autocheckpoint')
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown storage settings: {', '.join(sorted(unknown))}")
+
+        self.settings = dict(self.DEFAULTS)
+        for key, value in settings.items():
+            self.settings[key] = self._validate(key, value)
+
+    def _validate(self, key, value):
+        """Check one setting before it gets interpolated into a PRAGMA"""
+        if key in self.CHOICES:
+            value = str(value).upper()
+            if value not in self.CHOICES[key]:
+                raise ValueError(f"Invalid {key}: {value}")
+            return value
+        if key in ('checkpoint_interval', 'backup_interval'):
+            return float(value)
+        return int(value)
+
+    def __getitem__(self, key):
+        return self.settings[key]
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a profile from a JSON file"""
+        with open(path, encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    @classmethod
+    def for_database(cls, db_name):
+        """Load storage_profile.json next to the database, or use the defaults"""
+        if db_name != ':memory:':
+            path = os.path.join(os.path.dirname(os.path.abspath(db_name)), 'storage_profile.json')
+            if os.path.exists(path):
+                return cls.from_file(path)
+        return cls()
+
+    @property
+    def uses_wal(self):
+        return self.settings['journal_mode'] == 'WAL'
+
+    def apply(self, conn):
+        """Apply the PRAGMAs to a freshly opened connection"""
+        # busy_timeout goes first so switching the journal mode can wait for locks too
+        for name in self.PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {self.settings[name]}")
+        return conn
+
+
+class WalCheckpointer:
+    """Background thread that checkpoints the WAL so it doesn't grow unbounded"""
+
+    def __init__(self, pool, interval):
+        self.pool = pool
+        self.interval = interval
+        self.checkpoints = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wal-checkpointer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def checkpoint(self, mode='PASSIVE'):
+        """Copy committed WAL frames back into the database file"""
+        with self.pool.connection() as conn:
+            result = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        self.checkpoints += 1
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                # PASSIVE never blocks readers or writers
+                self.checkpoint('PASSIVE')
+            except sqlite3.Error as e:
+                print(f"WAL checkpoint failed: {e}")
+
+    def stop(self):
+        """Stop the thread and truncate the WAL file"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        try:
+            self.checkpoint('TRUNCATE')
+        except Exception:
+            pass
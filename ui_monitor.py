@@ -0,0 +1,53 @@
+import time
+
+
+class EventLoopMonitor:
+    """Measures how long the Tk event loop is blocked between timer ticks"""
+
+    def __init__(self, root, interval=50, stall_threshold=100):
+        self.root = root
+        self.interval = interval                  # ms between ticks
+        self.stall_threshold = stall_threshold    # ms of lag that counts as a stall
+
+        self.ticks = 0
+        self.max_lag = 0.0
+        self.total_blocked = 0.0
+        self.stalls = 0
+        self._expected = None
+        self._after_id = None
+
+    def start(self):
+        self._expected = time.perf_counter() + self.interval / 1000.0
+        self._after_id = self.root.after(self.interval, self._tick)
+        return self
+
+    def _tick(self):
+        now = time.perf_counter()
+        # Anything beyond the scheduled time is time the loop could not run
+        lag = max(0.0, (now - self._expected) * 1000.0)
+        self.ticks += 1
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.stall_threshold:
+            self.stalls += 1
+            self.total_blocked += lag
+
+        self._expected = now + self.interval / 1000.0
+        self._after_id = self.root.after(self.interval, self._tick)
+
+    def stats(self):
+        """Get the blocking numbers collected so far"""
+        return {
+            'ticks': self.ticks,
+            'max_lag_ms': round(self.max_lag, 1),
+            'stalls': self.stalls,
+            'blocked_ms': round(self.total_blocked, 1),
+        }
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        return self.stats()
@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from seat_map import normalize_seat
+
+FIELDS = ('name', 'flight_number', 'departure', 'destination', 'date', 'seat_number')
+
+# Form field label for each field, as the booking and edit pages name their entries
+LABELS = {
+    'name': 'Name',
+    'flight_number': 'Flight Number',
+    'departure': 'Departure',
+    'destination': 'Destination',
+    'date': 'Date',
+    'seat_number': 'Seat Number',
+}
+
+MAX_TEXT_LENGTH = 100
+
+# Compiled once at import; every worker process gets its own copy when it imports the module
+DATE_PATTERN = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+# Two-character airline code (letters, or a letter and a digit), 1-4 digits, optional suffix: MS777, U21234, BA12A
+FLIGHT_PATTERN = re.compile(r'(?:[A-Z][A-Z0-9]|[0-9][A-Z])[0-9]{1,4}[A-Z]?')
+# Row number and seat letter: 1A, 12C, 104K
+SEAT_PATTERN = re.compile(r'[1-9][0-9]{0,2}[A-Z]')
+
+# Rows per unit of work sent to a validation process
+CHUNK_SIZE = 20000
+
+
+class ValidationError(ValueError):
+    """Raised for a field that breaks a rule"""
+
+    def __init__(self, field, message, missing=False):
+        super().__init__(message)
+        self.field = field
+        self.label = LABELS[field]
+        self.missing = missing      # the field was empty
+
+
+def clean_reservation(name, flight_number, departure, destination, date, seat_number):
+    """Checked and normalised field values as a tuple; ValidationError for the first bad field"""
+    values = {}
+    for field, value in zip(FIELDS, (name, flight_number, departure, destination, date, seat_number)):
+        value = str(value).strip() if value is not None else ''
+        if not value:
+            raise ValidationError(field, f"Please fill the {LABELS[field]} field!", missing=True)
+        if len(value) > MAX_TEXT_LENGTH:
+            raise ValidationError(field, f"{LABELS[field]} is longer than {MAX_TEXT_LENGTH} characters")
+        values[field] = value
+
+    # Runs of spaces in names would make the same passenger look like two
+    values['name'] = ' '.join(values['name'].split())
+
+    flight_number = values['flight_number'].upper()
+    if not FLIGHT_PATTERN.fullmatch(flight_number):
+        raise ValidationError('flight_number', f"Invalid flight number: {values['flight_number']} (e.g. AA1234)")
+    values['flight_number'] = flight_number
+
+    if values['departure'].casefold() == values['destination'].casefold():
+        raise ValidationError('destination', "Departure and destination must be different")
+
+    date = values['date']
+    if not DATE_PATTERN.fullmatch(date):
+        raise ValidationError('date', f"Invalid date: {date} (expected YYYY-MM-DD)")
+    try:
+        datetime.date.fromisoformat(date)
+    except ValueError:
+        raise ValidationError('date', f"Invalid date: {date} (no such day)") from None
+
+    seat_number = normalize_seat(values['seat_number'])
+    if not SEAT_PATTERN.fullmatch(seat_number):
+        raise ValidationError('seat_number', f"Invalid seat: {values['seat_number']} (e.g. 12A)")
+    values['seat_number'] = seat_number
+
+    return tuple(values[field] for field in FIELDS)
+
+
+def clean_form(values):
+    """Form values by field label, checked and normalised; ValidationError for the first bad field"""
+    cleaned = clean_reservation(*(values.get(LABELS[field]) for field in FIELDS))
+    return {LABELS[field]: value for field, value in zip(FIELDS, cleaned)}
+
+
+def find_duplicate(db, name, flight_number, date, exclude_id=None):
+    """An existing booking of the same passenger on the same flight and date, or None"""
+    rows, _ = db.search_reservations(name=name, flight_number=flight_number, date_from=date, date_to=date, limit=2)
+    return next((row for row in rows if row.id != exclude_id), None)
+
+
+def duplicate_key(values):
+    """Stable 8-byte digest of passenger, flight and date; equal keys mean a duplicate booking
+
+    hashlib rather than hash(), whose string hashes differ from one process to the next.
+    """
+    name, flight_number, _, _, date, _ = values
+    return hashlib.blake2b(f'{name.casefold()}\0{flight_number}\0{date}'.encode(), digest_size=8).digest()
+
+
+def validate_record(record):
+    """Turn a raw import record into (values, error, duplicate key)"""
+    if isinstance(record, Exception):
+        return None, f"Invalid JSON: {record}", None
+    if not isinstance(record, dict):
+        return None, "Record is not an object", None
+    try:
+        values = clean_reservation(*(record.get(field) for field in FIELDS))
+    except ValidationError as e:
+        return None, f"Missing {e.field}" if e.missing else str(e), None
+    return values, None, duplicate_key(values)
+
+
+def validate_chunk(chunk):
+    """validate_record over [(line number, record)]; the unit of work for a process pool"""
+    results = []
+    for line_no, record in chunk:
+        values, error, key = validate_record(record)
+        # Good records are already in values; only rejects need the raw record sent back
+        results.append((line_no, record if error else None, values, error, key))
+    return results
+
+
+def _chunks(numbered_records, chunk_size):
+    chunk = []
+    for item in numbered_records:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_stream(numbered_records, workers=1, chunk_size=CHUNK_SIZE):
+    """Yield (line number, rejected record or None, values, error, duplicate key) in input order
+
+    With workers > 1, chunks are validated in a process pool. Only a few chunks per
+    worker are in flight at once, so a huge file is never held in memory.
+    """
+    if workers <= 1:
+        for chunk in _chunks(numbered_records, chunk_size):
+            yield from validate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(numbered_records, chunk_size):
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class DuplicateFilter:
+    """Remembers duplicate keys seen so far and where they first appeared"""
+
+    def __init__(self):
+        self._first = {}
+
+    def check(self, key, line_no):
+        """Line number of an earlier row with the same key, or None (and remember this one)"""
+        first = self._first.setdefault(key, line_no)
+        return first if first != line_no else None
+
+    def __len__(self):
+        return len(self._first)
@@ -0,0 +1,215 @@
+from collections import OrderedDict
+
+
+class VirtualTreeview:
+    """Drives a ttk.Treeview so it only holds the rows currently on screen"""
+
+    def __init__(self, tree, scrollbar, fetch_rows, page_size=200, cache_pages=16, fetch_after=None, submit=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_rows = fetch_rows  # callable(offset, limit) -> list of row tuples
+        # Optional callable(row id, limit) -> the rows after that id. The page below a cached
+        # one is then read by key, costing the same at any depth, instead of by OFFSET
+        self.fetch_after = fetch_after
+        # Optional DatabaseWorker.submit; pages are then read off the Tk thread
+        self.submit = submit
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = int(tree.cget('height'))
+        self.active = False
+        self._pages = OrderedDict()
+        self._loading = set()       # page indexes requested from the worker
+        self._generation = 0        # bumped when cached pages go stale, so late results are dropped
+
+    def attach(self):
+        """Take over scrolling from the Treeview"""
+        if self.active:
+            return
+        self.active = True
+        self.tree.configure(yscrollcommand='')
+        self.scrollbar.configure(command=self.yview)
+        self.tree.bind('<Configure>', self._on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind('<Down>', lambda e: self._on_key(1))
+        self.tree.bind('<Up>', lambda e: self._on_key(-1))
+        self.tree.bind('<Next>', lambda e: self.yview('scroll', 1, 'pages') or 'break')
+        self.tree.bind('<Prior>', lambda e: self.yview('scroll', -1, 'pages') or 'break')
+
+    def detach(self):
+        """Hand scrolling back to the Treeview for normal mode"""
+        if not self.active:
+            return
+        self.active = False
+        for sequence in ('<Configure>', '<MouseWheel>', '<Button-4>', '<Button-5>',
+                         '<Down>', '<Up>', '<Next>', '<Prior>'):
+            self.tree.unbind(sequence)
+        self.scrollbar.configure(command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.invalidate()
+
+    def reset(self, total, preloaded=None):
+        """Drop cached pages and show the table again with a new row count"""
+        self.invalidate()
+        self._pages.update(preloaded or {})
+        self.total = total
+        self._clamp()
+        self.render()
+
+    def invalidate(self):
+        """Forget cached pages so the next render reads fresh rows"""
+        self._pages.clear()
+        self._loading.clear()
+        self._generation += 1
+
+    def current_page(self):
+        """Index of the page holding the first visible row"""
+        return self.offset // self.page_size
+
+    def _last_page(self):
+        """Index of the page holding the last visible row"""
+        return (self.offset + self.visible_rows - 1) // self.page_size
+
+    def _clamp(self):
+        self.offset = max(0, min(self.offset, self.total - self.visible_rows))
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_rows
+            self.offset += step
+        self._clamp()
+        self.render()
+
+    def _on_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+        return 'break'
+
+    def _on_key(self, step):
+        """Scroll when the selection moves past the top or bottom visible row"""
+        children = self.tree.get_children()
+        selection = self.tree.selection()
+        if not children or not selection:
+            return None
+        edge = children[-1] if step > 0 else children[0]
+        if selection[0] != edge:
+            return None
+        self.yview('scroll', step, 'units')
+        new_children = self.tree.get_children()
+        if new_children:
+            target = new_children[-1] if step > 0 else new_children[0]
+            self.tree.selection_set(target)
+            self.tree.focus(target)
+        return 'break'
+
+    def _on_resize(self, event):
+        # Header row plus data rows; rowheight comes from the ttk style
+        row_height = 20
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._clamp()
+            self.render()
+
+    def _page_query(self, index):
+        """(callable, args) reading one page: by key after the page above if it is cached, else by offset"""
+        above = self._pages.get(index - 1)
+        if self.fetch_after is not None and above and len(above) == self.page_size:
+            return self.fetch_after, (above[-1][0], self.page_size)
+        return self.fetch_rows, (index * self.page_size, self.page_size)
+
+    def _store(self, index, rows):
+        self._pages[index] = rows
+        if len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+
+    def _request(self, index):
+        """Ask the worker for a page; render runs again when it arrives"""
+        if index in self._loading or index * self.page_size >= self.total:
+            return
+        self._loading.add(index)
+        generation = self._generation
+        fetch, args = self._page_query(index)
+        self.submit(fetch, *args,
+                    callback=lambda rows: self._on_page(generation, index, rows),
+                    errback=lambda error: self._on_page_failed(generation, index, error))
+
+    def _on_page(self, generation, index, rows):
+        if generation != self._generation:
+            return
+        self._loading.discard(index)
+        self._store(index, rows)
+        # A page read ahead of time doesn't change what is on screen
+        if self.active and self.current_page() <= index <= self._last_page():
+            self.render()
+
+    def _on_page_failed(self, generation, index, error):
+        if generation == self._generation:
+            self._loading.discard(index)
+        print(f"Failed to load rows: {error}")
+
+    def _get_page(self, index):
+        """Get one page of rows; on a miss, None while the worker fetches it (or the rows, without a worker)"""
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+        if self.submit is not None:
+            self._request(index)
+            return None
+        fetch, args = self._page_query(index)
+        rows = fetch(*args)
+        self._store(index, rows)
+        return rows
+
+    def get_rows(self, offset, count):
+        """Get rows [offset, offset + count) from the page cache, or None while a page is loading"""
+        rows = []
+        first_page = offset // self.page_size
+        last_page = (offset + count - 1) // self.page_size
+        for index in range(first_page, last_page + 1):
+            page = self._get_page(index)
+            if page is None:
+                # Fetched in order, so the next page can be read by key after this one
+                return None
+            rows.extend(page)
+        start = offset - first_page * self.page_size
+        return rows[start:start + count]
+
+    def render(self):
+        """Replace the Treeview contents with the visible window"""
+        if self.total:
+            first = self.offset / self.total
+            last = min(1.0, (self.offset + self.visible_rows) / self.total)
+        else:
+            first, last = 0.0, 1.0
+        self.scrollbar.set(first, last)
+
+        rows = self.get_rows(self.offset, self.visible_rows) if self.total else []
+        if rows is None:
+            # Leave the old rows up until the page arrives
+            return
+        if self.submit is not None:
+            # Read the page below ahead of time, by key, so scrolling down never waits
+            self._get_page(self._last_page() + 1)
+
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert('', 'end', iid=str(row[0]), values=row)
+
+        # Keep the selection if the selected row is still on screen
+        kept = [iid for iid in selection if self.tree.exists(iid)]
+        if kept:
+            self.tree.selection_set(kept)